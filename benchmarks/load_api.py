@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test API dashboard - request/detik untuk /api/readings/history dan
+/api/readings/latest dengan banyak request bersamaan, sementara sejumlah
+client WebSocket tetap tersambung ke /ws dan mengukur round-trip-nya
+
+Butuh dashboard_service yang sudah berjalan (dan berisi data), misalnya:
+    uvicorn main:app --port 8000 --workers 1
+
+Contoh:
+    python benchmarks/load_api.py --url http://localhost:8000 \\
+        --concurrency 200 --duration 30 --ws-clients 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+import websockets
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))]
+
+
+async def http_worker(client, paths, deadline, latencies, errors, offset):
+    index = offset
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code != 200:
+                errors[path] = errors.get(path, 0) + 1
+                continue
+        except httpx.HTTPError:
+            errors[path] = errors.get(path, 0) + 1
+            continue
+        latencies.setdefault(path, []).append((time.perf_counter() - started) * 1000.0)
+
+
+async def ws_client(url, deadline, interval, rtts, stats):
+    """Client /ws yang mengukur round-trip pesan subscribe -> "subscribed".
+
+    Reply dikirim oleh event loop server, jadi round-trip yang panjang berarti
+    loop sedang terblokir (mis. query database sinkron di endpoint async).
+    """
+    probe = json.dumps({"type": "subscribe", "sensor_ids": ["__load_probe__"]})
+    try:
+        async with websockets.connect(url, max_queue=None) as ws:
+            stats["connected"] += 1
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                await ws.send(probe)
+                while True:
+                    message = json.loads(await ws.recv())
+                    stats["messages"] += 1
+                    if message.get("type") == "subscribed":
+                        break
+                rtts.append((time.perf_counter() - started) * 1000.0)
+                await asyncio.sleep(interval)
+    except Exception as e:
+        stats["errors"] += 1
+        stats["last_error"] = str(e)
+
+
+async def run(args):
+    base = args.url.rstrip("/")
+    ws_url = base.replace("http://", "ws://").replace("https://", "wss://") + "/ws"
+    paths = [
+        f"/api/readings/history?limit={args.history_limit}",
+        "/api/readings/latest",
+    ]
+    if args.sensor_id:
+        paths.append(f"/api/readings/history?limit={args.history_limit}&sensor_id={args.sensor_id}")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=args.timeout) as client:
+        # Pemanasan (koneksi pool server dan cache database)
+        for path in paths:
+            (await client.get(path)).raise_for_status()
+
+        deadline = time.monotonic() + args.duration
+        latencies, errors, rtts = {}, {}, []
+        ws_stats = {"connected": 0, "messages": 0, "errors": 0}
+        ws_tasks = [asyncio.create_task(ws_client(ws_url, deadline, args.ws_interval, rtts, ws_stats))
+                    for _ in range(args.ws_clients)]
+        started = time.monotonic()
+        await asyncio.gather(*(
+            http_worker(client, paths, deadline, latencies, errors, offset)
+            for offset in range(args.concurrency)
+        ))
+        elapsed = time.monotonic() - started
+        await asyncio.gather(*ws_tasks)
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"Durasi {elapsed:.1f} s, concurrency {args.concurrency}, {args.ws_clients} client WebSocket")
+    print(f"Total: {total} request, {total / elapsed:.1f} req/s, {sum(errors.values())} error")
+    for path in paths:
+        samples = latencies.get(path, [])
+        print(f"  {path}: {len(samples) / elapsed:.1f} req/s  "
+              f"p50={statistics.median(samples) if samples else 0:.1f} ms  "
+              f"p99={percentile(samples, 0.99):.1f} ms  error={errors.get(path, 0)}")
+    print(f"WebSocket: {ws_stats['connected']} tersambung, {ws_stats['messages']} pesan, "
+          f"round-trip p50={percentile(rtts, 0.5):.1f} ms  p99={percentile(rtts, 0.99):.1f} ms  "
+          f"maks={max(rtts, default=0):.1f} ms, "
+          f"{ws_stats['errors']} error")
+    if ws_stats["errors"]:
+        print(f"  error terakhir: {ws_stats['last_error']}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=100, help='jumlah request HTTP bersamaan')
+    parser.add_argument('--duration', type=float, default=30.0, help='durasi pengukuran (detik)')
+    parser.add_argument('--ws-clients', type=int, default=50, help='client /ws yang tetap tersambung')
+    parser.add_argument('--ws-interval', type=float, default=0.5, help='jeda antar probe /ws (detik)')
+    parser.add_argument('--history-limit', type=int, default=100)
+    parser.add_argument('--sensor-id', help='tambahkan query history untuk satu sensor')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
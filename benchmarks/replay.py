@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Replay - Rekam dan putar ulang stream telemetri MQTT
+``record`` berlangganan topic telemetri (JSON, biner, dan registry) lalu
+menyimpan setiap pesan mentah beserta waktu tibanya ke file rekaman
+(telemetry_recording.py, sama dengan ``mqtt_monitor.py --record``).
+
+``replay`` memutar rekaman dengan jarak antar-pesan asli dibagi ``--speed``
+(1 = real time, 0 = secepat mungkin), ke salah satu target:
+
+    broker  publish ulang ke broker MQTT lewat satu koneksi
+    ingest  langsung ke MqttConsumer -> handle_ingest -> IngestPipeline ->
+            database di dalam proses (InProcessBroker dari suite.py)
+
+Pesan dikirim satu per satu sesuai urutan di file, jadi urutan per sensor
+sama dengan saat direkam. Beberapa nilai ``--speed`` dijalankan bertahap
+sampai ingest tertinggal; laju tertinggi yang masih terkejar dilaporkan
+sebagai laju maksimum yang tertahan.
+
+Contoh:
+    python benchmarks/replay.py record --host localhost --output fire-season.ftrc.gz
+    python benchmarks/replay.py replay fire-season.ftrc.gz --target ingest --speed 1,2,4,8,16
+    python benchmarks/replay.py replay fire-season.ftrc.gz --target broker --speed 10 \\
+        --metrics-url http://localhost:8000/metrics
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [os.path.join(ROOT, 'dashboard_service'), ROOT]
+
+import paho.mqtt.client as mqtt  # noqa: E402
+from prometheus_client.parser import text_string_to_metric_families  # noqa: E402
+
+from telemetry_codec import REGISTRY_TOPIC, CodecError, TelemetryDecoder  # noqa: E402
+from telemetry_recording import RecordingWriter, read_recording  # noqa: E402
+
+
+def record(args):
+    """Simpan stream dari broker sampai --duration habis atau Ctrl+C"""
+    writer = RecordingWriter(args.output)
+    topics = TelemetryDecoder().topics()
+    connected = threading.Event()
+
+    def on_connect(client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            # QoS 1 agar broker tidak membuang pesan saat perekam sibuk menulis
+            client.subscribe([(topic, 1) for topic in topics])
+            connected.set()
+            print(f"[replay] Merekam {', '.join(topics)} ke {args.output}")
+        else:
+            print(f"[replay] Koneksi gagal, kode error: {rc}")
+
+    def on_message(client, userdata, msg):
+        writer.write(msg.topic, msg.payload)
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"replay_recorder_{os.getpid()}")
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(args.host, args.port, keepalive=60)
+    client.loop_start()
+
+    started = time.monotonic()
+    try:
+        while not args.duration or time.monotonic() - started < args.duration:
+            time.sleep(min(5.0, args.duration or 5.0))
+            writer.flush()
+            if connected.is_set():
+                print(f"[replay] {writer.records} pesan direkam ({time.monotonic() - started:.0f} s)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.disconnect()
+        client.loop_stop()
+        writer.close()
+    print(f"[replay] Selesai: {writer.records} pesan di {args.output}")
+
+
+def load(path, max_gap, limit_seconds=None):
+    """Pesan rekaman sebagai (offset detik, topic, payload) dan jumlah reading.
+
+    Jeda lebih dari ``max_gap`` (mis. antar sesi rekaman yang ditambahkan ke
+    file yang sama) dipendekkan menjadi ``max_gap``.
+    """
+    decoder = TelemetryDecoder()
+    messages = []
+    readings = 0
+    offset = 0.0
+    previous = None
+    for arrival, topic, payload in read_recording(path):
+        if previous is not None:
+            offset += min(max(arrival - previous, 0.0), max_gap)
+        previous = arrival
+        if limit_seconds and offset > limit_seconds:
+            break
+        messages.append((offset, topic, payload))
+        try:
+            readings += len(decoder.decode(topic, payload))
+        except (ValueError, CodecError):
+            pass
+    return messages, readings
+
+
+def paced(messages, speed, lags):
+    """Iterasi pesan sesuai jadwal; keterlambatan dari jadwal dicatat di ``lags``"""
+    started = time.perf_counter()
+    for offset, topic, payload in messages:
+        if speed > 0:
+            delay = started + offset / speed - time.perf_counter()
+            if delay > 0.0005:
+                time.sleep(delay)
+            elif delay < 0:
+                lags.append(-delay)
+        yield topic, payload
+
+
+def scrape(url):
+    """Reading tertulis/di-drop dan kedalaman antrian dari /metrics dashboard"""
+    with urllib.request.urlopen(url, timeout=5) as response:
+        text = response.read().decode()
+    values = {"written": 0.0, "failed": 0.0, "dropped": 0.0, "queue_depth": 0.0}
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.name == "forest_ingest_rows_total":
+                values[sample.labels["result"]] = values.get(sample.labels["result"], 0.0) + sample.value
+            elif sample.name == "forest_ingest_queue_depth":
+                values["queue_depth"] += sample.value
+    return values
+
+
+class BrokerTarget:
+    """Publish ulang ke broker lewat satu koneksi (urutan per topic terjaga)"""
+
+    def __init__(self, args):
+        self.args = args
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"replay_{os.getpid()}")
+        self.client.max_inflight_messages_set(args.max_inflight)
+        connected = threading.Event()
+        self.client.on_connect = lambda client, userdata, flags, rc, properties=None: connected.set()
+        self.client.connect(args.host, args.port, keepalive=60)
+        self.client.loop_start()
+        if not connected.wait(10):
+            raise RuntimeError(f"tidak bisa terhubung ke broker {args.host}:{args.port}")
+        self.last = None
+
+    def counters(self):
+        return scrape(self.args.metrics_url) if self.args.metrics_url else None
+
+    def quiet(self):
+        return contextlib.nullcontext()
+
+    def publish(self, topic, payload):
+        # Registry biner di-retain seperti yang dilakukan sensor
+        retain = topic.startswith(REGISTRY_TOPIC + "/")
+        self.last = self.client.publish(topic, payload, qos=self.args.qos, retain=retain)
+
+    def wait_published(self, timeout):
+        if self.last is not None:
+            self.last.wait_for_publish(timeout)
+
+    def close(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+class IngestTarget:
+    """Pesan langsung ke consumer ingest dashboard di dalam proses"""
+
+    def __init__(self, args):
+        if args.database_url:
+            os.environ['BENCH_DATABASE_URL'] = args.database_url
+        # suite menyiapkan environment dashboard sebelum main di-import
+        import suite
+        from mqtt_consumer import MqttConsumer
+
+        self.suite = suite
+        self.main = suite.main
+        self.broker = suite.InProcessBroker()
+        self.broker.attach(MqttConsumer("replay", 0, self.main.handle_ingest, name="ingest"))
+        print(f"[replay] Database: {self.main.engine.url.render_as_string(hide_password=True)}")
+        self.main.ingest_pipeline.start()
+
+    def counters(self):
+        return self.main.ingest_pipeline.metrics()
+
+    def quiet(self):
+        # Log per pesan handle_ingest tetap dijalankan, tapi tidak ke terminal
+        return self.suite.quiet()
+
+    def publish(self, topic, payload):
+        self.broker.publish(topic, payload)
+
+    def wait_published(self, timeout):
+        pass
+
+    def close(self):
+        with self.suite.quiet():
+            self.main.ingest_pipeline.stop()
+
+
+def backlog(counters):
+    if counters is None:
+        return None
+    if "received" in counters:
+        return counters["received"] - counters["written"] - counters["failed"] - counters["dropped"]
+    return counters["queue_depth"]
+
+
+def run_step(target, messages, readings, speed, args):
+    """Satu putaran replay pada ``speed``; ringkasan laju dan status ketinggalan"""
+    before = target.counters()
+    lags = []
+    peak = [backlog(before) or 0]
+    sampling = threading.Event()
+
+    def sample():
+        while not sampling.wait(0.25):
+            current = backlog(target.counters())
+            if current is not None:
+                peak[0] = max(peak[0], current)
+
+    sampler = None
+    if before is not None:
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+
+    with target.quiet():
+        started = time.perf_counter()
+        for topic, payload in paced(messages, speed, lags):
+            target.publish(topic, payload)
+        target.wait_published(args.drain_timeout)
+        published = time.perf_counter() - started
+
+        # Waktu sampai ingest menulis semua reading putaran ini
+        drain = None
+        after = before
+        if before is not None:
+            deadline = time.perf_counter() + args.drain_timeout
+            while True:
+                after = target.counters()
+                done = sum(after[key] - before[key] for key in ("written", "failed", "dropped"))
+                if done >= readings or time.perf_counter() >= deadline:
+                    break
+                time.sleep(0.02)
+            drain = time.perf_counter() - started - published if done >= readings else None
+            sampling.set()
+            sampler.join()
+
+    result = {
+        "speed": speed,
+        "messages": len(messages),
+        "readings": readings,
+        "offered_per_s": readings / published if published else 0.0,
+        "lag_p99_s": sorted(lags)[int(0.99 * (len(lags) - 1))] if lags else 0.0,
+        "lag_max_s": max(lags, default=0.0),
+        "drain_s": drain,
+        "completed_per_s": readings / (published + drain) if drain is not None else None,
+        "peak_backlog": peak[0] if before is not None else None,
+        "written": after["written"] - before["written"] if before is not None else None,
+        "dropped": after["dropped"] - before["dropped"] if before is not None else None,
+    }
+
+    # Tertinggal: reading di-drop, antrian tidak habis dalam --max-drain, atau
+    # pengirim sendiri tidak sanggup mengikuti jadwal. Tanpa jadwal (speed 0)
+    # antrian memang menumpuk, jadi hanya drop yang dihitung.
+    reasons = []
+    if before is not None:
+        if result["dropped"]:
+            reasons.append(f"{result['dropped']:.0f} reading di-drop")
+        if drain is None:
+            reasons.append("antrian tidak habis")
+        elif speed > 0 and drain > args.max_drain:
+            reasons.append(f"drain {drain:.1f} s")
+    if speed > 0 and result["lag_p99_s"] > args.max_lag:
+        reasons.append(f"terlambat dari jadwal {result['lag_p99_s']:.2f} s")
+    result["behind"] = reasons
+    return result
+
+
+def print_step(result):
+    drain = "-" if result["drain_s"] is None else f"{result['drain_s']:.2f} s"
+    backlog_text = "-" if result["peak_backlog"] is None else f"{result['peak_backlog']:.0f}"
+    speed = "maks" if result["speed"] == 0 else f"{result['speed']:g}x"
+    verdict = "tertinggal: " + ", ".join(result["behind"]) if result["behind"] else "terkejar"
+    print(f"[replay] {speed:>6}  {result['offered_per_s']:9.1f} reading/s  "
+          f"lag p99 {result['lag_p99_s'] * 1000:7.1f} ms  backlog puncak {backlog_text:>6}  "
+          f"drain {drain:>7}  {verdict}")
+
+
+def replay(args):
+    messages, readings = load(args.recording, args.max_gap, args.limit_seconds)
+    if not messages:
+        print(f"[replay] Rekaman {args.recording} kosong")
+        return
+    duration = messages[-1][0]
+    print(f"[replay] {len(messages)} pesan, {readings} reading, {duration:.1f} s waktu rekaman "
+          f"({readings / duration if duration else 0:.1f} reading/s pada 1x)")
+
+    target = IngestTarget(args) if args.target == "ingest" else BrokerTarget(args)
+    if args.target == "broker" and not args.metrics_url:
+        print("[replay] Tanpa --metrics-url hanya laju publish yang diukur")
+
+    results = []
+    try:
+        for speed in args.speed:
+            result = run_step(target, messages, readings, speed, args)
+            results.append(result)
+            print_step(result)
+            if result["behind"] and not args.keep_going:
+                break
+    finally:
+        target.close()
+
+    sustained = [r for r in results if not r["behind"] and r["speed"] > 0 and r["drain_s"] is not None]
+    if sustained:
+        best = max(sustained, key=lambda r: r["offered_per_s"])
+        print(f"[replay] Laju maksimum yang tertahan: {best['offered_per_s']:.1f} reading/s "
+              f"({best['speed']:g}x rekaman)")
+        if len(sustained) == len(results):
+            print("[replay] Ingest belum tertinggal; tambah --speed untuk mencari batasnya")
+    elif any(r["drain_s"] is not None for r in results):
+        print(f"[replay] Ingest sudah tertinggal pada {results[0]['speed']:g}x")
+    for result in results:
+        if result["speed"] == 0 and result["completed_per_s"] is not None:
+            print(f"[replay] Throughput tanpa jeda (publish + drain): {result['completed_per_s']:.1f} reading/s")
+
+
+def float_list(text):
+    return [float(value) for value in text.split(",") if value]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    recorder = commands.add_parser('record', help='rekam stream dari broker')
+    recorder.add_argument('--host', default=os.getenv('MQTT_BROKER_HOST', 'localhost'))
+    recorder.add_argument('--port', type=int, default=int(os.getenv('MQTT_BROKER_PORT', '1883')))
+    recorder.add_argument('--output', required=True, help='file rekaman (.gz = terkompresi)')
+    recorder.add_argument('--duration', type=float, default=0, help='detik (0 = sampai Ctrl+C)')
+
+    player = commands.add_parser('replay', help='putar ulang rekaman')
+    player.add_argument('recording')
+    player.add_argument('--target', choices=('broker', 'ingest'), default='ingest')
+    player.add_argument('--speed', type=float_list, default=[1.0],
+                        help='kelipatan kecepatan, dipisah koma (0 = secepat mungkin)')
+    player.add_argument('--keep-going', action='store_true', help='lanjutkan speed berikutnya walau tertinggal')
+    player.add_argument('--max-gap', type=float, default=5.0, help='jeda maksimum antar-pesan (detik rekaman)')
+    player.add_argument('--limit-seconds', type=float, help='putar hanya N detik pertama rekaman')
+    player.add_argument('--max-drain', type=float, default=2.0,
+                        help='batas waktu antrian habis setelah pesan terakhir (detik)')
+    player.add_argument('--max-lag', type=float, default=1.0, help='batas keterlambatan p99 dari jadwal (detik)')
+    player.add_argument('--drain-timeout', type=float, default=60.0)
+    player.add_argument('--host', default=os.getenv('MQTT_BROKER_HOST', 'localhost'))
+    player.add_argument('--port', type=int, default=int(os.getenv('MQTT_BROKER_PORT', '1883')))
+    player.add_argument('--qos', type=int, choices=(0, 1), default=1)
+    player.add_argument('--max-inflight', type=int, default=100)
+    player.add_argument('--metrics-url', help='/metrics dashboard untuk memantau ingest saat --target broker')
+    player.add_argument('--database-url', help='database untuk --target ingest (default BENCH_DATABASE_URL/SQLite temp)')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args)
+    else:
+        replay(args)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Alerts - Event transisi status area dengan hysteresis dan debounce
+Status mentah dari status_engine bisa berganti setiap reading; tracker ini
+hanya mengeluarkan event ketika status baru bertahan cukup lama (waktu
+reading sensor, bukan jam server) sehingga setiap worker menghasilkan event
+yang sama dan sensor yang berkedip tidak memicu badai broadcast.
+"""
+
+import threading
+
+from status_engine import STATUS_LEVELS
+
+
+class AreaAlertState:
+    """Status terkonfirmasi satu area dan kandidat transisinya"""
+
+    __slots__ = ("status", "candidate", "candidate_since")
+
+    def __init__(self, status='NORMAL'):
+        self.status = status
+        self.candidate = None
+        self.candidate_since = None
+
+
+class AlertTracker:
+    """Transisi NORMAL/WARNING/DANGER per lokasi dengan debounce.
+
+    Naik status setelah bertahan ``raise_after`` detik; turun status memakai
+    hysteresis (``margins``) dan harus bertahan ``clear_after`` detik.
+    """
+
+    def __init__(self, evaluate, margins=None, raise_after=5.0, clear_after=60.0):
+        self.evaluate = evaluate
+        self.margins = dict(margins or {})
+        self.raise_after = raise_after
+        self.clear_after = clear_after
+        self.areas = {}
+        self.transitions = 0
+        self._lock = threading.Lock()
+
+    def seed(self, statuses):
+        """Pulihkan status terkonfirmasi per lokasi (mis. dari tabel alert)"""
+        with self._lock:
+            for location, status in statuses.items():
+                self.areas[location] = AreaAlertState(status)
+
+    def _relaxed(self, values):
+        shifted = {}
+        for metric in ("temperature", "humidity", "smoke"):
+            value = values.get(metric)
+            shifted[metric] = None if value is None else value + self.margins.get(metric, 0.0)
+        return self.evaluate(shifted["temperature"], shifted["humidity"], shifted["smoke"])
+
+    def update(self, location, status, values, timestamp):
+        """Terapkan status mentah satu reading (``timestamp`` detik epoch).
+
+        Return (status_lama, status_baru) saat transisi terkonfirmasi, atau None.
+        """
+        with self._lock:
+            area = self.areas.get(location)
+            if area is None:
+                area = self.areas[location] = AreaAlertState()
+
+            level = STATUS_LEVELS[area.status]
+            if STATUS_LEVELS[status] > level:
+                target = status
+            else:
+                relaxed = self._relaxed(values) if STATUS_LEVELS[status] < level else status
+                target = relaxed if STATUS_LEVELS[relaxed] < level else area.status
+
+            if target == area.status:
+                area.candidate = area.candidate_since = None
+                return None
+            rising = STATUS_LEVELS[target] > level
+            if area.candidate is None or (STATUS_LEVELS[area.candidate] > level) != rising:
+                area.candidate_since = timestamp
+            # Berpindah antar level di sisi yang sama tidak mengulang debounce
+            area.candidate = target
+
+            hold = self.raise_after if rising else self.clear_after
+            if timestamp - area.candidate_since < hold:
+                return None
+            previous, area.status = area.status, target
+            area.candidate = area.candidate_since = None
+            self.transitions += 1
+            return previous, target
+
+    def active(self):
+        """Lokasi dengan status terkonfirmasi selain NORMAL"""
+        with self._lock:
+            return {location: area.status for location, area in self.areas.items() if area.status != 'NORMAL'}
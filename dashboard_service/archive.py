@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archive - Arsip Parquet kolumnar untuk telemetri lama (cold storage)
+Periode yang sudah tertutup dipindahkan dari telemetry_readings ke file
+Parquet di disk lokal, dipartisi per tanggal dan lokasi (gaya Hive), lalu
+dihapus dari database. Query analitik membaca arsip dengan predicate
+pushdown (partisi + statistik row group) dan file yang di-memory-map,
+sehingga scan berbulan-bulan tidak membebani database utama.
+"""
+
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+from sqlalchemy import delete, func, insert, select, text
+
+from rollups import METRICS, empty_aggregate, merge_value
+
+SCHEMA = pa.schema([
+    ("sensor_id", pa.string()),
+    ("sensor_type", pa.string()),
+    ("timestamp", pa.timestamp("s")),
+    ("temperature", pa.float64()),
+    ("humidity", pa.float64()),
+    ("smoke", pa.float64()),
+    ("status", pa.string()),
+    ("date", pa.string()),
+    ("location", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("date", pa.string()), ("location", pa.string())]), flavor="hive",
+)
+
+# Kunci advisory PostgreSQL agar hanya satu replika ingest yang mengarsip
+ADVISORY_LOCK_KEY = 0x666F7265  # "fore"
+
+# File run yang belum dipublikasikan; diabaikan dataset (awalan ".")
+STAGING_DIR = ".staging"
+
+
+class ExportChanged(Exception):
+    """Isi periode berubah antara ekspor dan DELETE"""
+
+
+class TelemetryArchive:
+    """Pindahkan periode tertutup ``reading_model`` ke dataset Parquet.
+
+    File ditulis ke staging, baris yang diekspor dihapus (DROP partisi atau
+    DELETE sampai id terbesar yang diekspor) di transaksi yang sama dengan
+    catatan ``run_model``, baru kemudian file dipindah ke dataset. Reading
+    yang masuk selama ekspor tetap di database untuk run berikutnya.
+    """
+
+    def __init__(self, engine, reading_model, node_model, run_model, partition_manager, root,
+                 after_days=0, chunk_size=50000):
+        self.engine = engine
+        self.reading_model = reading_model
+        self.node_model = node_model
+        self.run_model = run_model
+        self.partition_manager = partition_manager
+        self.root = root
+        self.after_days = after_days
+        self.chunk_size = chunk_size
+        self.archived_rows = 0
+        self.last_run = None
+        self._filesystem = fs.LocalFileSystem(use_mmap=True)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.after_days > 0
+
+    def period_start(self, ts):
+        if self.partition_manager.enabled:
+            return self.partition_manager.period_start(ts)
+        return datetime(ts.year, ts.month, ts.day)
+
+    def period_end(self, start):
+        if self.partition_manager.enabled:
+            return self.partition_manager.period_end(start)
+        return start + timedelta(days=1)
+
+    def closed_periods(self, now=None):
+        """Periode (awal, akhir) yang seluruhnya lebih tua dari ``after_days``"""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.after_days)
+        with self.engine.connect() as conn:
+            oldest = conn.execute(select(func.min(self.reading_model.timestamp))).scalar()
+        periods = []
+        if oldest is None:
+            return periods
+        start = self.period_start(oldest)
+        while self.period_end(start) <= cutoff:
+            periods.append((start, self.period_end(start)))
+            start = self.period_end(start)
+        return periods
+
+    def _batches(self, conn, start, end, exported):
+        """RecordBatch berurutan untuk reading dalam [start, end); ``exported`` mencatat jumlah dan id terbesar"""
+        reading, node = self.reading_model, self.node_model
+        result = conn.execution_options(yield_per=self.chunk_size).execute(
+            select(
+                node.sensor_id_string, reading.sensor_type, reading.timestamp, reading.temperature,
+                reading.humidity, reading.smoke, reading.status, node.location, reading.id,
+            )
+            .join(node, reading.node_id == node.id)
+            .where(reading.timestamp >= start, reading.timestamp < end)
+        )
+        for rows in result.partitions():
+            columns = list(zip(*rows))
+            exported["rows"] += len(rows)
+            exported["max_id"] = max(exported["max_id"] or 0, max(columns[8]))
+            yield pa.RecordBatch.from_arrays([
+                pa.array(columns[0], pa.string()),
+                pa.array(columns[1], pa.string()),
+                pa.array(columns[2], pa.timestamp("s")),
+                pa.array(columns[3], pa.float64()),
+                pa.array(columns[4], pa.float64()),
+                pa.array(columns[5], pa.float64()),
+                pa.array(columns[6], pa.string()),
+                pa.array([ts.strftime("%Y-%m-%d") for ts in columns[2]], pa.string()),
+                pa.array([location or "unknown" for location in columns[7]], pa.string()),
+            ], schema=SCHEMA)
+
+    def archive_period(self, start, end):
+        """Ekspor satu periode ke Parquet lalu hapus dari database; return jumlah baris"""
+        exported = {"rows": 0, "max_id": None}
+        run = f"{start:%Y%m%d}-{datetime.utcnow():%Y%m%dT%H%M%S%f}"
+
+        with self.engine.connect() as conn:
+            ds.write_dataset(
+                self._batches(conn, start, end, exported),
+                os.path.join(self.root, STAGING_DIR, run),
+                schema=SCHEMA,
+                format="parquet",
+                partitioning=PARTITIONING,
+                basename_template=f"part-{run}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                filesystem=self._filesystem,
+                max_rows_per_group=self.chunk_size,
+            )
+
+        # Hapus periode dan catat run dalam satu transaksi: file staging hanya
+        # dipublikasikan jika transaksi ini commit
+        try:
+            with self.engine.begin() as conn:
+                if not self.partition_manager.drop_period(start, end, conn, expected_rows=exported["rows"]):
+                    self._delete_exported(conn, start, end, exported)
+                conn.execute(insert(self.run_model).values(
+                    run=run, period_start=start, rows=exported["rows"], archived_at=datetime.utcnow(),
+                ))
+        except ExportChanged as e:
+            shutil.rmtree(os.path.join(self.root, STAGING_DIR, run), ignore_errors=True)
+            print(f"[Dashboard Service] Arsip {start:%Y-%m-%d} diulang di run berikutnya: {e}")
+            return 0
+        self._publish(run)
+        return exported["rows"]
+
+    def _delete_exported(self, conn, start, end, exported):
+        """DELETE baris yang diekspor saja; reading yang masuk setelah ekspor tetap di database"""
+        if exported["max_id"] is None:
+            return
+        reading = self.reading_model
+        deleted = conn.execute(delete(reading).where(
+            reading.timestamp >= start, reading.timestamp < end, reading.id <= exported["max_id"],
+        )).rowcount
+        # Baris ber-id kecil yang commit setelah ekspor ikut terhapus: batalkan
+        if deleted != exported["rows"]:
+            raise ExportChanged(f"{deleted} baris akan dihapus, {exported['rows']} diekspor")
+
+    def _publish(self, run):
+        """Pindahkan file staging satu run ke dataset (rename, idempoten)"""
+        staging = os.path.join(self.root, STAGING_DIR, run)
+        for directory, _, files in os.walk(staging):
+            target = os.path.join(self.root, os.path.relpath(directory, staging))
+            os.makedirs(target, exist_ok=True)
+            for name in files:
+                os.replace(os.path.join(directory, name), os.path.join(target, name))
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def recover(self):
+        """Selesaikan run yang terputus: publikasikan yang sudah commit, buang sisanya"""
+        staging_root = os.path.join(self.root, STAGING_DIR)
+        if not os.path.isdir(staging_root):
+            return
+        runs = sorted(os.listdir(staging_root))
+        if not runs:
+            return
+        with self.engine.connect() as conn:
+            committed = set(conn.execute(
+                select(self.run_model.run).where(self.run_model.run.in_(runs))
+            ).scalars())
+        for run in runs:
+            if run in committed:
+                self._publish(run)
+            else:
+                shutil.rmtree(os.path.join(staging_root, run), ignore_errors=True)
+        print(f"[Dashboard Service] Pemulihan arsip: {len(committed)} run dipublikasikan, "
+              f"{len(runs) - len(committed)} run dibuang")
+
+    def run(self, now=None):
+        """Arsipkan semua periode tertutup; return daftar (awal periode, jumlah baris)"""
+        if not self.enabled:
+            return []
+        archived = []
+        with self.engine.connect() as lock_conn:
+            if self.engine.dialect.name == "postgresql":
+                locked = lock_conn.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY},
+                ).scalar()
+                if not locked:
+                    return archived
+            try:
+                self.recover()
+                for start, end in self.closed_periods(now):
+                    rows = self.archive_period(start, end)
+                    self.archived_rows += rows
+                    archived.append((start, rows))
+            finally:
+                if self.engine.dialect.name == "postgresql":
+                    lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        self.last_run = datetime.utcnow()
+        if archived:
+            print(f"[Dashboard Service] Arsip Parquet: "
+                  f"{', '.join(f'{start:%Y-%m-%d} ({rows} baris)' for start, rows in archived)}")
+        return archived
+
+    def run_safely(self):
+        try:
+            self.run()
+        except Exception as e:
+            print(f"[Dashboard Service] Error arsip telemetri: {e}")
+
+    def start(self, every_seconds=3600):
+        """Jalankan pengarsipan berkala di background thread"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+
+        def loop():
+            self.run_safely()
+            while not self._stop.wait(every_seconds):
+                self.run_safely()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="telemetry-archive", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # Query
+
+    def dataset(self):
+        """Dataset Parquet arsip, atau None jika belum ada file"""
+        if not os.path.isdir(self.root):
+            return None
+        return ds.dataset(self.root, schema=SCHEMA, format="parquet",
+                          partitioning=PARTITIONING, filesystem=self._filesystem)
+
+    def filter(self, from_=None, to=None, sensor_id=None, sensor_type=None, location=None):
+        """Ekspresi filter; kolom partisi date/location memangkas direktori sebelum file dibuka"""
+        conditions = []
+        if from_ is not None:
+            conditions += [ds.field("date") >= from_.strftime("%Y-%m-%d"), ds.field("timestamp") >= from_]
+        if to is not None:
+            conditions += [ds.field("date") <= to.strftime("%Y-%m-%d"), ds.field("timestamp") < to]
+        if sensor_id is not None:
+            conditions.append(ds.field("sensor_id") == sensor_id)
+        if sensor_type is not None:
+            conditions.append(ds.field("sensor_type") == sensor_type)
+        if location is not None:
+            conditions.append(ds.field("location") == location)
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def history(self, from_=None, to=None, sensor_id=None, sensor_type=None, location=None, limit=100):
+        """Reading arsip terbaru dulu (paling banyak ``limit``), format reading_to_dict"""
+        dataset = self.dataset()
+        if dataset is None:
+            return []
+        # Top-k berjalan per batch: memori dibatasi ~limit baris, bukan seluruh hasil filter
+        newest = None
+        scanner = dataset.scanner(
+            filter=self.filter(from_, to, sensor_id, sensor_type, location), batch_size=self.chunk_size,
+        )
+        for batch in scanner.to_batches():
+            if not batch.num_rows:
+                continue
+            table = pa.Table.from_batches([batch]) if newest is None else pa.concat_tables(
+                [newest, pa.Table.from_batches([batch])]
+            )
+            if table.num_rows > limit:
+                table = table.take(pc.select_k_unstable(table, k=limit, sort_keys=[("timestamp", "descending")]))
+            newest = table
+        if newest is None:
+            return []
+        newest = newest.sort_by([("timestamp", "descending")])
+        return [archived_reading_to_dict(row) for row in newest.to_pylist()]
+
+    def stream(self, from_=None, to=None, sensor_id=None, sensor_type=None, location=None, limit=None):
+        """Reading arsip per batch (urut per partisi, tanpa memuat semuanya ke memori)"""
+        dataset = self.dataset()
+        if dataset is None:
+            return
+        remaining = limit
+        for batch in dataset.to_batches(filter=self.filter(from_, to, sensor_id, sensor_type, location)):
+            rows = batch.to_pylist()
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            yield rows
+            if remaining is not None and remaining <= 0:
+                return
+
+    def aggregate(self, sensor_id, from_, to, seconds):
+        """Agregat per bucket ``seconds`` dari arsip -> (lokasi, {bucket: aggregate})"""
+        dataset = self.dataset()
+        if dataset is None:
+            return None, {}
+        table = dataset.to_table(
+            columns=["timestamp", "location", *METRICS],
+            filter=self.filter(from_, to, sensor_id),
+        )
+        if not table.num_rows:
+            return None, {}
+        epoch = pc.cast(table["timestamp"], pa.int64())
+        table = table.append_column("bucket", pc.multiply(pc.divide(epoch, seconds), seconds))
+        grouped = table.group_by("bucket").aggregate(
+            [(metric, kind) for metric in METRICS for kind in ("min", "max", "sum", "count")]
+        )
+
+        buckets = {}
+        for row in grouped.to_pylist():
+            aggregate = buckets[datetime.utcfromtimestamp(row["bucket"])] = empty_aggregate()
+            for metric in METRICS:
+                merge_value(
+                    aggregate, metric, row[f"{metric}_min"], row[f"{metric}_max"],
+                    row[f"{metric}_sum"] or 0.0, row[f"{metric}_count"],
+                )
+        return table["location"][0].as_py(), buckets
+
+    def metrics(self):
+        return {
+            "enabled": self.enabled,
+            "root": self.root,
+            "after_days": self.after_days,
+            "archived_rows": self.archived_rows,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+        }
+
+
+def archived_reading_to_dict(row):
+    """Format satu baris arsip seperti reading_to_dict"""
+    return {
+        "sensor_id": row["sensor_id"],
+        "location": row["location"],
+        "timestamp": row["timestamp"].isoformat(),
+        "status": row["status"],
+        "sensor_type": row["sensor_type"],
+        "data": {metric: row[metric] for metric in METRICS if row[metric] is not None},
+    }
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Utilitas database - helper SQL yang bergantung dialect
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(db, table):
+    """INSERT yang mendukung ON CONFLICT untuk dialect koneksi ``db``"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def async_database_url(url):
+    """Ubah URL database sinkron menjadi URL driver async (asyncpg / aiosqlite)"""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect == "postgresql":
+        return f"postgresql+asyncpg{sep}{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+
+def pool_options(url, pool_size, max_overflow, pre_ping, recycle, timeout):
+    """Argumen pool untuk create_engine; SQLite memakai pool bawaan dialect"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_pre_ping": pre_ping,
+        "pool_recycle": recycle,
+        "pool_timeout": timeout,
+    }
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detection - Deteksi anomali dan risiko kebakaran secara streaming
+Setiap sensor punya ring buffer berukuran tetap (array.array) per metrik.
+Rata-rata/simpangan baku bergulir, EWMA, dan laju perubahan dihitung
+inkremental O(1) per reading, sehingga kenaikan suhu cepat atau lonjakan
+asap terdeteksi sebelum threshold absolut (status_engine) terlewati.
+"""
+
+import math
+import threading
+from array import array
+
+# Arah yang berbahaya per metrik (+1 naik, -1 turun) dan simpangan baku
+# minimum agar sensor yang sangat stabil tidak memicu z-score raksasa
+METRIC_RULES = {
+    "temperature": {"direction": 1, "min_std": 0.2},
+    "humidity": {"direction": -1, "min_std": 0.5},
+    "smoke": {"direction": 1, "min_std": 5.0},
+}
+
+
+class MetricWindow:
+    """Ring buffer ukuran tetap satu metrik dengan statistik bergulir O(1).
+
+    Jumlah dan jumlah kuadrat dihitung ulang dari buffer sekali per putaran
+    agar tidak terjadi drift floating-point.
+    """
+
+    __slots__ = ("size", "alpha", "times", "values", "smoothed", "head", "count",
+                 "total", "total_sq", "ewma")
+
+    def __init__(self, size, alpha):
+        self.size = size
+        self.alpha = alpha
+        self.times = array("d", bytes(8 * size))
+        self.values = array("d", bytes(8 * size))
+        self.smoothed = array("d", bytes(8 * size))
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.ewma = None
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def std(self):
+        if self.count < 2:
+            return None
+        mean = self.total / self.count
+        return math.sqrt(max(self.total_sq / self.count - mean * mean, 0.0))
+
+    def back(self, steps):
+        """Posisi buffer ``steps`` reading sebelum reading terbaru"""
+        return (self.head - 1 - steps) % self.size
+
+    def rate(self, lookback):
+        """Laju perubahan EWMA per menit terhadap ``lookback`` reading sebelumnya"""
+        steps = min(lookback, self.count - 1)
+        if steps < 1:
+            return None
+        newest, oldest = self.back(0), self.back(steps)
+        elapsed = self.times[newest] - self.times[oldest]
+        if elapsed <= 0:
+            return None
+        return (self.smoothed[newest] - self.smoothed[oldest]) * 60.0 / elapsed
+
+    def push(self, timestamp, value):
+        if self.count == self.size:
+            evicted = self.values[self.head]
+            self.total -= evicted
+            self.total_sq -= evicted * evicted
+        else:
+            self.count += 1
+        self.ewma = value if self.ewma is None else self.alpha * value + (1 - self.alpha) * self.ewma
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.smoothed[self.head] = self.ewma
+        self.total += value
+        self.total_sq += value * value
+        self.head = (self.head + 1) % self.size
+        if self.head == 0:
+            window = self.values[:self.count]
+            self.total = math.fsum(window)
+            self.total_sq = math.fsum(v * v for v in window)
+
+    def to_dict(self, lookback):
+        mean, std, rate = self.mean(), self.std(), self.rate(lookback)
+        return {
+            "samples": self.count,
+            "last": self.values[self.back(0)] if self.count else None,
+            "mean": None if mean is None else round(mean, 3),
+            "std": None if std is None else round(std, 3),
+            "ewma": None if self.ewma is None else round(self.ewma, 3),
+            "rate_per_min": None if rate is None else round(rate, 3),
+        }
+
+
+class DetectionEngine:
+    """Deteksi anomali sliding window per sensor, O(1) per reading.
+
+    ``spike`` (z-score terhadap window) dan ``rate`` (kemiringan EWMA per
+    menit) hanya ke arah berbahaya di ``METRIC_RULES``; deteksi yang sama
+    baru dilaporkan lagi setelah ``cooldown`` detik waktu reading.
+    """
+
+    def __init__(self, window=60, min_samples=10, alpha=0.3, zscore=4.0,
+                 rate_lookback=12, rate_limits=None, cooldown=0.0):
+        self.window = window
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.zscore = zscore
+        self.rate_lookback = rate_lookback
+        self.rate_limits = dict(rate_limits or {})
+        self.cooldown = cooldown
+        self.sensors = {}
+        self._last_reported = {}
+        self.detections = 0
+        self._lock = threading.Lock()
+
+    def update(self, sensor_id, timestamp, data):
+        """Tambahkan satu reading (``timestamp`` detik epoch); return list deteksi"""
+        found = []
+        with self._lock:
+            windows = self.sensors.get(sensor_id)
+            if windows is None:
+                windows = self.sensors[sensor_id] = {}
+            for metric, rule in METRIC_RULES.items():
+                value = data.get(metric)
+                if value is None:
+                    continue
+                value = float(value)
+                metric_window = windows.get(metric)
+                if metric_window is None:
+                    metric_window = windows[metric] = MetricWindow(self.window, self.alpha)
+                elif metric_window.count and timestamp < metric_window.times[metric_window.back(0)]:
+                    # Reading terlambat tidak dimasukkan agar urutan waktu window terjaga
+                    continue
+
+                # z-score dibandingkan dengan window sebelum reading ini masuk
+                ready = metric_window.count >= self.min_samples
+                if ready:
+                    deviation = (value - metric_window.mean()) * rule["direction"]
+                    score = deviation / max(metric_window.std(), rule["min_std"])
+                metric_window.push(timestamp, value)
+                if not ready:
+                    continue
+
+                if score >= self.zscore and self._due(sensor_id, metric, "spike", timestamp):
+                    found.append(self._detection(sensor_id, metric, "spike", value, score, self.zscore, metric_window))
+                limit = self.rate_limits.get(metric)
+                rate = metric_window.rate(self.rate_lookback)
+                if (limit and rate is not None and rate * rule["direction"] >= limit
+                        and self._due(sensor_id, metric, "rate", timestamp)):
+                    found.append(self._detection(sensor_id, metric, "rate", value, rate, limit, metric_window))
+            self.detections += len(found)
+        return found
+
+    def _due(self, sensor_id, metric, kind, timestamp):
+        key = (sensor_id, metric, kind)
+        last = self._last_reported.get(key)
+        if last is not None and timestamp - last < self.cooldown:
+            return False
+        self._last_reported[key] = timestamp
+        return True
+
+    def _detection(self, sensor_id, metric, kind, value, score, limit, metric_window):
+        return {
+            "sensor_id": sensor_id,
+            "metric": metric,
+            "kind": kind,
+            "severity": "DANGER" if abs(score) >= 2 * limit else "WARNING",
+            "value": value,
+            "score": round(score, 3),
+            "limit": limit,
+            "mean": round(metric_window.mean(), 3),
+            "ewma": round(metric_window.ewma, 3),
+        }
+
+    def snapshot(self, sensor_id=None):
+        """Statistik window per sensor dan metrik (satu sensor atau semua)"""
+        with self._lock:
+            sensors = self.sensors if sensor_id is None else {sensor_id: self.sensors.get(sensor_id, {})}
+            return {
+                sensor: {metric: window.to_dict(self.rate_lookback) for metric, window in windows.items()}
+                for sensor, windows in sensors.items()
+            }
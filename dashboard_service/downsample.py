@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Downsample - Reduksi deret waktu untuk grafik dashboard (NumPy)
+min/max per bucket piksel (puncak asap tetap terlihat) dan LTTB
+(Largest-Triangle-Three-Buckets, bentuk kurva paling mirip). Hasil
+disimpan di SeriesCache dengan key (sensor, metrik, rentang, resolusi).
+"""
+
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+METHODS = ("minmax", "lttb")
+
+
+def to_epoch(timestamps):
+    """datetime UTC naive -> detik epoch (int64)"""
+    return np.array(timestamps, dtype="datetime64[s]").astype(np.int64)
+
+
+def bucket_index(t, start, end, buckets):
+    """Nomor bucket piksel (0..buckets-1) untuk setiap titik waktu"""
+    index = (t - start) * buckets // max(end - start, 1)
+    return np.clip(index, 0, buckets - 1)
+
+
+def _first_per_bucket(order, index):
+    """Posisi pertama setiap bucket pada ``order`` yang terurut per bucket"""
+    sorted_index = index[order]
+    first = np.empty(len(order), dtype=bool)
+    first[:1] = True
+    first[1:] = sorted_index[1:] != sorted_index[:-1]
+    return order[first]
+
+
+def minmax(t, low, high, start, end, buckets):
+    """Titik minimum dan maksimum setiap bucket, urut waktu.
+
+    ``low``/``high`` adalah nilai yang sama untuk data mentah, atau kolom
+    min/max tabel rollup. Satu bucket menghasilkan paling banyak dua titik.
+    """
+    if len(t) == 0:
+        return t, low
+    index = bucket_index(t, start, end, buckets)
+    lowest = _first_per_bucket(np.lexsort((low, index)), index)
+    highest = _first_per_bucket(np.lexsort((-high, index)), index)
+
+    if low is high:
+        positions = np.union1d(lowest, highest)
+        return t[positions], low[positions]
+    times = np.concatenate((t[lowest], t[highest]))
+    values = np.concatenate((low[lowest], high[highest]))
+    # Dalam satu baris rollup, min digambar sebelum max
+    order = np.lexsort((np.r_[np.zeros(len(lowest)), np.ones(len(highest))], times))
+    return times[order], values[order]
+
+
+def lttb(t, y, threshold):
+    """Pilih ``threshold`` titik dengan Largest-Triangle-Three-Buckets.
+
+    Titik pertama dan terakhir selalu dipertahankan. Setiap bucket memilih
+    titik dengan luas segitiga terbesar terhadap titik terpilih sebelumnya
+    dan rata-rata bucket berikutnya (dihitung sekaligus lewat cumsum).
+    """
+    n = len(t)
+    if threshold >= n or threshold < 3:
+        return t, y
+    x = (t - t[0]).astype(np.float64)
+    y = y.astype(np.float64)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    sums_x = np.concatenate(([0.0], np.cumsum(x)))
+    sums_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(edges[1:] - edges[:-1], 1)
+    mean_x = (sums_x[edges[1:]] - sums_x[edges[:-1]]) / counts
+    mean_y = (sums_y[edges[1:]] - sums_y[edges[:-1]]) / counts
+    # Bucket terakhir dibandingkan dengan titik terakhir
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        area = np.abs(
+            (x[previous] - mean_x[bucket]) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (mean_y[bucket] - y[previous])
+        )
+        previous = lo + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return t[selected], y[selected]
+
+
+def raw_columns(rows):
+    """Baris (epoch, nilai...) -> array int64 waktu dan array float per kolom (NULL -> NaN)"""
+    if not rows:
+        return np.empty(0, dtype=np.int64), []
+    columns = list(zip(*rows))
+    return np.array(columns[0], dtype=np.int64), [np.array(column, dtype=np.float64) for column in columns[1:]]
+
+
+def rollup_average(sums, counts):
+    """sum / count per bucket rollup; bucket tanpa nilai menjadi NaN"""
+    return np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0)
+
+
+def downsample(method, t, values, start, end, buckets, low=None, high=None):
+    """Reduksi satu deret ke ``buckets`` bucket piksel.
+
+    ``values`` adalah nilai mentah atau rata-rata rollup; ``low``/``high``
+    (kolom min/max rollup) dipakai minmax bila tersedia. lttb menghasilkan
+    ``buckets`` titik, minmax paling banyak dua titik per bucket.
+    """
+    valid = ~np.isnan(values)
+    t, values = t[valid], values[valid]
+    if method == "lttb":
+        return lttb(t, values, buckets)
+    if low is None:
+        return minmax(t, values, values, start, end, buckets)
+    return minmax(t, low[valid], high[valid], start, end, buckets)
+
+
+class SeriesCache:
+    """LRU terbatas untuk deret hasil downsample dengan TTL per entri.
+
+    Key diratakan ke lebar bucket oleh pemanggil, jadi permintaan berulang
+    dalam satu bucket memakai entri yang sama.
+    """
+
+    def __init__(self, max_size=1000, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hot Store - Jendela telemetri terbaru di memori, disimpan per kolom
+Setiap sensor menyimpan N menit terakhir dalam array (epoch, suhu,
+kelembaban, asap, status) sehingga query histori dan agregat rentang
+terbaru tidak menyentuh database. Memori dibatasi anggaran total; baris
+tertua dibuang dan rentang yang tidak lagi lengkap dijawab lewat SQL.
+"""
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+import numpy as np
+
+from rollups import METRICS, empty_aggregate, merge_value
+from telemetry_codec import STATUSES
+
+UNKNOWN_STATUS = -1
+
+# epoch + tiga metrik (double) + status (signed char)
+ROW_BYTES = 8 * (1 + len(METRICS)) + 1
+
+
+class SensorWindow:
+    """Kolom reading terbaru satu sensor, urut waktu.
+
+    Baris yang dibuang dilewati dengan ``start`` dan dipadatkan saat sudah
+    separuh array (amortized O(1)).
+    """
+
+    __slots__ = ("sensor_id", "location", "sensor_type", "ts", "columns", "status",
+                 "start", "complete_since")
+
+    def __init__(self, sensor_id, location, sensor_type, complete_since):
+        self.sensor_id = sensor_id
+        self.location = location
+        self.sensor_type = sensor_type
+        self.ts = array("d")
+        self.columns = tuple(array("d") for _ in METRICS)
+        self.status = array("b")
+        self.start = 0
+        self.complete_since = complete_since
+
+    def __len__(self):
+        return len(self.ts) - self.start
+
+    def add(self, timestamp, values, status):
+        """Tambahkan satu reading; reading terlambat disisipkan di posisinya"""
+        if not len(self) or timestamp >= self.ts[-1]:
+            self.ts.append(timestamp)
+            for column, value in zip(self.columns, values):
+                column.append(value)
+            self.status.append(status)
+            return
+        position = bisect_right(self.ts, timestamp, self.start)
+        self.ts.insert(position, timestamp)
+        for column, value in zip(self.columns, values):
+            column.insert(position, value)
+        self.status.insert(position, status)
+
+    def evict_before(self, cutoff):
+        """Buang reading sebelum ``cutoff``; return jumlah baris yang dibuang"""
+        end = bisect_left(self.ts, cutoff, self.start)
+        evicted = end - self.start
+        if evicted:
+            self.start = end
+            self._compact()
+        return evicted
+
+    def evict_oldest(self, count):
+        """Buang ``count`` reading tertua (anggaran memori); rentangnya tidak lagi lengkap"""
+        end = min(self.start + count, len(self.ts))
+        if end > self.start:
+            self.complete_since = max(self.complete_since, math.nextafter(self.ts[end - 1], math.inf))
+            self.start = end
+            self._compact()
+
+    def _compact(self):
+        if self.start * 2 < len(self.ts):
+            return
+        del self.ts[:self.start]
+        for column in self.columns:
+            del column[:self.start]
+        del self.status[:self.start]
+        self.start = 0
+
+    def bounds(self, lo, hi):
+        """Indeks [awal, akhir) reading dengan lo <= epoch < hi"""
+        return bisect_left(self.ts, lo, self.start), bisect_left(self.ts, hi, self.start)
+
+
+class HotStore:
+    """Window kolumnar per sensor untuk ``window_seconds`` telemetri terakhir.
+
+    ``covers`` menentukan apakah rentang bisa dijawab dari memori; selain itu
+    pemanggil membaca dari database.
+    """
+
+    def __init__(self, window_seconds=3600, max_bytes=64 * 1024 * 1024):
+        self.window_seconds = window_seconds
+        self.max_rows = max(1, max_bytes // ROW_BYTES)
+        self.complete_since = time.time()
+        self.sensors = {}
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def mark_complete_since(self, timestamp):
+        """Reading sejak ``timestamp`` sudah dimuat (mis. warm dari database)"""
+        with self._lock:
+            self.complete_since = timestamp
+            for window in self.sensors.values():
+                window.complete_since = max(window.complete_since, timestamp)
+
+    def add(self, sensor_id, location, sensor_type, timestamp, data, status):
+        """Simpan satu reading (``timestamp`` detik epoch)"""
+        values = tuple(math.nan if data.get(metric) is None else float(data[metric]) for metric in METRICS)
+        with self._lock:
+            window = self.sensors.get(sensor_id)
+            if window is None:
+                window = self.sensors[sensor_id] = SensorWindow(
+                    sensor_id, location, sensor_type, self.complete_since,
+                )
+            elif timestamp < time.time() - self.window_seconds:
+                return
+            window.add(timestamp, values, STATUSES.index(status) if status in STATUSES else UNKNOWN_STATUS)
+            self.rows += 1 - window.evict_before(time.time() - self.window_seconds)
+
+            # Anggaran dibagi rata; sensor di atas bagiannya membuang baris tertua
+            share = max(1, self.max_rows // len(self.sensors))
+            if len(window) > share:
+                excess = len(window) - share
+                window.evict_oldest(excess)
+                self.rows -= excess
+
+    def covers(self, start, sensor_id=None):
+        """True jika semua reading sejak epoch ``start`` ada di memori"""
+        with self._lock:
+            if start < max(self.complete_since, time.time() - self.window_seconds):
+                covered = False
+            elif sensor_id is not None:
+                window = self.sensors.get(sensor_id)
+                covered = window is None or start >= window.complete_since
+            else:
+                covered = all(start >= window.complete_since for window in self.sensors.values())
+            if covered:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return covered
+
+    def _matching(self, sensor_id, sensor_type):
+        if sensor_id is not None:
+            window = self.sensors.get(sensor_id)
+            windows = [window] if window is not None else []
+        else:
+            windows = list(self.sensors.values())
+        if sensor_type is not None:
+            windows = [window for window in windows if window.sensor_type == sensor_type]
+        return windows
+
+    def history(self, start, end, sensor_id=None, sensor_type=None, limit=100):
+        """Reading dalam [start, end) terbaru dulu, format reading_to_dict.
+
+        Return None jika lebih dari ``limit`` reading cocok: halaman berikutnya
+        butuh cursor (timestamp, id) yang hanya ada di database.
+        """
+        with self._lock:
+            ranges = []
+            for window in self._matching(sensor_id, sensor_type):
+                lo, hi = window.bounds(start, end)
+                if hi > lo:
+                    ranges.append((window, lo, hi))
+            if sum(hi - lo for _, lo, hi in ranges) > limit:
+                return None
+            rows = [(window.ts[i], window, i) for window, lo, hi in ranges for i in range(lo, hi)]
+
+            rows.sort(key=lambda row: row[0], reverse=True)
+            return [self._reading(window, i) for _, window, i in rows]
+
+    def _reading(self, window, i):
+        status = window.status[i]
+        data = {}
+        for metric, column in zip(METRICS, window.columns):
+            if not math.isnan(column[i]):
+                data[metric] = column[i]
+        return {
+            "sensor_id": window.sensor_id,
+            "location": window.location,
+            "timestamp": datetime.utcfromtimestamp(window.ts[i]).isoformat(),
+            "status": STATUSES[status] if status != UNKNOWN_STATUS else "unknown",
+            "sensor_type": window.sensor_type,
+            "data": data,
+        }
+
+    def aggregate(self, sensor_id, start, end, seconds):
+        """Agregat per bucket ``seconds`` dalam [start, end) -> (window, {bucket: aggregate}).
+
+        Format aggregate sama dengan rollups (min/max/sum/count per metrik);
+        None jika sensor belum ada di memori.
+        """
+        with self._lock:
+            window = self.sensors.get(sensor_id)
+            if window is None:
+                return None
+            lo, hi = window.bounds(start, end)
+            ts = np.frombuffer(window.ts, dtype=np.float64)[lo:hi].copy()
+            columns = [np.frombuffer(column, dtype=np.float64)[lo:hi].copy() for column in window.columns]
+
+        buckets = {}
+        if not len(ts):
+            return window, buckets
+        keys = (ts // seconds).astype(np.int64) * seconds
+        # ts terurut: setiap bucket adalah potongan berurutan
+        edges = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        for key in keys[edges].tolist():
+            buckets[datetime.utcfromtimestamp(key)] = empty_aggregate()
+        for metric, values in zip(METRICS, columns):
+            valid = ~np.isnan(values)
+            counts = np.add.reduceat(valid.astype(np.int64), edges)
+            sums = np.add.reduceat(np.where(valid, values, 0.0), edges)
+            lows = np.fmin.reduceat(values, edges)
+            highs = np.fmax.reduceat(values, edges)
+            for bucket, low, high, total, count in zip(buckets, lows.tolist(), highs.tolist(),
+                                                       sums.tolist(), counts.tolist()):
+                merge_value(buckets[bucket], metric, low, high, total, count)
+        return window, buckets
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "sensors": len(self.sensors),
+                "rows": self.rows,
+                "max_rows": self.max_rows,
+                "bytes": self.rows * ROW_BYTES,
+                "window_seconds": self.window_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ingest Pipeline - Buffer tulis batch untuk data telemetri
+Menampung payload dari MQTT di antrian terbatas lalu menulisnya ke database
+per batch (berdasarkan ukuran atau waktu) dari satu background thread
+"""
+
+import queue
+import threading
+import time
+
+from metrics import INGEST_BATCH_SIZE, INGEST_FLUSH_SECONDS, INGEST_QUEUE_DEPTH, INGEST_ROWS
+
+
+class IngestPipeline:
+    """Antrian write-behind terbatas yang di-flush per ukuran atau waktu.
+
+    Antrian penuh menahan ``submit`` hingga ``put_timeout`` detik (backpressure
+    ke thread MQTT) sebelum payload di-drop. Error ``transient_errors``
+    dicoba ulang dengan backoff; error lain membelah batch agar hanya
+    payload yang rusak yang dibuang.
+    """
+
+    def __init__(self, flush_fn, batch_size=500, flush_interval=0.5,
+                 max_queue_size=10000, put_timeout=5.0, transient_errors=(),
+                 max_retries=3, retry_backoff=0.5, name="ingest"):
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.transient_errors = tuple(transient_errors)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "received": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "blocked_puts": 0,
+            "retries": 0,
+            "splits": 0,
+        }
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Hentikan worker dan flush sisa antrian"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, payload):
+        """Masukkan satu payload ke antrian; return False jika di-drop"""
+        with self._lock:
+            self._stats["received"] += 1
+        try:
+            self._queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            pass
+
+        with self._lock:
+            self._stats["blocked_puts"] += 1
+        try:
+            self._queue.put(payload, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            INGEST_ROWS.labels("dropped").inc()
+            print(f"[Dashboard Service] Antrian ingest penuh, payload di-drop")
+            return False
+
+    def _drain(self):
+        """Ambil hingga batch_size item, tunggu maksimal flush_interval"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """Tulis batch; return (jumlah tertulis, jumlah gagal)"""
+        attempt = 0
+        while True:
+            try:
+                self.flush_fn(batch)
+                return len(batch), 0
+            except self.transient_errors as e:
+                if attempt >= self.max_retries:
+                    print(f"[Dashboard Service] Error flush batch ({len(batch)} item) "
+                          f"setelah {attempt} percobaan ulang: {e}")
+                    return 0, len(batch)
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                with self._lock:
+                    self._stats["retries"] += 1
+                print(f"[Dashboard Service] Error transien flush batch, coba lagi dalam {delay:.1f}s: {e}")
+                time.sleep(delay)
+            except Exception as e:
+                if len(batch) == 1:
+                    print(f"[Dashboard Service] Payload gagal ditulis, di-drop: {e}")
+                    return 0, 1
+                # Belah dua agar hanya payload yang rusak yang dibuang
+                with self._lock:
+                    self._stats["splits"] += 1
+                middle = len(batch) // 2
+                first = self._write(batch[:middle])
+                second = self._write(batch[middle:])
+                return first[0] + second[0], first[1] + second[1]
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        written, failed = self._write(batch)
+        elapsed = time.perf_counter() - started
+        elapsed_ms = elapsed * 1000.0
+        INGEST_FLUSH_SECONDS.observe(elapsed)
+        INGEST_BATCH_SIZE.observe(len(batch))
+        if written:
+            INGEST_ROWS.labels("written").inc(written)
+        if failed:
+            INGEST_ROWS.labels("failed").inc(failed)
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["last_flush_ms"] = elapsed_ms
+            self._stats["total_flush_ms"] += elapsed_ms
+            if elapsed_ms > self._stats["max_flush_ms"]:
+                self._stats["max_flush_ms"] = elapsed_ms
+            self._stats["written"] += written
+            self._stats["failed"] += failed
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._drain()
+            INGEST_QUEUE_DEPTH.set(self._queue.qsize())
+            if batch:
+                self._flush(batch)
+
+        # Flush sisa antrian saat shutdown
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                break
+            self._flush(batch)
+        INGEST_QUEUE_DEPTH.set(0)
+
+    def metrics(self):
+        """Snapshot metrik antrian dan latensi flush"""
+        with self._lock:
+            stats = dict(self._stats)
+        total_ms = stats.pop("total_flush_ms")
+        stats["avg_flush_ms"] = round(total_ms / stats["batches"], 3) if stats["batches"] else 0.0
+        stats["last_flush_ms"] = round(stats["last_flush_ms"], 3)
+        stats["max_flush_ms"] = round(stats["max_flush_ms"], 3)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._queue.maxsize
+        stats["batch_size"] = self.batch_size
+        stats["flush_interval"] = self.flush_interval
+        return stats
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ingest Worker - Proses khusus penulisan telemetri ke database (tanpa HTTP)
+Berlangganan lewat shared subscription MQTT sehingga beberapa worker/replika
+membagi pesan, sementara worker API (SERVICE_ROLE=api) tetap stateless
+
+Contoh:
+    METRICS_PORT=9100 python ingest_worker.py
+"""
+
+import os
+import signal
+import threading
+
+# Hanya bagian ingest dari main yang dijalankan di proses ini
+os.environ['SERVICE_ROLE'] = 'ingest'
+
+import main  # noqa: E402
+from metrics import serve as serve_metrics  # noqa: E402
+
+# Port server /metrics Prometheus untuk worker ini (0 = nonaktif)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+
+def run():
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+        print(f"[Dashboard Service] Metrik Prometheus di port {METRICS_PORT}")
+    # Status area dan status alert terakhir untuk consumer alert
+    main.warm_latest_data()
+    main.start_ingest()
+    print(f"[Dashboard Service] Ingest worker berjalan (pid {os.getpid()})")
+    stop.wait()
+
+    print(f"[Dashboard Service] Ingest worker berhenti, flush sisa antrian...")
+    main.stop_consumers()
+
+
+if __name__ == "__main__":
+    run()
@@ -5,30 +5,161 @@ Dashboard Service - Backend API dan MQTT Subscriber
 Menerima data dari broker, menyimpan ke database, dan menyediakan API
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
+from fastapi.responses import StreamingResponse
+from sqlalchemy import create_engine, func, insert, inspect, select, text, true, tuple_, cast, extract, BigInteger, Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError, TimeoutError as SQLAlchemyTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from datetime import datetime
-import paho.mqtt.client as mqtt
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship, aliased, declared_attr
+from datetime import datetime, timedelta
+import base64
+import math
+import csv
+import io
 import json
 import os
-import threading
 import asyncio
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from alerts import AlertTracker
+from archive import TelemetryArchive, archived_reading_to_dict
+from dbutil import async_database_url, dialect_insert, pool_options
+from hot_store import HotStore
+from ingest import IngestPipeline
+from detection import DetectionEngine
+from metrics import CONTENT_TYPE_LATEST, DETECTIONS, INGEST_STAGE_SECONDS, mark_process_dead, render as render_metrics
+from mqtt_consumer import MqttConsumer, shared_prefix
+from node_cache import NodeIdCache
+from partitions import PartitionManager, is_missing_partition
+from response_cache import ResponseCache
+from status_engine import StatusEngine, evaluate_status
+from telemetry_codec import parse_timestamp
+from ws_manager import ConnectionManager
+import downsample
+import rollups
 
 # Konfigurasi
 DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://admin:password123@db/forest_db')
+# Driver async untuk endpoint API (default: diturunkan dari DATABASE_URL)
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', async_database_url(DATABASE_URL))
 MQTT_BROKER_HOST = os.getenv('MQTT_BROKER_HOST', 'broker')
-MQTT_BROKER_PORT = 1883
-MQTT_TOPIC = "sensors/telemetry"
+MQTT_BROKER_PORT = int(os.getenv('MQTT_BROKER_PORT', '1883'))
+
+# Peran proses: all (ingest + API), api (API + /ws saja), ingest (hanya tulis database)
+SERVICE_ROLE = os.getenv('SERVICE_ROLE', 'all')
+# Shared subscription ingest: setiap pesan ditulis oleh tepat satu worker/replika
+# dalam group ini (kosong = subscription biasa, hanya untuk satu proses ingest)
+MQTT_SHARED_GROUP = os.getenv('MQTT_SHARED_GROUP', 'dashboard_ingest')
+# Worker API menunggu tabel dibuat proses ingest paling lama selama ini saat startup
+SCHEMA_WAIT_SECONDS = int(os.getenv('SCHEMA_WAIT_SECONDS', '60'))
+# Event alert area dihitung proses ingest lalu diteruskan ke worker API lewat topic ini
+MQTT_ALERT_TOPIC = os.getenv('MQTT_ALERT_TOPIC', 'dashboard/alerts/area')
+# Deteksi anomali juga dihitung proses ingest dan diteruskan lewat topic ini
+MQTT_DETECTION_TOPIC = os.getenv('MQTT_DETECTION_TOPIC', 'dashboard/alerts/detection')
+
+# Connection pool database (berlaku untuk engine API dan engine ingest)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # detik
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # detik menunggu koneksi bebas
+
+# Konfigurasi pipeline ingest (batch insert)
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '500'))
+INGEST_FLUSH_INTERVAL = float(os.getenv('INGEST_FLUSH_INTERVAL', '0.5'))  # detik
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '10000'))
+INGEST_PUT_TIMEOUT = float(os.getenv('INGEST_PUT_TIMEOUT', '5'))  # detik, backpressure sebelum drop
+INGEST_MAX_RETRIES = int(os.getenv('INGEST_MAX_RETRIES', '3'))  # percobaan ulang untuk error transien
+NODE_CACHE_SIZE = int(os.getenv('NODE_CACHE_SIZE', '100000'))
+
+# Partisi dan retention telemetry_readings (PostgreSQL)
+TELEMETRY_PARTITION_INTERVAL = os.getenv('TELEMETRY_PARTITION_INTERVAL', 'daily')  # daily, weekly, none
+TELEMETRY_PARTITION_PREMAKE = int(os.getenv('TELEMETRY_PARTITION_PREMAKE', '3'))
+TELEMETRY_RETENTION_DAYS = int(os.getenv('TELEMETRY_RETENTION_DAYS', '0'))  # 0 = simpan selamanya
+PARTITION_MAINTENANCE_INTERVAL = int(os.getenv('PARTITION_MAINTENANCE_INTERVAL', '3600'))  # detik
+# Tabel lama yang belum partitioned disalin ke tabel partitioned baru saat startup ingest
+TELEMETRY_PARTITION_MIGRATE = os.getenv('TELEMETRY_PARTITION_MIGRATE', 'false').lower() == 'true'
+
+# Arsip Parquet: periode lebih tua dari N hari dipindah dari database (0 = nonaktif)
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', '/data/archive')
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '0'))
+ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', '3600'))  # detik
+
+# Fan-out WebSocket: antrian per client dan batas waktu kirim
+WS_SEND_QUEUE_SIZE = int(os.getenv('WS_SEND_QUEUE_SIZE', '100'))
+WS_SEND_TIMEOUT = float(os.getenv('WS_SEND_TIMEOUT', '5'))  # detik, client lebih lambat diputus
+WS_MAX_FRAME_RATE = float(os.getenv('WS_MAX_FRAME_RATE', '4'))  # frame delta per detik per client
+
+# Ukuran batch baris per fetch saat export histori (server-side cursor)
+HISTORY_EXPORT_CHUNK = int(os.getenv('HISTORY_EXPORT_CHUNK', '2000'))
+
+# Jumlah titik maksimal saat /api/readings/aggregate memilih bucket otomatis
+AGGREGATE_MAX_POINTS = int(os.getenv('AGGREGATE_MAX_POINTS', '1000'))
+
+# Deret grafik /api/readings/series: lebar maksimal (piksel) dan cache hasil downsample
+SERIES_MAX_WIDTH = int(os.getenv('SERIES_MAX_WIDTH', '4000'))
+SERIES_CACHE_SIZE = int(os.getenv('SERIES_CACHE_SIZE', '1000'))
+SERIES_CACHE_TTL = float(os.getenv('SERIES_CACHE_TTL', '60'))  # detik
+
+# Deteksi anomali streaming per sensor (ring buffer per metrik)
+DETECT_WINDOW = int(os.getenv('DETECT_WINDOW', '60'))  # reading per window
+DETECT_MIN_SAMPLES = int(os.getenv('DETECT_MIN_SAMPLES', '10'))
+DETECT_EWMA_ALPHA = float(os.getenv('DETECT_EWMA_ALPHA', '0.3'))
+DETECT_ZSCORE = float(os.getenv('DETECT_ZSCORE', '4.0'))
+DETECT_RATE_LOOKBACK = int(os.getenv('DETECT_RATE_LOOKBACK', '12'))  # reading
+DETECT_TEMP_RISE = float(os.getenv('DETECT_TEMP_RISE', '2.0'))  # °C per menit
+DETECT_HUMIDITY_DROP = float(os.getenv('DETECT_HUMIDITY_DROP', '5.0'))  # % per menit
+DETECT_SMOKE_RISE = float(os.getenv('DETECT_SMOKE_RISE', '100'))  # ppm per menit
+# Deteksi yang sama (sensor, metrik, jenis) tidak dikirim ulang dalam jeda ini
+DETECT_ALERT_COOLDOWN = float(os.getenv('DETECT_ALERT_COOLDOWN', '60'))  # detik
+
+# Event transisi status area: debounce (detik waktu reading) dan margin hysteresis
+ALERT_RAISE_SECONDS = float(os.getenv('ALERT_RAISE_SECONDS', '5'))
+ALERT_CLEAR_SECONDS = float(os.getenv('ALERT_CLEAR_SECONDS', '60'))
+ALERT_HYSTERESIS_TEMP = float(os.getenv('ALERT_HYSTERESIS_TEMP', '1.0'))  # °C
+ALERT_HYSTERESIS_HUMIDITY = float(os.getenv('ALERT_HYSTERESIS_HUMIDITY', '2.0'))  # %
+ALERT_HYSTERESIS_SMOKE = float(os.getenv('ALERT_HYSTERESIS_SMOKE', '50'))  # ppm
+
+# Jendela telemetri terbaru di memori worker API (0 = nonaktif)
+HOT_WINDOW_MINUTES = int(os.getenv('HOT_WINDOW_MINUTES', '60'))
+HOT_STORE_MAX_MB = int(os.getenv('HOT_STORE_MAX_MB', '64'))
+
+# Cache respons endpoint baca (body JSON + ETag), diinvalidasi oleh reading baru
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '1000'))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '30'))  # detik
+# Respons semua sensor berubah di setiap reading; cukup kedaluwarsa, tidak diinvalidasi
+RESPONSE_CACHE_SHARED_TTL = float(os.getenv('RESPONSE_CACHE_SHARED_TTL', '5'))  # detik
+# Perkiraan jeda MQTT -> database (batch ingest); entri yang dibangun di jeda ini berumur pendek
+RESPONSE_CACHE_SETTLE = float(os.getenv('RESPONSE_CACHE_SETTLE', '2'))  # detik
+
+if SERVICE_ROLE not in ("all", "api", "ingest"):
+    raise ValueError(f"SERVICE_ROLE tidak dikenal: {SERVICE_ROLE}")
+INGEST_ENABLED = SERVICE_ROLE in ("all", "ingest")
+API_ENABLED = SERVICE_ROLE in ("all", "api")
 
 # Setup Database
-engine = create_engine(DATABASE_URL)
+# Engine sinkron: thread ingest, maintenance partisi, dan startup
+engine = create_engine(
+    DATABASE_URL,
+    **pool_options(DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_POOL_TIMEOUT)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine async: semua endpoint API, agar query tidak memblokir event loop (/ws)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **pool_options(ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_POOL_TIMEOUT)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
 Base = declarative_base()
 
+# Tabel baru di PostgreSQL dibuat sebagai range partition pada timestamp
+PARTITIONED = engine.dialect.name == "postgresql" and TELEMETRY_PARTITION_INTERVAL != "none"
+
 # Model Database
 class SensorNode(Base):
     __tablename__ = "sensor_nodes"
@@ -43,18 +174,186 @@ class SensorNode(Base):
 class TelemetryReading(Base):
     __tablename__ = "telemetry_readings"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     node_id = Column(Integer, ForeignKey("sensor_nodes.id"))
     sensor_type = Column(String)  # temperature, humidity, smoke
-    timestamp = Column(DateTime)
+    # Tabel partitioned wajib memasukkan kolom partisi ke primary key
+    timestamp = Column(DateTime, primary_key=PARTITIONED, index=True)
     temperature = Column(Float, nullable=True)
     humidity = Column(Float, nullable=True)
     smoke = Column(Float, nullable=True)
     status = Column(String)
     node = relationship("SensorNode", back_populates="readings")
 
-# Buat tabel jika belum ada
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        # Untuk query "reading terbaru per node" (index scan mundur, LIMIT 1)
+        Index("ix_telemetry_readings_node_ts", "node_id", timestamp.desc()),
+        {"postgresql_partition_by": "RANGE (timestamp)"} if PARTITIONED else {},
+    )
+
+class SensorLatest(Base):
+    """Reading terbaru per sensor, di-upsert oleh pipeline ingest"""
+    __tablename__ = "sensor_latest"
+
+    node_id = Column(Integer, ForeignKey("sensor_nodes.id"), primary_key=True)
+    sensor_type = Column(String)
+    timestamp = Column(DateTime)
+    temperature = Column(Float, nullable=True)
+    humidity = Column(Float, nullable=True)
+    smoke = Column(Float, nullable=True)
+    status = Column(String)
+
+class RollupMixin:
+    """Kolom agregat per node per bucket; avg dihitung dari sum / count"""
+
+    @declared_attr
+    def node_id(cls):
+        return Column(Integer, ForeignKey("sensor_nodes.id"), primary_key=True)
+
+    bucket = Column(DateTime, primary_key=True)
+    temperature_min = Column(Float, nullable=True)
+    temperature_max = Column(Float, nullable=True)
+    temperature_sum = Column(Float, nullable=False, default=0)
+    temperature_count = Column(Integer, nullable=False, default=0)
+    humidity_min = Column(Float, nullable=True)
+    humidity_max = Column(Float, nullable=True)
+    humidity_sum = Column(Float, nullable=False, default=0)
+    humidity_count = Column(Integer, nullable=False, default=0)
+    smoke_min = Column(Float, nullable=True)
+    smoke_max = Column(Float, nullable=True)
+    smoke_sum = Column(Float, nullable=False, default=0)
+    smoke_count = Column(Integer, nullable=False, default=0)
+
+class TelemetryRollup1m(RollupMixin, Base):
+    __tablename__ = "telemetry_rollup_1m"
+
+class TelemetryRollup1h(RollupMixin, Base):
+    __tablename__ = "telemetry_rollup_1h"
+
+class AreaAlert(Base):
+    """Event transisi status area (append-only)"""
+    __tablename__ = "area_alerts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    location = Column(String, nullable=False)
+    previous_status = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False, index=True)
+    temperature = Column(Float, nullable=True)
+    humidity = Column(Float, nullable=True)
+    smoke = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Setiap worker API menghasilkan event yang sama; hanya satu yang tersimpan
+        UniqueConstraint("location", "timestamp", "status", name="uq_area_alerts_event"),
+    )
+
+class SensorDetection(Base):
+    """Deteksi anomali detektor streaming (append-only)"""
+    __tablename__ = "sensor_detections"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sensor_id = Column(String, nullable=False)
+    location = Column(String, nullable=True)
+    metric = Column(String, nullable=False)
+    kind = Column(String, nullable=False)
+    severity = Column(String, nullable=False)
+    value = Column(Float, nullable=True)
+    score = Column(Float, nullable=True)
+    timestamp = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Setiap replika ingest mendeteksi hal yang sama; hanya satu yang tersimpan
+        UniqueConstraint("sensor_id", "metric", "kind", "timestamp", name="uq_sensor_detections_event"),
+    )
+
+class ArchiveRun(Base):
+    """Run arsip Parquet yang DELETE/DROP-nya sudah commit"""
+    __tablename__ = "telemetry_archive_runs"
+
+    run = Column(String, primary_key=True)
+    period_start = Column(DateTime, nullable=False)
+    rows = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+# Tabel rollup yang dipelihara ingest, dari yang paling kasar (detik, model)
+ROLLUP_TABLES = ((3600, TelemetryRollup1h), (60, TelemetryRollup1m))
+
+# Kunci advisory PostgreSQL untuk setup skema (replika ingest bisa start bersamaan)
+SCHEMA_LOCK_KEY = 0x666F7273  # "fors"
+
+# Partisi dibuat di muka; tabel lama yang belum partitioned dilewati
+partition_manager = PartitionManager(
+    engine,
+    TelemetryReading.__tablename__,
+    interval=TELEMETRY_PARTITION_INTERVAL if PARTITIONED else "daily",
+    premake=TELEMETRY_PARTITION_PREMAKE,
+    retention_days=TELEMETRY_RETENTION_DAYS,
+)
+
+def init_database():
+    """Buat tabel, index, dan partisi; hanya proses ingest, satu proses pada satu waktu"""
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            # Buat tabel jika belum ada
+            Base.metadata.create_all(bind=conn)
+            # create_all tidak menambah index ke tabel yang sudah ada
+            for index in TelemetryReading.__table__.indexes:
+                index.create(bind=conn, checkfirst=True)
+            if PARTITIONED and partition_manager.relkind(conn) == "r":
+                migrate_legacy_readings(conn)
+            conn.commit()
+            if PARTITIONED and partition_manager.check():
+                partition_manager.run_maintenance()
+        finally:
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+                conn.commit()
+
+def migrate_legacy_readings(conn):
+    """telemetry_readings lama (belum partitioned): migrasikan jika diizinkan, selain itu hentikan startup"""
+    table = TelemetryReading.__table__
+    if not TELEMETRY_PARTITION_MIGRATE:
+        raise RuntimeError(
+            f"Tabel {table.name} sudah ada tetapi belum partitioned. Set "
+            f"TELEMETRY_PARTITION_MIGRATE=true untuk menyalinnya ke tabel partitioned baru "
+            f"(tabel lama disimpan sebagai {table.name}_legacy), atau "
+            f"TELEMETRY_PARTITION_INTERVAL=none untuk tetap tanpa partisi."
+        )
+    partition_manager.migrate_legacy(
+        conn, [column.name for column in table.columns], lambda conn: table.create(bind=conn),
+    )
+
+def wait_for_schema(timeout=SCHEMA_WAIT_SECONDS):
+    """Worker API: tunggu sampai proses ingest selesai membuat semua tabel"""
+    deadline = time.monotonic() + timeout
+    while True:
+        missing = set(Base.metadata.tables) - set(inspect(engine).get_table_names())
+        if not missing:
+            return
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"Tabel belum dibuat proses ingest: {', '.join(sorted(missing))}")
+        print(f"[Dashboard Service] Menunggu proses ingest membuat tabel: {', '.join(sorted(missing))}")
+        time.sleep(1)
+
+if INGEST_ENABLED:
+    init_database()
+
+# Periode tertutup dipindah ke Parquet oleh proses ingest; worker API membaca arsipnya
+telemetry_archive = TelemetryArchive(
+    engine, TelemetryReading, SensorNode, ArchiveRun, partition_manager, ARCHIVE_DIR,
+    after_days=ARCHIVE_AFTER_DAYS,
+)
+
+# Cache sensor_id -> node id, di-warm dari tabel sensor_nodes saat startup
+node_cache = NodeIdCache(SensorNode, max_size=NODE_CACHE_SIZE)
+if INGEST_ENABLED:
+    with SessionLocal() as _db:
+        node_cache.warm(_db)
 
 # FastAPI App
 app = FastAPI(title="Forest Fire Monitoring API")
@@ -66,328 +365,1135 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # WebSocket Connection Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-    
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-    
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
-
-manager = ConnectionManager()
+manager = ConnectionManager(
+    max_queue=WS_SEND_QUEUE_SIZE,
+    send_timeout=WS_SEND_TIMEOUT,
+    max_frame_rate=WS_MAX_FRAME_RATE,
+)
 
-# MQTT Client Setup
-mqtt_client = None
+# MQTT consumer (dibuat saat start sesuai SERVICE_ROLE)
+mqtt_consumers = []
 latest_data = {}
 
 # Thresholds for smoke (can be adjusted via env vars)
 SMOKE_WARNING = int(os.getenv('SMOKE_WARNING', '300'))
 SMOKE_DANGER = int(os.getenv('SMOKE_DANG', '600'))
 
-def on_connect(client, userdata, flags, rc, properties=None):
-    if rc == 0:
-        print(f"[Dashboard Service] Terhubung ke broker MQTT")
-        client.subscribe(MQTT_TOPIC)
-        print(f"[Dashboard Service] Subscribe ke topic: {MQTT_TOPIC}")
+# Status area per lokasi, diperbarui inkremental setiap pesan
+status_engine = StatusEngine(SMOKE_WARNING, SMOKE_DANGER)
+
+# Deteksi dini dari tren per sensor, sebelum threshold absolut terlewati
+detection_engine = DetectionEngine(
+    window=DETECT_WINDOW,
+    min_samples=DETECT_MIN_SAMPLES,
+    alpha=DETECT_EWMA_ALPHA,
+    zscore=DETECT_ZSCORE,
+    rate_lookback=DETECT_RATE_LOOKBACK,
+    rate_limits={
+        "temperature": DETECT_TEMP_RISE,
+        "humidity": DETECT_HUMIDITY_DROP,
+        "smoke": DETECT_SMOKE_RISE,
+    },
+    cooldown=DETECT_ALERT_COOLDOWN,
+)
+
+# Transisi status area yang di-debounce; margin menggeser nilai ke arah bahaya
+alert_tracker = AlertTracker(
+    lambda T, H, S: evaluate_status(T, H, S, SMOKE_WARNING, SMOKE_DANGER),
+    margins={
+        "temperature": ALERT_HYSTERESIS_TEMP,
+        "humidity": -ALERT_HYSTERESIS_HUMIDITY,
+        "smoke": ALERT_HYSTERESIS_SMOKE,
+    },
+    raise_after=ALERT_RAISE_SECONDS,
+    clear_after=ALERT_CLEAR_SECONDS,
+)
+# Status area milik consumer alert (proses ingest), terpisah dari status_engine worker API
+alert_status_engine = StatusEngine(SMOKE_WARNING, SMOKE_DANGER)
+# Timestamp reading terbaru per sensor (detik epoch) yang sudah diproses consumer alert
+alert_latest = {}
+# Event disimpan di luar thread MQTT; satu thread menjaga urutan event
+alert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="area-alerts")
+# Status terkonfirmasi per lokasi di worker API, dari event yang diterima lewat MQTT
+area_alert_status = {}
+
+# N menit terakhir per sensor; histori/agregat rentang terbaru dijawab tanpa SQL
+hot_store = HotStore(window_seconds=HOT_WINDOW_MINUTES * 60, max_bytes=HOT_STORE_MAX_MB * 1024 * 1024)
+HOT_STORE_ENABLED = API_ENABLED and HOT_WINDOW_MINUTES > 0
+
+# Respons /api/sensors, /api/readings/latest, dan histori per parameter query
+response_cache = ResponseCache(max_size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, settle=RESPONSE_CACHE_SETTLE)
+
+# Hasil downsample /api/readings/series per (sensor, metrik, rentang, resolusi)
+series_cache = downsample.SeriesCache(max_size=SERIES_CACHE_SIZE, ttl=SERIES_CACHE_TTL)
+
+def handle_ingest(payloads):
+    """Konsumsi ingest: masukkan reading satu pesan (tunggal atau batch) ke antrian"""
+    if len(payloads) == 1:
+        print(f"[Dashboard Service] Menerima data dari {payloads[0]['sensor_id']}")
     else:
-        print(f"[Dashboard Service] Gagal terhubung ke broker, rc: {rc}")
+        print(f"[Dashboard Service] Menerima batch {len(payloads)} reading dari {payloads[0]['sensor_id']}")
+    # Disimpan ke database per batch oleh pipeline ingest
+    for payload in payloads:
+        ingest_pipeline.submit(payload)
+
+def handle_broadcast(payloads):
+    """Konsumsi broadcast: perbarui state di memori dan kirim ke client /ws worker ini"""
+    # Hanya respons cache milik sensor yang menerima data baru yang dihapus;
+    # respons semua sensor memakai TTL pendek (RESPONSE_CACHE_SHARED_TTL)
+    tags = set()
+    for payload in payloads:
+        tags.add(f"sensor:{payload['sensor_id']}")
+        if payload['sensor_id'] not in latest_data:
+            tags.add("sensors")
+    response_cache.invalidate(tags)
+
+    for payload in payloads:
+        # Hot store menerima juga reading terlambat agar sama lengkapnya dengan database
+        if HOT_STORE_ENABLED:
+            add_to_hot_store(payload)
+
+        # Reading lama (replay spool sensor setelah reconnect) hanya disimpan ke
+        # database, tidak menimpa state terkini atau dikirim sebagai data live
+        current = latest_data.get(payload['sensor_id'])
+        if current is not None and payload['timestamp'] < (current.get('timestamp') or ''):
+            continue
 
-def on_message(client, userdata, message):
-    try:
-        payload = json.loads(message.payload.decode())
-        print(f"[Dashboard Service] Menerima data dari {payload['sensor_id']}")
-        
-        # Simpan ke database
-        save_to_database(payload)
-        
         # Update latest data untuk WebSocket
         latest_data[payload['sensor_id']] = payload
 
-        # Compute combined area status from latest readings
-        area_status, area_values = compute_combined_status()
+        # Update status area milik sensor ini saja (O(1))
+        location, area_status, area_values, _ = status_engine.update(payload)
 
-        # Prepare broadcast payload: include original payload and area status/values
-        broadcast_payload = {
-            "type": "telemetry",
-            "payload": payload,
-            "area_status": area_status,
-            "area_values": area_values
-        }
+        # Serahkan ke event loop server; pengiriman tidak menahan thread MQTT.
+        # Status area hanya dikirim sebagai event transisi, bukan setiap reading
+        manager.publish_threadsafe({"type": "telemetry", "payload": payload, "location": location})
 
-        # Broadcast ke WebSocket clients (non-blocking)
-        asyncio.run(manager.broadcast(broadcast_payload))
-        
+def add_to_hot_store(payload):
+    try:
+        timestamp = parse_timestamp(payload['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return
+    hot_store.add(
+        payload['sensor_id'], payload.get('location'), payload.get('sensor_type', 'unknown'),
+        timestamp, payload.get('data') or {}, payload.get('status'),
+    )
+
+EPOCH = datetime(1970, 1, 1)
+
+def datetime_epoch(value):
+    """datetime UTC naive -> detik epoch"""
+    return (value - EPOCH).total_seconds()
+
+def epoch_datetime(value):
+    """detik epoch -> datetime UTC naive"""
+    return EPOCH + timedelta(seconds=value)
+
+def handle_alerts(payloads, publisher):
+    """Konsumsi alert (proses ingest, aliran lengkap): transisi status area dan deteksi -> simpan dan publish"""
+    for payload in payloads:
+        try:
+            timestamp = parse_timestamp(payload['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        # Reading lama (replay spool) tidak mengubah status area terkini
+        if timestamp < alert_latest.get(payload['sensor_id'], timestamp):
+            continue
+        alert_latest[payload['sensor_id']] = timestamp
+        location, area_status, area_values, _ = alert_status_engine.update(payload)
+        event = track_area_alert(location, area_status, area_values, payload['timestamp'])
+        if event is not None:
+            alert_executor.submit(record_area_alert, event, publisher)
+        for detection in detect_anomalies(payload):
+            alert_executor.submit(record_detection, detection, publisher)
+
+def handle_area_alert(event):
+    """Event area_alert dari proses ingest: teruskan ke client /ws worker ini"""
+    area_alert_status[event["location"]] = event["area_status"]
+    manager.publish_threadsafe(event)
+
+def handle_detection(alert):
+    """Deteksi anomali dari proses ingest: teruskan ke client /ws worker ini"""
+    manager.publish_threadsafe({"type": "alert", "alert": alert})
+
+def track_area_alert(location, area_status, area_values, timestamp):
+    """Event area_alert jika status area berpindah (setelah debounce), atau None"""
+    try:
+        transition = alert_tracker.update(location, area_status, area_values, parse_timestamp(timestamp))
+    except (TypeError, ValueError):
+        return None
+    if transition is None:
+        return None
+    event = {
+        "type": "area_alert",
+        "location": location,
+        "previous_status": transition[0],
+        "area_status": transition[1],
+        "area_values": area_values,
+        "timestamp": timestamp,
+    }
+    return event
+
+def record_area_alert(event, publisher):
+    """Simpan event; hanya replika yang menyimpannya yang mem-publish ke worker API"""
+    if save_area_alert(event):
+        publisher.publish(MQTT_ALERT_TOPIC, event)
+
+def save_area_alert(event):
+    """Tambahkan event ke area_alerts; return False jika duplikat dari replika lain atau gagal"""
+    values = event["area_values"]
+    db = SessionLocal()
+    try:
+        stmt = dialect_insert(db, AreaAlert.__table__).values(
+            location=event["location"],
+            previous_status=event["previous_status"],
+            status=event["area_status"],
+            timestamp=epoch_datetime(parse_timestamp(event["timestamp"])),
+            temperature=values.get("temperature"),
+            humidity=values.get("humidity"),
+            smoke=values.get("smoke"),
+        ).on_conflict_do_nothing(index_elements=["location", "timestamp", "status"])
+        inserted = db.execute(stmt).rowcount == 1
+        db.commit()
+        return inserted
     except Exception as e:
-        print(f"[Dashboard Service] Error memproses pesan: {e}")
+        db.rollback()
+        print(f"[Dashboard Service] Error menyimpan alert: {e}")
+        return False
+    finally:
+        db.close()
 
-def save_to_database(payload):
-    """Simpan data telemetri ke database"""
+def record_detection(alert, publisher):
+    """Simpan deteksi; hanya replika yang menyimpannya yang mem-publish ke worker API"""
+    if save_detection(alert):
+        publisher.publish(MQTT_DETECTION_TOPIC, alert)
+
+def save_detection(alert):
+    """Tambahkan deteksi ke sensor_detections; return False jika duplikat dari replika lain atau gagal"""
     db = SessionLocal()
     try:
-        # Cari atau buat sensor node
-        sensor = db.query(SensorNode).filter(
-            SensorNode.sensor_id_string == payload['sensor_id']
-        ).first()
-        
-        if not sensor:
-            sensor = SensorNode(
-                sensor_id_string=payload['sensor_id'],
-                location=payload['location']
-            )
-            db.add(sensor)
-            db.commit()
-            db.refresh(sensor)
-        
-        # Simpan reading dengan data yang relevan sesuai sensor_type
-        reading_data = {
-            "node_id": sensor.id,
-            "sensor_type": payload.get('sensor_type', 'unknown'),
-            "timestamp": datetime.strptime(payload['timestamp'], "%Y-%m-%dT%H:%M:%SZ"),
-            "status": payload.get('status', 'unknown'),
-            "temperature": payload['data'].get('temperature'),
-            "humidity": payload['data'].get('humidity'),
-            "smoke": payload['data'].get('smoke')
-        }
-        
-        reading = TelemetryReading(**reading_data)
-        db.add(reading)
+        stmt = dialect_insert(db, SensorDetection.__table__).values(
+            sensor_id=alert["sensor_id"],
+            location=alert.get("location"),
+            metric=alert["metric"],
+            kind=alert["kind"],
+            severity=alert["severity"],
+            value=alert.get("value"),
+            score=alert.get("score"),
+            timestamp=epoch_datetime(parse_timestamp(alert["timestamp"])),
+        ).on_conflict_do_nothing(index_elements=["sensor_id", "metric", "kind", "timestamp"])
+        inserted = db.execute(stmt).rowcount == 1
         db.commit()
-        
+        return inserted
     except Exception as e:
-        print(f"[Dashboard Service] Error menyimpan ke database: {e}")
         db.rollback()
+        print(f"[Dashboard Service] Error menyimpan deteksi: {e}")
+        return False
     finally:
         db.close()
 
+def load_alert_state():
+    """Status terkonfirmasi per lokasi dari event terakhir di area_alerts (tracker dan worker API)"""
+    db = SessionLocal()
+    try:
+        latest = (
+            select(AreaAlert.location, func.max(AreaAlert.id).label("id"))
+            .group_by(AreaAlert.location)
+            .subquery()
+        )
+        rows = db.execute(
+            select(AreaAlert.location, AreaAlert.status).join(latest, AreaAlert.id == latest.c.id)
+        ).all()
+        if INGEST_ENABLED:
+            alert_tracker.seed(dict(rows))
+        area_alert_status.update(rows)
+    finally:
+        db.close()
 
-def compute_combined_status():
-    """Compute combined status using latest_data values.
+def area_alert_to_dict(alert):
+    return {
+        "id": alert.id,
+        "location": alert.location,
+        "previous_status": alert.previous_status,
+        "area_status": alert.status,
+        "timestamp": alert.timestamp.isoformat(),
+        "area_values": {
+            "temperature": alert.temperature,
+            "humidity": alert.humidity,
+            "smoke": alert.smoke,
+        },
+    }
 
-    Rules (as provided):
-    if (S >= S_dang) then DANGER
-    else if (T >= 35 and H < 40) then DANGER
-    else if (S >= S_warn and S < S_dang) then WARNING
-    else if (T >= 30 and T < 35 and H >= 40 and H < 70) then WARNING
-    else NORMAL
-    """
-    # Gather latest values
-    T = None
-    H = None
-    S = None
-    latest_timestamp = None
-
-    for sensor_id, p in latest_data.items():
-        data = p.get('data', {})
-        if 'temperature' in data and data['temperature'] is not None:
-            T = float(data['temperature'])
-            latest_timestamp = p.get('timestamp', latest_timestamp)
-        if 'humidity' in data and data['humidity'] is not None:
-            H = float(data['humidity'])
-            latest_timestamp = p.get('timestamp', latest_timestamp)
-        if 'smoke' in data and data['smoke'] is not None:
-            S = float(data['smoke'])
-            latest_timestamp = p.get('timestamp', latest_timestamp)
-
-    # Default status
-    status = 'NORMAL'
+def detect_anomalies(payload):
+    """Jalankan detektor streaming untuk satu reading; return deteksi beserta konteks sensor"""
+    try:
+        timestamp = parse_timestamp(payload['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return []
+    alerts = detection_engine.update(payload['sensor_id'], timestamp, payload.get('data') or {})
+    for alert in alerts:
+        DETECTIONS.labels(alert["metric"], alert["kind"]).inc()
+        alert.update(
+            location=payload.get('location'),
+            sensor_type=payload.get('sensor_type'),
+            timestamp=payload['timestamp'],
+        )
+    return alerts
+
+def parse_reading(payload):
+    """Ubah payload MQTT menjadi kolom TelemetryReading (tanpa node_id)"""
+    data = payload.get('data', {})
+    return {
+        "sensor_type": payload.get('sensor_type', 'unknown'),
+        "timestamp": epoch_datetime(parse_timestamp(payload['timestamp'])),
+        "status": payload.get('status', 'unknown'),
+        "temperature": data.get('temperature'),
+        "humidity": data.get('humidity'),
+        "smoke": data.get('smoke')
+    }
+
+def save_batch_to_database(payloads):
+    """Simpan satu batch data telemetri dalam satu transaksi dan satu INSERT multi-row"""
+    parsed = []
+    with INGEST_STAGE_SECONDS.labels("parse").time():
+        for payload in payloads:
+            try:
+                parsed.append((payload['sensor_id'], payload.get('location'), parse_reading(payload)))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"[Dashboard Service] Payload tidak valid, dilewati: {e}")
+    if not parsed:
+        return
 
     try:
-        if S is not None and S >= SMOKE_DANGER:
-            status = 'DANGER'
-        elif T is not None and H is not None and (T >= 35 and H < 40):
-            status = 'DANGER'
-        elif S is not None and S >= SMOKE_WARNING and S < SMOKE_DANGER:
-            status = 'WARNING'
-        elif T is not None and (T >= 30 and T < 35) and H is not None and (H >= 40 and H < 70):
-            status = 'WARNING'
-        else:
-            status = 'NORMAL'
+        write_parsed_batch(parsed)
+    except IntegrityError as e:
+        if not is_missing_partition(e):
+            raise
+        # Partisi di-drop proses lain (arsip/retention) setelah dicatat di cache
+        partition_manager.forget()
+        write_parsed_batch(parsed)
+
+def write_parsed_batch(parsed):
+    """Tulis reading (sensor_id, lokasi, reading) yang sudah diparse dalam satu transaksi"""
+    db = SessionLocal()
+    try:
+        # Resolve sensor node dari cache; node baru dibuat dengan satu upsert
+        with INGEST_STAGE_SECONDS.labels("resolve_nodes").time():
+            locations = {}
+            for sensor_id, location, _ in parsed:
+                locations.setdefault(sensor_id, location)
+            node_ids = node_cache.resolve(db, locations)
+
+        rows = [
+            dict(reading, node_id=node_ids[sensor_id])
+            for sensor_id, _, reading in parsed
+        ]
+        with INGEST_STAGE_SECONDS.labels("insert").time():
+            # Timestamp di luar partisi yang ada (jam sensor melenceng, replay)
+            partition_manager.ensure_partitions(row["timestamp"] for row in rows)
+            db.execute(insert(TelemetryReading), rows)
+        with INGEST_STAGE_SECONDS.labels("sensor_latest").time():
+            upsert_sensor_latest(db, rows)
+        with INGEST_STAGE_SECONDS.labels("rollup").time():
+            for seconds, model in ROLLUP_TABLES:
+                rollups.upsert_rollups(db, model, rows, seconds)
+        with INGEST_STAGE_SECONDS.labels("commit").time():
+            db.commit()
+
     except Exception:
-        status = 'NORMAL'
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
-    area_values = {"temperature": T, "humidity": H, "smoke": S, "timestamp": latest_timestamp}
-    return status, area_values
+def upsert_sensor_latest(db, rows):
+    """Perbarui sensor_latest dengan reading terbaru per node dari satu batch"""
+    newest = {}
+    for row in rows:
+        current = newest.get(row["node_id"])
+        if current is None or row["timestamp"] >= current["timestamp"]:
+            newest[row["node_id"]] = row
 
-@app.get("/api/status")
-async def get_area_status():
-    """Ambil status area gabungan berdasarkan pembacaan terbaru"""
-    status, values = compute_combined_status()
-    return {"area_status": status, "area_values": values}
+    # Urutan key yang tetap mencegah deadlock antar replika
+    values = [newest[node_id] for node_id in sorted(newest)]
+    stmt = dialect_insert(db, SensorLatest.__table__).values(values)
+    columns = ("sensor_type", "timestamp", "temperature", "humidity", "smoke", "status")
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SensorLatest.node_id],
+        set_={column: stmt.excluded[column] for column in columns},
+        # Pesan yang datang terlambat tidak menimpa data yang lebih baru
+        where=stmt.excluded.timestamp >= SensorLatest.timestamp,
+    )
+    db.execute(stmt)
 
-def start_mqtt_client():
-    """Jalankan MQTT client di background thread"""
-    global mqtt_client
-    mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="dashboard_service")
-    mqtt_client.on_connect = on_connect
-    mqtt_client.on_message = on_message
-    
+def save_to_database(payload):
+    """Simpan satu data telemetri ke database (tanpa antrian)"""
     try:
-        mqtt_client.connect(MQTT_BROKER_HOST, MQTT_BROKER_PORT, keepalive=60)
-        mqtt_client.loop_forever()
+        save_batch_to_database([payload])
     except Exception as e:
-        print(f"[Dashboard Service] Error MQTT: {e}")
+        print(f"[Dashboard Service] Error menyimpan ke database: {e}")
+
+# Pipeline tulis batch; flush dijalankan di thread terpisah dari loop MQTT
+ingest_pipeline = IngestPipeline(
+    save_batch_to_database,
+    batch_size=INGEST_BATCH_SIZE,
+    flush_interval=INGEST_FLUSH_INTERVAL,
+    max_queue_size=INGEST_QUEUE_SIZE,
+    put_timeout=INGEST_PUT_TIMEOUT,
+    # Koneksi putus, deadlock/serialization failure, dan pool habis
+    transient_errors=(OperationalError, InterfaceError, SQLAlchemyTimeoutError),
+    max_retries=INGEST_MAX_RETRIES,
+)
+
+def compute_combined_status(location=None):
+    """Status area (status, area_values) dari status engine.
+
+    Tanpa ``location``, status terburuk dari semua area. Aturan ada di
+    status_engine.evaluate_status.
+    """
+    if location is None:
+        return status_engine.overall()
+    result = status_engine.get(location)
+    if result is None:
+        return 'NORMAL', {"temperature": None, "humidity": None, "smoke": None, "timestamp": None}
+    return result
 
-# Start MQTT client di background thread
-mqtt_thread = threading.Thread(target=start_mqtt_client, daemon=True)
-mqtt_thread.start()
+@app.get("/api/status")
+async def get_area_status(location: Optional[str] = None):
+    """Ambil status area berdasarkan pembacaan terbaru.
+
+    Dengan ``location``, status area tersebut; tanpa parameter, status
+    terburuk dari semua area.
+    """
+    status, values = compute_combined_status(location)
+    return {"area_status": status, "area_values": values}
+
+@app.get("/api/status/all")
+async def get_all_area_status():
+    """Status setiap area (lokasi) beserta sensor sumber nilainya"""
+    return status_engine.all()
+
+@app.get("/api/alerts")
+async def get_area_alerts(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    location: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 100,
+):
+    """Event transisi status area, terbaru dulu.
+
+    ``from``/``to`` membatasi rentang timestamp reading pemicu; ``status``
+    memfilter status tujuan (NORMAL, WARNING, DANGER). ``active`` berisi
+    lokasi yang saat ini berstatus WARNING/DANGER setelah debounce.
+    """
+    stmt = select(AreaAlert).order_by(AreaAlert.timestamp.desc(), AreaAlert.id.desc())
+    if from_ is not None:
+        stmt = stmt.where(AreaAlert.timestamp >= from_)
+    if to is not None:
+        stmt = stmt.where(AreaAlert.timestamp < to)
+    if location is not None:
+        stmt = stmt.where(AreaAlert.location == location)
+    if status is not None:
+        stmt = stmt.where(AreaAlert.status == status.upper())
+    async with AsyncSessionLocal() as db:
+        alerts = (await db.execute(stmt.limit(limit))).scalars().all()
+    return {
+        "active": {location: status for location, status in area_alert_status.items() if status != 'NORMAL'},
+        "alerts": [area_alert_to_dict(alert) for alert in alerts],
+    }
+
+@app.get("/api/detection")
+async def get_detection_state(sensor_id: Optional[str] = None, limit: int = 50):
+    """Deteksi terbaru dari sensor_detections, plus statistik window per sensor dan metrik.
+
+    Detektor berjalan di proses ingest; di worker ``SERVICE_ROLE=api``
+    ``sensors`` kosong dan hanya ``recent`` yang terisi.
+    """
+    stmt = select(SensorDetection).order_by(SensorDetection.timestamp.desc(), SensorDetection.id.desc())
+    if sensor_id is not None:
+        stmt = stmt.where(SensorDetection.sensor_id == sensor_id)
+    async with AsyncSessionLocal() as db:
+        recent = (await db.execute(stmt.limit(limit))).scalars().all()
+    return {
+        "detections": detection_engine.detections,
+        "sensors": detection_engine.snapshot(sensor_id),
+        "recent": [detection_to_dict(detection) for detection in recent],
+    }
+
+def detection_to_dict(detection):
+    """Format satu baris sensor_detections seperti frame alert /ws"""
+    return {
+        "sensor_id": detection.sensor_id,
+        "location": detection.location,
+        "metric": detection.metric,
+        "kind": detection.kind,
+        "severity": detection.severity,
+        "value": detection.value,
+        "score": detection.score,
+        "timestamp": detection.timestamp.isoformat(),
+    }
+
+def start_ingest():
+    """Jalankan pipeline ingest, maintenance partisi, dan consumer shared subscription"""
+    ingest_pipeline.start()
+    partition_manager.start(PARTITION_MAINTENANCE_INTERVAL)
+    telemetry_archive.start(ARCHIVE_INTERVAL)
+    consumer = MqttConsumer(
+        MQTT_BROKER_HOST, MQTT_BROKER_PORT, handle_ingest, name="ingest",
+        telemetry_prefix=shared_prefix(MQTT_SHARED_GROUP),
+    )
+    mqtt_consumers.append(consumer)
+    consumer.start()
+    start_alerts()
+
+def start_alerts():
+    """Consumer non-shared di proses ingest: status area butuh semua reading tiap lokasi.
+
+    Dengan beberapa replika ingest setiap replika menghitung event yang sama;
+    unique constraint area_alerts memastikan hanya satu yang menyimpan dan
+    mem-publish-nya.
+    """
+    consumer = MqttConsumer(
+        MQTT_BROKER_HOST, MQTT_BROKER_PORT, lambda payloads: handle_alerts(payloads, consumer), name="alerts",
+    )
+    mqtt_consumers.append(consumer)
+    consumer.start()
+
+def start_broadcast():
+    """Consumer non-shared: setiap worker API menerima semua pesan untuk client /ws-nya"""
+    consumer = MqttConsumer(
+        MQTT_BROKER_HOST, MQTT_BROKER_PORT, handle_broadcast, name="api",
+        event_handlers={MQTT_ALERT_TOPIC: handle_area_alert, MQTT_DETECTION_TOPIC: handle_detection},
+    )
+    mqtt_consumers.append(consumer)
+    consumer.start()
+
+def stop_consumers():
+    """Hentikan consumer MQTT lalu flush sisa antrian ingest"""
+    while mqtt_consumers:
+        mqtt_consumers.pop().stop()
+    # Tunggu event alert yang masih antri tersimpan
+    alert_executor.submit(lambda: None).result()
+    ingest_pipeline.stop()
+    partition_manager.stop()
+    telemetry_archive.stop()
+
+@app.on_event("startup")
+async def bind_websocket_loop():
+    manager.bind_loop(asyncio.get_running_loop())
+
+@app.on_event("shutdown")
+async def stop_ingest_pipeline():
+    """Flush sisa antrian ingest sebelum proses berhenti"""
+    await asyncio.to_thread(stop_consumers)
+    await async_engine.dispose()
+    mark_process_dead()
 
 # API Endpoints
 @app.get("/")
 async def root():
     return {"message": "Forest Fire Monitoring API", "status": "running"}
 
+@app.get("/api/ingest/metrics")
+async def get_ingest_metrics():
+    """Metrik pipeline ingest: kedalaman antrian dan latensi flush"""
+    metrics = ingest_pipeline.metrics()
+    metrics["role"] = SERVICE_ROLE
+    metrics["pid"] = os.getpid()
+    metrics["mqtt"] = [consumer.metrics() for consumer in mqtt_consumers]
+    metrics["node_cache"] = node_cache.metrics()
+    metrics["websocket"] = manager.metrics()
+    metrics["hot_store"] = hot_store.metrics()
+    metrics["archive"] = telemetry_archive.metrics()
+    metrics["response_cache"] = response_cache.metrics()
+    return metrics
+
+@app.get("/metrics")
+async def get_metrics():
+    """Metrik Prometheus: latensi per tahap pipeline, throughput, dan antrian"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (value.strip().removeprefix("W/") for value in header.split(","))
+
+async def cached_json(request, tags, build, ttl=None):
+    """Respons JSON dari response_cache, atau 304 jika ETag client masih sama.
+
+    ``build`` (async) dipanggil saat miss dan mengembalikan (isi, header tambahan).
+    """
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    entry = response_cache.get(key)
+    if entry is None:
+        started = time.monotonic()
+        content, headers = await build()
+        entry = response_cache.put(key, json.dumps(content).encode(), tags, headers, started, ttl)
+    headers = dict(entry.headers, ETag=entry.etag)
+    headers["Cache-Control"] = "no-cache"
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
 @app.get("/api/sensors")
-async def get_sensors():
+async def get_sensors(request: Request):
     """Ambil daftar semua sensor"""
+    async def build():
+        async with AsyncSessionLocal() as db:
+            sensors = (await db.execute(select(SensorNode).order_by(SensorNode.id))).scalars().all()
+            return [
+                {
+                    "id": s.id,
+                    "sensor_id": s.sensor_id_string,
+                    "location": s.location,
+                    "created_at": s.created_at.isoformat()
+                }
+                for s in sensors
+            ], None
+    return await cached_json(request, {"sensors"}, build)
+
+def reading_to_dict(sensor, reading):
+    """Format satu reading untuk response API"""
+    result = {
+        "sensor_id": sensor.sensor_id_string,
+        "location": sensor.location,
+        "timestamp": reading.timestamp.isoformat(),
+        "status": reading.status,
+        "sensor_type": reading.sensor_type,
+        "data": {}
+    }
+
+    # Add data fields yang relevan
+    if reading.temperature is not None:
+        result["data"]["temperature"] = reading.temperature
+    if reading.humidity is not None:
+        result["data"]["humidity"] = reading.humidity
+    if reading.smoke is not None:
+        result["data"]["smoke"] = reading.smoke
+
+    return result
+
+def query_latest_readings(db):
+    """Reading terbaru untuk setiap sensor dalam satu query.
+
+    PostgreSQL memakai LATERAL join: satu index seek mundur pada
+    ix_telemetry_readings_node_ts per sensor, tidak bergantung ukuran tabel.
+    Dialect lain memakai subquery berkorelasi dengan index yang sama.
+    """
+    newest_first = TelemetryReading.timestamp.desc()
+    if db.get_bind().dialect.name == "postgresql":
+        latest = (
+            select(TelemetryReading)
+            .where(TelemetryReading.node_id == SensorNode.id)
+            .order_by(newest_first)
+            .limit(1)
+            .lateral("latest")
+        )
+        reading = aliased(TelemetryReading, latest)
+        stmt = select(SensorNode, reading).join(latest, true())
+    else:
+        inner = aliased(TelemetryReading)
+        latest_id = (
+            select(inner.id)
+            .where(inner.node_id == SensorNode.id)
+            .order_by(inner.timestamp.desc())
+            .limit(1)
+            .correlate(SensorNode)
+            .scalar_subquery()
+        )
+        stmt = select(SensorNode, TelemetryReading).join(
+            TelemetryReading, TelemetryReading.id == latest_id
+        )
+    return db.execute(stmt.order_by(SensorNode.id)).all()
+
+def load_hot_store():
+    """Isi hot store dengan reading jendela terakhir dari database"""
+    since = datetime.utcnow() - timedelta(seconds=hot_store.window_seconds)
     db = SessionLocal()
     try:
-        sensors = db.query(SensorNode).all()
-        return [
-            {
-                "id": s.id,
-                "sensor_id": s.sensor_id_string,
-                "location": s.location,
-                "created_at": s.created_at.isoformat()
-            }
-            for s in sensors
-        ]
+        result = db.execute(
+            select(
+                SensorNode.sensor_id_string, SensorNode.location, TelemetryReading.sensor_type,
+                TelemetryReading.timestamp, TelemetryReading.temperature, TelemetryReading.humidity,
+                TelemetryReading.smoke, TelemetryReading.status,
+            )
+            .join(SensorNode, TelemetryReading.node_id == SensorNode.id)
+            .where(TelemetryReading.timestamp >= since)
+            .order_by(TelemetryReading.timestamp)
+            .execution_options(yield_per=HISTORY_EXPORT_CHUNK)
+        )
+        count = 0
+        for sensor_id, location, sensor_type, timestamp, temperature, humidity, smoke, status in result:
+            data = {"temperature": temperature, "humidity": humidity, "smoke": smoke}
+            hot_store.add(sensor_id, location, sensor_type, datetime_epoch(timestamp), data, status)
+            count += 1
+        hot_store.mark_complete_since(datetime_epoch(since))
+        print(f"[Dashboard Service] Hot store diisi {count} reading sejak {since.isoformat()}")
     finally:
         db.close()
 
-@app.get("/api/sensors/{sensor_id}/latest")
-async def get_latest_reading(sensor_id: str):
-    """Ambil data terbaru dari sensor tertentu"""
+def load_sensor_latest():
+    """Isi sensor_latest dari histori jika masih kosong, lalu warm latest_data"""
     db = SessionLocal()
     try:
-        sensor = db.query(SensorNode).filter(
-            SensorNode.sensor_id_string == sensor_id
-        ).first()
-        
-        if not sensor:
-            return {"error": "Sensor not found"}
-        
-        reading = db.query(TelemetryReading).filter(
-            TelemetryReading.node_id == sensor.id
-        ).order_by(TelemetryReading.timestamp.desc()).first()
-        
-        if not reading:
-            return {"error": "No readings found"}
-        
-        result = {
-            "sensor_id": sensor.sensor_id_string,
-            "location": sensor.location,
-            "timestamp": reading.timestamp.isoformat(),
-            "status": reading.status,
-            "sensor_type": reading.sensor_type,
-            "data": {}
-        }
-        
-        # Add data fields yang relevan
-        if reading.temperature is not None:
-            result["data"]["temperature"] = reading.temperature
-        if reading.humidity is not None:
-            result["data"]["humidity"] = reading.humidity
-        if reading.smoke is not None:
-            result["data"]["smoke"] = reading.smoke
-        
-        return result
+        if db.query(SensorLatest.node_id).first() is None:
+            rows = [
+                {
+                    "node_id": sensor.id,
+                    "sensor_type": reading.sensor_type,
+                    "timestamp": reading.timestamp,
+                    "temperature": reading.temperature,
+                    "humidity": reading.humidity,
+                    "smoke": reading.smoke,
+                    "status": reading.status,
+                }
+                for sensor, reading in query_latest_readings(db)
+            ]
+            if rows:
+                upsert_sensor_latest(db, rows)
+                db.commit()
+                print(f"[Dashboard Service] sensor_latest diisi dari histori ({len(rows)} sensor)")
+
+        rows = db.execute(
+            select(SensorNode, SensorLatest)
+            .join(SensorLatest, SensorLatest.node_id == SensorNode.id)
+        ).all()
+        for sensor, reading in rows:
+            payload = reading_to_dict(sensor, reading)
+            # Jangan timpa data yang sudah masuk dari MQTT sejak startup
+            if sensor.sensor_id_string not in latest_data:
+                latest_data[sensor.sensor_id_string] = payload
+                status_engine.update(payload)
+            if INGEST_ENABLED and sensor.sensor_id_string not in alert_latest:
+                # Dibandingkan sebagai epoch: isoformat() database tanpa akhiran Z
+                alert_latest[sensor.sensor_id_string] = datetime_epoch(reading.timestamp)
+                alert_status_engine.update(payload)
     finally:
         db.close()
 
+@app.on_event("startup")
+def warm_latest_data():
+    if not INGEST_ENABLED:
+        wait_for_schema()
+    load_sensor_latest()
+    load_alert_state()
+    if HOT_STORE_ENABLED:
+        load_hot_store()
+
+@app.on_event("startup")
+def start_mqtt_consumers():
+    """Consumer MQTT dimulai per worker setelah state di memori di-warm"""
+    if INGEST_ENABLED:
+        start_ingest()
+    if API_ENABLED:
+        start_broadcast()
+
+@app.get("/api/sensors/{sensor_id}/latest")
+async def get_latest_reading(request: Request, sensor_id: str):
+    """Ambil data terbaru dari sensor tertentu"""
+    async def build():
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(SensorNode, SensorLatest)
+                .outerjoin(SensorLatest, SensorLatest.node_id == SensorNode.id)
+                .where(SensorNode.sensor_id_string == sensor_id)
+            )).first()
+
+        if not row:
+            return {"error": "Sensor not found"}, None
+
+        sensor, reading = row
+        if not reading:
+            return {"error": "No readings found"}, None
+
+        return reading_to_dict(sensor, reading), None
+    return await cached_json(request, {f"sensor:{sensor_id}"}, build)
+
 @app.get("/api/readings/latest")
-async def get_all_latest_readings():
+async def get_all_latest_readings(request: Request):
     """Ambil data terbaru dari semua sensor"""
-    db = SessionLocal()
+    async def build():
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(SensorNode, SensorLatest)
+                .join(SensorLatest, SensorLatest.node_id == SensorNode.id)
+                .order_by(SensorNode.id)
+            )).all()
+        return [reading_to_dict(sensor, reading) for sensor, reading in rows], None
+    return await cached_json(request, (), build, RESPONSE_CACHE_SHARED_TTL)
+
+def encode_cursor(reading):
+    """Cursor keyset dari (timestamp, id) reading terakhir di halaman"""
+    raw = f"{reading.timestamp.isoformat()}|{reading.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
     try:
-        sensors = db.query(SensorNode).all()
-        results = []
-        
-        for sensor in sensors:
-            reading = db.query(TelemetryReading).filter(
-                TelemetryReading.node_id == sensor.id
-            ).order_by(TelemetryReading.timestamp.desc()).first()
-            
-            if reading:
-                result = {
-                    "sensor_id": sensor.sensor_id_string,
-                    "location": sensor.location,
-                    "timestamp": reading.timestamp.isoformat(),
-                    "status": reading.status,
-                    "sensor_type": reading.sensor_type,
-                    "data": {}
-                }
-                
-                # Add data fields yang relevan
-                if reading.temperature is not None:
-                    result["data"]["temperature"] = reading.temperature
-                if reading.humidity is not None:
-                    result["data"]["humidity"] = reading.humidity
-                if reading.smoke is not None:
-                    result["data"]["smoke"] = reading.smoke
-                
-                results.append(result)
-        
-        return results
-    finally:
-        db.close()
+        timestamp, reading_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(reading_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor tidak valid")
+
+def history_query(from_=None, to=None, sensor_id=None, sensor_type=None, cursor=None):
+    """SELECT histori (terbaru dulu, urut timestamp, id) dengan filter opsional"""
+    stmt = select(TelemetryReading, SensorNode).join(
+        SensorNode, TelemetryReading.node_id == SensorNode.id
+    )
+    if from_ is not None:
+        stmt = stmt.where(TelemetryReading.timestamp >= from_)
+    if to is not None:
+        stmt = stmt.where(TelemetryReading.timestamp < to)
+    if sensor_id is not None:
+        stmt = stmt.where(SensorNode.sensor_id_string == sensor_id)
+    if sensor_type is not None:
+        stmt = stmt.where(TelemetryReading.sensor_type == sensor_type)
+    if cursor is not None:
+        timestamp, reading_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            # Batas timestamp terpisah agar partition pruning tetap berlaku
+            TelemetryReading.timestamp <= timestamp,
+            tuple_(TelemetryReading.timestamp, TelemetryReading.id) < tuple_(timestamp, reading_id),
+        )
+    return stmt.order_by(TelemetryReading.timestamp.desc(), TelemetryReading.id.desc())
+
+CSV_COLUMNS = ("sensor_id", "location", "timestamp", "status", "sensor_type", "temperature", "humidity", "smoke")
+
+async def stream_history(stmt, fmt):
+    """Generator export NDJSON/CSV dengan server-side cursor (memori konstan)"""
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=HISTORY_EXPORT_CHUNK))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(CSV_COLUMNS)
+        async for rows in result.partitions():
+            if fmt == "csv":
+                for reading, sensor in rows:
+                    writer.writerow((
+                        sensor.sensor_id_string, sensor.location, reading.timestamp.isoformat(),
+                        reading.status, reading.sensor_type,
+                        reading.temperature, reading.humidity, reading.smoke,
+                    ))
+                chunk = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                chunk = "".join(
+                    json.dumps(reading_to_dict(sensor, reading)) + "\n"
+                    for reading, sensor in rows
+                )
+            yield chunk
+            # Lepas objek ORM yang sudah dikirim
+            db.expunge_all()
+        if fmt == "csv" and buffer.getvalue():
+            yield buffer.getvalue()
+
+def stream_archive(fmt, **filters):
+    """Generator export NDJSON/CSV dari arsip Parquet (per batch)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(CSV_COLUMNS)
+    for rows in telemetry_archive.stream(**filters):
+        if fmt == "csv":
+            for row in rows:
+                writer.writerow(tuple(
+                    row[column].isoformat() if column == "timestamp" else row[column]
+                    for column in CSV_COLUMNS
+                ))
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            chunk = "".join(json.dumps(archived_reading_to_dict(row)) + "\n" for row in rows)
+        yield chunk
 
 @app.get("/api/readings/history")
-async def get_readings_history(limit: int = 100):
-    """Ambil data historis dari semua sensor"""
-    db = SessionLocal()
-    try:
-        readings = db.query(TelemetryReading, SensorNode).join(
-            SensorNode
-        ).order_by(TelemetryReading.timestamp.desc()).limit(limit).all()
-        
-        results = []
-        for reading, sensor in readings:
-            result = {
-                "sensor_id": sensor.sensor_id_string,
-                "location": sensor.location,
-                "timestamp": reading.timestamp.isoformat(),
-                "status": reading.status,
-                "sensor_type": reading.sensor_type,
-                "data": {}
+async def get_readings_history(
+    request: Request,
+    limit: Optional[int] = None,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    sensor_id: Optional[str] = None,
+    sensor_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    format: str = "json",
+    archive: bool = False,
+):
+    """Ambil data historis, terbaru dulu.
+
+    ``format=json`` (default, limit 100) mengembalikan satu halaman; jika masih
+    ada data, header ``X-Next-Cursor`` berisi cursor untuk halaman berikutnya.
+    ``format=ndjson``/``csv`` men-stream seluruh hasil filter (limit opsional).
+    ``from``/``to`` membatasi partisi yang dipindai PostgreSQL. Halaman pertama
+    yang seluruhnya ada di hot store (rentang terbaru) dijawab tanpa database.
+    ``archive=true`` membaca arsip Parquet (tanpa cursor; persempit ``from``/``to``).
+    """
+    if format not in ("json", "ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format harus json, ndjson, atau csv")
+    if archive:
+        filters = {"from_": from_, "to": to, "sensor_id": sensor_id, "sensor_type": sensor_type}
+        if format != "json":
+            return StreamingResponse(
+                stream_archive(format, limit=limit, **filters),
+                media_type="text/csv" if format == "csv" else "application/x-ndjson",
+                headers={"Content-Disposition": f"attachment; filename=archive.{format}"},
+            )
+        return await asyncio.to_thread(telemetry_archive.history, limit=100 if limit is None else limit, **filters)
+    stmt = history_query(from_, to, sensor_id, sensor_type, cursor)
+
+    if format != "json":
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+        return StreamingResponse(
+            stream_history(stmt, format),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename=readings.{format}"},
+        )
+
+    limit = 100 if limit is None else limit
+
+    async def build():
+        if (cursor is None and from_ is not None and HOT_STORE_ENABLED
+                and hot_store.covers(datetime_epoch(from_), sensor_id)):
+            readings = hot_store.history(
+                datetime_epoch(from_), datetime_epoch(to) if to is not None else math.inf,
+                sensor_id, sensor_type, limit,
+            )
+            if readings is not None:
+                return readings, None
+
+        headers = None
+        async with AsyncSessionLocal() as db:
+            readings = (await db.execute(stmt.limit(limit + 1))).all()
+        if len(readings) > limit:
+            readings = readings[:limit]
+            headers = {"X-Next-Cursor": encode_cursor(readings[-1][0])}
+        return [reading_to_dict(sensor, reading) for reading, sensor in readings], headers
+
+    if sensor_id:
+        return await cached_json(request, {f"sensor:{sensor_id}"}, build)
+    return await cached_json(request, (), build, RESPONSE_CACHE_SHARED_TTL)
+
+@app.get("/api/readings/aggregate")
+async def get_readings_aggregate(
+    sensor_id: str,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    bucket: str = "auto",
+    archive: bool = False,
+):
+    """Agregat min/max/avg/count per bucket dari tabel rollup.
+
+    Tabel sumber adalah rollup paling kasar yang ukurannya membagi habis
+    bucket yang diminta, sehingga grafik 30 hari hanya membaca ~720 baris 1 jam.
+    ``archive=true`` menghitung agregat dari reading mentah di arsip Parquet.
+    """
+    to = to or datetime.utcnow()
+    from_ = from_ or to - timedelta(days=1)
+    if bucket == "auto":
+        bucket = rollups.choose_bucket(from_, to, AGGREGATE_MAX_POINTS)
+    if bucket not in rollups.BUCKET_SIZES:
+        return {"error": f"Bucket tidak dikenal, pilih salah satu: auto, {', '.join(rollups.BUCKET_SIZES)}"}
+    bucket_seconds = rollups.BUCKET_SIZES[bucket]
+    model = next(model for seconds, model in ROLLUP_TABLES if bucket_seconds % seconds == 0)
+
+    start = rollups.bucket_start(from_, bucket_seconds)
+    if archive:
+        location, buckets = await asyncio.to_thread(telemetry_archive.aggregate, sensor_id, start, to, bucket_seconds)
+        return {
+            "sensor_id": sensor_id,
+            "location": location,
+            "bucket": bucket,
+            "source": "archive",
+            "from": start.isoformat(),
+            "to": to.isoformat(),
+            "buckets": [rollups.format_bucket(key, buckets[key]) for key in sorted(buckets)],
+        }
+    if HOT_STORE_ENABLED and hot_store.covers(datetime_epoch(start), sensor_id):
+        result = hot_store.aggregate(sensor_id, datetime_epoch(start), datetime_epoch(to), bucket_seconds)
+        if result is not None:
+            window, buckets = result
+            return {
+                "sensor_id": window.sensor_id,
+                "location": window.location,
+                "bucket": bucket,
+                "source": "hot_store",
+                "from": start.isoformat(),
+                "to": to.isoformat(),
+                "buckets": [rollups.format_bucket(key, buckets[key]) for key in sorted(buckets)],
             }
-            
-            # Add data fields yang relevan
-            if reading.temperature is not None:
-                result["data"]["temperature"] = reading.temperature
-            if reading.humidity is not None:
-                result["data"]["humidity"] = reading.humidity
-            if reading.smoke is not None:
-                result["data"]["smoke"] = reading.smoke
-            
-            results.append(result)
-        
-        return results
-    finally:
-        db.close()
+    async with AsyncSessionLocal() as db:
+        sensor = (await db.execute(
+            select(SensorNode).where(SensorNode.sensor_id_string == sensor_id)
+        )).scalars().first()
+        if not sensor:
+            return {"error": "Sensor not found"}
+
+        rows = (await db.execute(
+            select(model)
+            .where(model.node_id == sensor.id, model.bucket >= start, model.bucket < to)
+            .order_by(model.bucket)
+        )).scalars().all()
+
+    buckets = rollups.rebucket(rows, bucket_seconds)
+    return {
+        "sensor_id": sensor.sensor_id_string,
+        "location": sensor.location,
+        "bucket": bucket,
+        "source": model.__tablename__,
+        "from": start.isoformat(),
+        "to": to.isoformat(),
+        "buckets": [rollups.format_bucket(key, buckets[key]) for key in sorted(buckets)],
+    }
+
+def series_source(step):
+    """Rollup terkasar yang bucket-nya tidak lebih lebar dari satu bucket piksel"""
+    for seconds, model in ROLLUP_TABLES:
+        if step >= seconds:
+            return model
+    return TelemetryReading
+
+def series_statement(model, node_id, start, end, metrics):
+    """SELECT (detik epoch, kolom metrik...) urut waktu; epoch dihitung di database"""
+    if model is TelemetryReading:
+        columns = [getattr(model, metric) for metric in metrics]
+        time_column = model.timestamp
+    else:
+        columns = []
+        for metric in metrics:
+            columns += [getattr(model, f"{metric}_{part}") for part in ("min", "max", "sum", "count")]
+        time_column = model.bucket
+    return (
+        select(cast(extract("epoch", time_column), BigInteger), *columns)
+        .where(model.node_id == node_id, time_column >= start, time_column < end)
+        .order_by(time_column)
+    )
+
+def build_series(model, rows, metrics, method, start, end, buckets):
+    """Downsample kolom hasil query menjadi {metrik: (t, v)}"""
+    t, columns = downsample.raw_columns(rows)
+    start_epoch, end_epoch = downsample.to_epoch([start, end])
+    series = {}
+    for i, metric in enumerate(metrics):
+        if not len(t):
+            series[metric] = ([], [])
+            continue
+        if model is TelemetryReading:
+            times, values = downsample.downsample(method, t, columns[i], start_epoch, end_epoch, buckets)
+        else:
+            low, high, sums, counts = columns[i * 4:i * 4 + 4]
+            times, values = downsample.downsample(
+                method, t, downsample.rollup_average(sums, counts), start_epoch, end_epoch, buckets,
+                low=low, high=high,
+            )
+        series[metric] = (times.tolist(), values.round(2).tolist())
+    return series
+
+@app.get("/api/readings/series")
+async def get_readings_series(
+    sensor_id: str,
+    metric: Optional[str] = None,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    width: int = 600,
+    method: str = "minmax",
+):
+    """Deret waktu ter-downsample untuk grafik, per sensor dan metrik.
+
+    ``sensor_id`` dan ``metric`` boleh dipisah koma (default metrik sesuai
+    tipe sensor). ``width`` adalah lebar grafik dalam piksel: ``minmax``
+    mengembalikan min dan max per dua piksel, ``lttb`` satu titik per piksel.
+    Sumbernya rollup 1 jam/1 menit atau reading mentah, tergantung berapa
+    detik yang diwakili satu bucket, sehingga grafik 7 hari tetap membaca
+    paling banyak ~10 ribu baris rollup per sensor. ``t`` adalah detik epoch.
+    """
+    if method not in downsample.METHODS:
+        raise HTTPException(status_code=400, detail=f"method harus salah satu dari: {', '.join(downsample.METHODS)}")
+    requested = metric.split(",") if metric else None
+    if requested and any(name not in rollups.METRICS for name in requested):
+        raise HTTPException(status_code=400, detail=f"metric harus salah satu dari: {', '.join(rollups.METRICS)}")
+    to = to or datetime.utcnow()
+    from_ = from_ or to - timedelta(days=1)
+    if from_ >= to:
+        raise HTTPException(status_code=400, detail="from harus sebelum to")
+
+    # Rentang diratakan ke lebar bucket agar request berulang memakai cache yang sama
+    width = max(10, min(width, SERIES_MAX_WIDTH))
+    buckets = width if method == "lttb" else width // 2
+    step = max(1, math.ceil((to - from_).total_seconds() / buckets))
+    start = rollups.bucket_start(from_, step)
+    end = rollups.bucket_start(to, step) + timedelta(seconds=step)
+    buckets = int((end - start).total_seconds()) // step
+    model = series_source(step)
+
+    sensor_ids = sensor_id.split(",")
+    async with AsyncSessionLocal() as db:
+        sensors = (await db.execute(
+            select(SensorNode, SensorLatest.sensor_type)
+            .outerjoin(SensorLatest, SensorLatest.node_id == SensorNode.id)
+            .where(SensorNode.sensor_id_string.in_(sensor_ids))
+        )).all()
+        if not sensors:
+            return {"error": "Sensor not found"}
+
+        results = []
+        for sensor, sensor_type in sorted(sensors, key=lambda row: sensor_ids.index(row[0].sensor_id_string)):
+            # Tanpa parameter metric: hanya metrik milik tipe sensor (sensor "all" semuanya)
+            metrics = requested or ([sensor_type] if sensor_type in rollups.METRICS else list(rollups.METRICS))
+            keys = {name: (sensor.sensor_id_string, name, method, start, end, step) for name in metrics}
+            series = {name: series_cache.get(key) for name, key in keys.items()}
+            missing = [name for name, value in series.items() if value is None]
+            if missing:
+                rows = (await db.execute(series_statement(model, sensor.id, start, end, missing))).all()
+                for name, value in build_series(model, rows, missing, method, start, end, buckets).items():
+                    series[name] = value
+                    series_cache.put(keys[name], value)
+            for name in metrics:
+                times, values = series[name]
+                if times or requested:
+                    results.append({
+                        "sensor_id": sensor.sensor_id_string,
+                        "location": sensor.location,
+                        "metric": name,
+                        "t": times,
+                        "v": values,
+                    })
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "step": step,
+        "method": method,
+        "source": model.__tablename__,
+        "series": results,
+    }
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint untuk real-time updates"""
+    """WebSocket endpoint untuk real-time updates.
+
+    Tanpa subscribe, client menerima setiap pesan telemetri (format lama).
+    Kirim {"type": "subscribe", "sensor_ids": [...], "locations": [...],
+    "sensor_types": [...], "max_rate": 2} untuk menerima frame "delta" yang
+    hanya berisi sensor terpilih dan field yang berubah.
+    """
     await manager.connect(websocket)
     try:
         while True:
-            # Keep connection alive
-            await websocket.receive_text()
+            text = await websocket.receive_text()
+            manager.handle_client_message(websocket, text)
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
+    finally:
+        await manager.close(websocket)
 
 if __name__ == "__main__":
     import uvicorn
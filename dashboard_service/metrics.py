@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Metrics - Metrik Prometheus untuk pipeline telemetri
+Latensi setiap tahap (sensor -> broker -> decode -> antrian -> database, dan
+fan-out /ws) sehingga sumber lambat bisa dibedakan: broker, database, atau
+broadcast. Diekspos di /metrics (worker API) atau server HTTP kecil
+(ingest_worker.py, METRICS_PORT).
+
+Dengan beberapa worker uvicorn, set PROMETHEUS_MULTIPROC_DIR ke folder kosong
+agar /metrics menggabungkan metrik semua worker.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess, start_http_server,
+)
+
+from telemetry_codec import SENSOR_TYPES, parse_timestamp
+
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+# Bucket latensi jaringan/antrian (detik) dan operasi singkat di dalam proses
+LAG_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+AGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 3600)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PUBLISH_LAG = Histogram(
+    "forest_publish_lag_seconds",
+    "Waktu dari publish di sensor (sent_at) sampai pesan diterima service",
+    ["consumer"], buckets=LAG_BUCKETS,
+)
+READING_AGE = Histogram(
+    "forest_reading_age_seconds",
+    "Umur reading (timestamp sensor) saat diterima service, termasuk jeda batch dan spool",
+    ["consumer"], buckets=AGE_BUCKETS,
+)
+DECODE_SECONDS = Histogram(
+    "forest_mqtt_decode_seconds",
+    "Durasi decode satu pesan MQTT",
+    ["consumer", "format"], buckets=FAST_BUCKETS,
+)
+READINGS_RECEIVED = Counter(
+    "forest_readings_received_total",
+    "Reading yang diterima dari MQTT per tipe sensor",
+    ["consumer", "sensor_type"],
+)
+MQTT_ERRORS = Counter(
+    "forest_mqtt_errors_total",
+    "Pesan MQTT yang gagal diproses",
+    ["consumer"],
+)
+UNKNOWN_NODE_RECORDS = Counter(
+    "forest_unknown_node_records_total",
+    "Record biner dari node yang belum terdaftar: ditahan, diputar ulang saat registry datang, atau dibuang",
+    ["consumer", "result"],
+)
+
+INGEST_QUEUE_DEPTH = Gauge(
+    "forest_ingest_queue_depth",
+    "Jumlah reading di antrian ingest",
+    multiprocess_mode="livesum",
+)
+INGEST_BATCH_SIZE = Histogram(
+    "forest_ingest_batch_size",
+    "Jumlah reading per flush ke database",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+INGEST_FLUSH_SECONDS = Histogram(
+    "forest_ingest_flush_seconds",
+    "Durasi satu flush batch ke database (satu transaksi)",
+    buckets=DB_BUCKETS,
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "forest_ingest_stage_seconds",
+    "Durasi tiap tahap flush: parse, resolve_nodes, insert, sensor_latest, rollup, commit",
+    ["stage"], buckets=DB_BUCKETS,
+)
+INGEST_ROWS = Counter(
+    "forest_ingest_rows_total",
+    "Reading yang ditulis, gagal ditulis, atau di-drop karena antrian penuh",
+    ["result"],
+)
+
+WS_CLIENTS = Gauge(
+    "forest_ws_clients",
+    "Client WebSocket /ws yang tersambung",
+    multiprocess_mode="livesum",
+)
+WS_SEND_QUEUE_DEPTH = Gauge(
+    "forest_ws_send_queue_depth",
+    "Total frame di antrian kirim semua client /ws",
+    multiprocess_mode="livesum",
+)
+WS_FANOUT_SECONDS = Histogram(
+    "forest_ws_fanout_seconds",
+    "Durasi fan-out satu pesan telemetri ke antrian client /ws (di event loop)",
+    buckets=FAST_BUCKETS,
+)
+WS_FRAMES = Counter(
+    "forest_ws_frames_total",
+    "Frame /ws yang terkirim atau dibuang karena antrian client penuh",
+    ["result"],
+)
+
+DETECTIONS = Counter(
+    "forest_detections_total",
+    "Deteksi anomali streaming per metrik dan jenis (spike, rate)",
+    ["metric", "kind"],
+)
+
+
+class ConsumerMetrics:
+    """Metrik penerimaan satu consumer MQTT (label ``consumer`` di-bind sekali)"""
+
+    def __init__(self, consumer):
+        self.consumer = consumer
+        self.publish_lag = PUBLISH_LAG.labels(consumer)
+        self.reading_age = READING_AGE.labels(consumer)
+        self.errors = MQTT_ERRORS.labels(consumer)
+        self._decode = {}
+        self._received = {}
+        self._unknown = {
+            result: (UNKNOWN_NODE_RECORDS.labels(consumer, result), attribute)
+            for result, attribute in (("held", "unknown_nodes"), ("replayed", "replayed"), ("dropped", "dropped"))
+        }
+        self._unknown_seen = dict.fromkeys(self._unknown, 0)
+
+    def decode_timer(self, fmt):
+        histogram = self._decode.get(fmt)
+        if histogram is None:
+            histogram = self._decode[fmt] = DECODE_SECONDS.labels(self.consumer, fmt)
+        return histogram
+
+    def observe_decoder(self, decoder):
+        """Tambahkan selisih penghitung node tak dikenal di ``decoder`` ke counter Prometheus"""
+        for result, (counter, attribute) in self._unknown.items():
+            value = getattr(decoder, attribute)
+            if value != self._unknown_seen[result]:
+                counter.inc(value - self._unknown_seen[result])
+                self._unknown_seen[result] = value
+
+    def observe(self, payloads, received_at):
+        """Catat lag dan jumlah reading untuk satu pesan yang diterima pada ``received_at``"""
+        for payload in payloads:
+            sent_at = payload.get("sent_at")
+            if isinstance(sent_at, (int, float)):
+                # Jam sensor bisa sedikit di depan jam server
+                self.publish_lag.observe(max(0.0, received_at - sent_at))
+            try:
+                self.reading_age.observe(max(0.0, received_at - parse_timestamp(payload["timestamp"])))
+            except (KeyError, TypeError, ValueError):
+                pass
+
+            sensor_type = payload.get("sensor_type")
+            if sensor_type not in SENSOR_TYPES:
+                sensor_type = "other"
+            counter = self._received.get(sensor_type)
+            if counter is None:
+                counter = self._received[sensor_type] = READINGS_RECEIVED.labels(self.consumer, sensor_type)
+            counter.inc()
+
+
+def registry():
+    """Registry untuk ekspor; mode multiproses menggabungkan file semua worker"""
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+def render():
+    """Isi /metrics dalam format exposition teks Prometheus"""
+    return generate_latest(registry())
+
+
+def serve(port):
+    """Server HTTP /metrics terpisah untuk proses tanpa FastAPI (ingest worker)"""
+    start_http_server(port, registry=registry())
+
+
+def mark_process_dead():
+    """Hapus gauge proses ini dari agregasi multiproses saat worker berhenti"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
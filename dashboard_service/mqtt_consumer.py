@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MQTT Consumer - Satu subscription MQTT dengan client dan network thread sendiri
+Dipakai untuk konsumsi ingest (shared subscription, dibagi antar worker) dan
+konsumsi broadcast (setiap worker API menerima semua pesan untuk /ws).
+Pesan JSON dan biner di-decode dengan telemetry_codec
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from metrics import ConsumerMetrics
+from telemetry_codec import BINARY_TOPIC, TelemetryDecoder
+
+
+def unique_client_id(name):
+    """Client ID unik per proses; ID yang sama membuat broker saling memutus client"""
+    return f"dashboard_{name}_{socket.gethostname()}_{os.getpid()}"
+
+
+def shared_prefix(group):
+    """Prefix shared subscription ``$share/<group>/`` (tanpa group: subscription biasa)"""
+    return f"$share/{group}/" if group else ""
+
+
+class MqttConsumer:
+    """Subscribe topic telemetri dan serahkan payload hasil decode ke ``handler``.
+
+    ``event_handlers`` memetakan topic event JSON tambahan ke handler-nya.
+    Handler berjalan di network thread paho, jadi jangan memblokir lama.
+    """
+
+    def __init__(self, host, port, handler, name, telemetry_prefix="", keepalive=60, event_handlers=None):
+        self.host = host
+        self.port = port
+        self.decoder = TelemetryDecoder()
+        self.event_handlers = dict(event_handlers or {})
+        self.topics = self.decoder.topics(telemetry_prefix) + list(self.event_handlers)
+        self.handler = handler
+        self.name = name
+        self.keepalive = keepalive
+        self.client_id = unique_client_id(name)
+        self.connected = False
+        self.received = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.stats = ConsumerMetrics(name)
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_message = self._on_message
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            self.connected = True
+            print(f"[Dashboard Service] {self.client_id} terhubung ke broker MQTT")
+            client.subscribe([(topic, 1) for topic in self.topics])
+            print(f"[Dashboard Service] Subscribe ke topic: {', '.join(self.topics)}")
+        else:
+            print(f"[Dashboard Service] {self.client_id} gagal terhubung ke broker, rc: {rc}")
+
+    def _on_disconnect(self, client, userdata, flags, rc, properties=None):
+        self.connected = False
+        if rc != 0:
+            print(f"[Dashboard Service] {self.client_id} terputus dari broker (rc: {rc}), reconnect...")
+
+    def _on_message(self, client, userdata, message):
+        received_at = time.time()
+        event_handler = self.event_handlers.get(message.topic)
+        if event_handler is not None:
+            try:
+                event_handler(json.loads(message.payload))
+            except Exception as e:
+                print(f"[Dashboard Service] Error memproses event {message.topic} ({self.name}): {e}")
+            return
+        try:
+            started = time.perf_counter()
+            payloads = self.decoder.decode(message.topic, message.payload)
+            fmt = "binary" if message.topic == BINARY_TOPIC else "json"
+            self.stats.decode_timer(fmt).observe(time.perf_counter() - started)
+            self.stats.observe_decoder(self.decoder)
+            with self._lock:
+                self.received += len(payloads)
+            if payloads:
+                self.stats.observe(payloads, received_at)
+                self.handler(payloads)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            self.stats.errors.inc()
+            print(f"[Dashboard Service] Error memproses pesan ({self.name}): {e}")
+
+    def start(self):
+        """Connect di background; gagal connect pertama juga dicoba ulang"""
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.client.connect_async(self.host, self.port, keepalive=self.keepalive)
+        self.client.loop_start()
+
+    def publish(self, topic, event):
+        """Publish event JSON (QoS 1); aman dipanggil dari thread lain"""
+        self.client.publish(topic, json.dumps(event), qos=1)
+
+    def stop(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "client_id": self.client_id,
+                "topics": self.topics,
+                "connected": self.connected,
+                "received": self.received,
+                "errors": self.errors,
+                "registered_nodes": len(self.decoder.registry),
+                "unknown_nodes": self.decoder.unknown_nodes,
+                "pending_records": self.decoder.pending_records(),
+                "replayed_records": self.decoder.replayed,
+                "dropped_records": self.decoder.dropped,
+            }
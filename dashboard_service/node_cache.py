@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Node Cache - Peta sensor_id_string -> SensorNode.id di memori
+Menghindari SELECT sensor node pada setiap pesan; miss diselesaikan dengan
+satu INSERT ... ON CONFLICT DO NOTHING RETURNING per batch
+"""
+
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from dbutil import dialect_insert
+
+
+class NodeIdCache:
+    """LRU terbatas ``sensor_id_string`` -> ``SensorNode.id``.
+
+    ``resolve`` aman jika replika lain meng-INSERT sensor yang sama: baris yang
+    kalah ON CONFLICT dibaca ulang dengan satu SELECT.
+    """
+
+    def __init__(self, model, max_size=100000):
+        self.model = model
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _remember(self, sensor_id, node_id):
+        self._ids[sensor_id] = node_id
+        self._ids.move_to_end(sensor_id)
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+    def warm(self, db):
+        """Isi cache dengan sensor node yang sudah ada di database"""
+        rows = db.execute(
+            select(self.model.sensor_id_string, self.model.id)
+            .order_by(self.model.id.desc())
+            .limit(self.max_size)
+        ).all()
+        with self._lock:
+            for sensor_id, node_id in reversed(rows):
+                self._remember(sensor_id, node_id)
+        return len(rows)
+
+    def get(self, sensor_id):
+        with self._lock:
+            node_id = self._ids.get(sensor_id)
+            if node_id is not None:
+                self._ids.move_to_end(sensor_id)
+            return node_id
+
+    def resolve(self, db, locations):
+        """Kembalikan {sensor_id: node_id} untuk semua key di ``locations``.
+
+        ``locations`` memetakan sensor_id ke lokasi yang dipakai jika node
+        harus dibuat. Jika ada node baru, transaksi ``db`` di-commit sebelum
+        id disimpan ke cache agar cache tidak berisi id dari transaksi batal.
+        """
+        resolved = {}
+        missing = {}
+        with self._lock:
+            for sensor_id, location in locations.items():
+                node_id = self._ids.get(sensor_id)
+                if node_id is None:
+                    missing[sensor_id] = location
+                else:
+                    self._ids.move_to_end(sensor_id)
+                    resolved[sensor_id] = node_id
+            self.hits += len(resolved)
+            self.misses += len(missing)
+
+        if not missing:
+            return resolved
+
+        table = self.model.__table__
+        stmt = (
+            dialect_insert(db, table)
+            .values([
+                {"sensor_id_string": sensor_id, "location": location}
+                for sensor_id, location in missing.items()
+            ])
+            .on_conflict_do_nothing(index_elements=[table.c.sensor_id_string])
+            .returning(table.c.sensor_id_string, table.c.id)
+        )
+        found = dict(db.execute(stmt).all())
+
+        # Node yang dibuat replika lain (konflik) tidak ikut di RETURNING
+        raced = [sensor_id for sensor_id in missing if sensor_id not in found]
+        if raced:
+            found.update(db.execute(
+                select(table.c.sensor_id_string, table.c.id)
+                .where(table.c.sensor_id_string.in_(raced))
+            ).all())
+        db.commit()
+
+        with self._lock:
+            for sensor_id, node_id in found.items():
+                self._remember(sensor_id, node_id)
+        resolved.update(found)
+        return resolved
+
+    def invalidate(self):
+        """Kosongkan cache (misalnya setelah tabel sensor_nodes diubah manual)"""
+        with self._lock:
+            self._ids.clear()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "size": len(self._ids),
+                "capacity": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Partition Manager - Range partition harian/mingguan untuk telemetry_readings
+Membuat partisi secara otomatis (di muka dan saat ingest menerima timestamp
+baru) dan menghapus partisi lama sesuai retention dengan DROP TABLE
+"""
+
+import re
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+INTERVALS = ("daily", "weekly")
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def is_missing_partition(error):
+    """True jika INSERT gagal karena tidak ada partisi untuk barisnya"""
+    return "no partition of relation" in str(getattr(error, "orig", error))
+
+
+class PartitionManager:
+    """Kelola partisi range ``<table>_pYYYYMMDD`` pada kolom ``timestamp``.
+
+    Hanya aktif di PostgreSQL dengan tabel induk partitioned; selain itu
+    semua method no-op. Partisi yang di-DROP proses lain dilupakan lewat
+    ``forget`` saat INSERT gagal dengan ``is_missing_partition``.
+    """
+
+    def __init__(self, engine, table_name, interval="daily", premake=3, retention_days=0):
+        if interval not in INTERVALS:
+            raise ValueError(f"interval partisi tidak dikenal: {interval}")
+        self.engine = engine
+        self.table_name = table_name
+        self.interval = interval
+        self.premake = premake
+        self.retention_days = retention_days
+        self.enabled = False
+        self._known = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def relkind(self, conn):
+        """Jenis tabel induk di pg_class: "p" partitioned, "r" tabel biasa, None jika belum ada"""
+        return conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": self.table_name},
+        ).scalar()
+
+    def check(self):
+        """Aktifkan manager jika tabel induk benar-benar partitioned"""
+        if self.engine.dialect.name != "postgresql":
+            return False
+        with self.engine.connect() as conn:
+            relkind = self.relkind(conn)
+        self.enabled = relkind == "p"
+        if relkind == "r":
+            print(f"[Dashboard Service] Tabel {self.table_name} belum partitioned; "
+                  f"partisi dan retention dinonaktifkan")
+        return self.enabled
+
+    def migrate_legacy(self, conn, columns, create_parent):
+        """Pindahkan tabel lama (belum partitioned) ke tabel induk partitioned baru.
+
+        Berjalan di transaksi ``conn``: tabel lama di-rename menjadi
+        ``<table>_legacy`` (beserta index dan sequence-nya), ``create_parent``
+        membuat tabel induk dan index-nya, lalu partisi dibuat untuk setiap
+        periode yang berisi data dan ``columns`` disalin. Tabel lama tidak
+        dihapus. Return jumlah baris yang disalin.
+        """
+        table, legacy = self.table_name, f"{self.table_name}_legacy"
+        conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+        # Nama index, constraint primary key, dan sequence dipakai lagi oleh tabel baru
+        indexes = conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :name"), {"name": legacy},
+        ).all()
+        for (index,) in indexes:
+            conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_legacy"'))
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": legacy}).scalar()
+        if sequence:
+            conn.execute(text(f'ALTER SEQUENCE {sequence} RENAME TO "{legacy}_id_seq"'))
+
+        create_parent(conn)
+        days = conn.execute(text(
+            f"SELECT DISTINCT date_trunc('day', timestamp) FROM \"{legacy}\" WHERE timestamp IS NOT NULL"
+        )).all()
+        starts = sorted({self.period_start(day) for (day,) in days})
+        for start in starts:
+            end = self.period_end(start)
+            conn.execute(text(
+                f'CREATE TABLE "{self.partition_name(start)}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{start:%Y-%m-%d %H:%M:%S}') TO ('{end:%Y-%m-%d %H:%M:%S}')"
+            ))
+
+        names = ", ".join(f'"{column}"' for column in columns)
+        copied = conn.execute(text(
+            f'INSERT INTO "{table}" ({names}) SELECT {names} FROM "{legacy}" WHERE timestamp IS NOT NULL'
+        )).rowcount
+        # id baru melanjutkan id lama (urutan id dipakai saat mengarsip)
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence(:name, 'id'), (SELECT COALESCE(max(id), 0) + 1 FROM \"{table}\"), false)"
+        ), {"name": table})
+        print(f"[Dashboard Service] Tabel {table} dimigrasikan ke partitioned: {copied} baris disalin "
+              f"ke {len(starts)} partisi; tabel lama disimpan sebagai {legacy}")
+        return copied
+
+    def period_start(self, ts):
+        start = datetime(ts.year, ts.month, ts.day)
+        if self.interval == "weekly":
+            start -= timedelta(days=start.weekday())
+        return start
+
+    def period_end(self, start):
+        return start + timedelta(days=7 if self.interval == "weekly" else 1)
+
+    def partition_name(self, start):
+        return f"{self.table_name}_p{start:%Y%m%d}"
+
+    def existing_partitions(self, conn):
+        """Daftar (nama, batas bawah, batas atas) partisi yang ada"""
+        rows = conn.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ), {"name": self.table_name}).all()
+
+        partitions = []
+        for name, bound in rows:
+            match = _BOUND_RE.search(bound or "")
+            if match:
+                lower, upper = (datetime.fromisoformat(value) for value in match.groups())
+                partitions.append((name, lower, upper))
+        return partitions
+
+    def ensure_partitions(self, timestamps=(), now=None):
+        """Pastikan ada partisi untuk ``timestamps`` dan ``premake`` periode ke depan"""
+        if not self.enabled:
+            return []
+        starts = {self.period_start(ts) for ts in timestamps}
+        if now is not None:
+            start = self.period_start(now)
+            for _ in range(self.premake + 1):
+                starts.add(start)
+                start = self.period_end(start)
+
+        with self._lock:
+            missing = sorted(starts - self._known)
+        if not missing:
+            return []
+
+        created = []
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            existing = self.existing_partitions(conn)
+            for start in missing:
+                end = self.period_end(start)
+                # Lewati periode yang sudah tercakup (mis. setelah interval diubah)
+                if any(lower < end and start < upper for _, lower, upper in existing):
+                    continue
+                name = self.partition_name(start)
+                try:
+                    conn.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{self.table_name}" '
+                        f"FOR VALUES FROM ('{start:%Y-%m-%d %H:%M:%S}') TO ('{end:%Y-%m-%d %H:%M:%S}')"
+                    ))
+                    created.append(name)
+                except Exception as e:
+                    # Replika lain bisa membuat partisi yang sama bersamaan
+                    print(f"[Dashboard Service] Gagal membuat partisi {name}: {e}")
+            existing = self.existing_partitions(conn)
+
+        with self._lock:
+            for start in missing:
+                end = self.period_end(start)
+                if any(lower <= start and end <= upper for _, lower, upper in existing):
+                    self._known.add(start)
+        if created:
+            print(f"[Dashboard Service] Partisi dibuat: {', '.join(created)}")
+        return created
+
+    def forget(self):
+        """Lupakan partisi yang tercatat; dipanggil saat proses lain men-DROP partisi"""
+        with self._lock:
+            self._known.clear()
+
+    def drop_expired(self, now=None):
+        """DROP partisi yang seluruh isinya lebih tua dari retention"""
+        if not self.enabled or self.retention_days <= 0:
+            return []
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+
+        dropped = []
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for name, lower, upper in self.existing_partitions(conn):
+                if upper <= cutoff:
+                    conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                    dropped.append(name)
+                    with self._lock:
+                        self._known.discard(lower)
+        if dropped:
+            print(f"[Dashboard Service] Partisi kedaluwarsa dihapus: {', '.join(dropped)}")
+        return dropped
+
+    def drop_period(self, start, end, conn, expected_rows=None):
+        """DROP partisi yang batasnya tepat [start, end) di transaksi ``conn``; return True jika di-DROP
+
+        Dengan ``expected_rows`` partisi hanya di-DROP jika isinya tepat sebanyak
+        itu (tidak ada baris yang masuk setelah diekspor).
+        """
+        if not self.enabled:
+            return False
+        for name, lower, upper in self.existing_partitions(conn):
+            if lower == start and upper == end:
+                if expected_rows is not None:
+                    # Kunci parent lebih dulu (urutan yang sama dengan DROP) agar
+                    # tidak ada INSERT di antara hitungan dan DROP
+                    conn.execute(text(f'LOCK TABLE "{self.table_name}" IN ACCESS EXCLUSIVE MODE'))
+                    if conn.execute(text(f'SELECT count(*) FROM "{name}"')).scalar() != expected_rows:
+                        return False
+                conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                with self._lock:
+                    self._known.discard(lower)
+                return True
+        return False
+
+    def run_maintenance(self):
+        now = datetime.utcnow()
+        try:
+            self.ensure_partitions(now=now)
+            self.drop_expired(now=now)
+        except Exception as e:
+            print(f"[Dashboard Service] Error maintenance partisi: {e}")
+
+    def start(self, every_seconds=3600):
+        """Jalankan maintenance berkala di background thread"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+
+        def loop():
+            while not self._stop.wait(every_seconds):
+                self.run_maintenance()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="partition-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Response Cache - Cache respons JSON endpoint baca dengan invalidasi dari ingest
+Body disimpan sebagai bytes yang sudah diserialisasi beserta ETag, sehingga
+request berulang tidak menyentuh database maupun json.dumps, dan client
+dengan If-None-Match cukup menerima 304. Setiap entri diberi tag (mis.
+"sensor:temp-01"); reading baru hanya menghapus entri dengan tag terkait.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedResponse:
+    """Body satu response yang sudah diserialisasi beserta ETag dan header tambahan"""
+
+    __slots__ = ("body", "etag", "headers", "tags", "expires")
+
+    def __init__(self, body, headers, tags, expires):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.headers = headers
+        self.tags = tags
+        self.expires = expires
+
+
+class ResponseCache:
+    """Cache TTL + LRU response yang diserialisasi, di-invalidate per tag.
+
+    Entri yang dibuat dalam ``settle`` detik setelah tag-nya di-invalidate
+    hanya hidup sampai jeda itu berakhir (data ingest belum tentu tertulis).
+    """
+
+    def __init__(self, max_size=1000, ttl=30.0, settle=2.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.settle = settle
+        self._entries = OrderedDict()
+        self._by_tag = {}
+        self._invalidated_at = {}
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, tags, headers=None, started=None, ttl=None):
+        """Simpan body; ``started`` adalah waktu (monotonic) sebelum query dijalankan"""
+        now = time.monotonic()
+        started = now if started is None else started
+        ttl = self.ttl if ttl is None else ttl
+        entry = CachedResponse(body, headers or {}, frozenset(tags), now + ttl)
+        with self._lock:
+            for tag in entry.tags:
+                invalidated = self._invalidated_at.get(tag)
+                if invalidated is not None and started < invalidated + self.settle:
+                    entry.expires = min(entry.expires, invalidated + self.settle)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, tags):
+        """Hapus semua entri yang memiliki salah satu ``tags``"""
+        now = time.monotonic()
+        with self._lock:
+            for tag in tags:
+                self._invalidated_at[tag] = now
+                for key in list(self._by_tag.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+            # Waktu invalidasi hanya berguna selama jeda settle; buang yang lebih tua
+            if now - self._pruned_at >= self.settle:
+                cutoff = now - self.settle
+                self._invalidated_at = {tag: at for tag, at in self._invalidated_at.items() if at >= cutoff}
+                self._pruned_at = now
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+            self._invalidated_at.clear()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
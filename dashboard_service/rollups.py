@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rollups - Agregat min/max/sum/count per node dalam bucket 1 menit dan 1 jam
+Diperbarui secara inkremental oleh pipeline ingest (upsert per batch) dan
+dipakai oleh endpoint /api/readings/aggregate
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from dbutil import dialect_insert
+
+METRICS = ("temperature", "humidity", "smoke")
+
+# Ukuran bucket yang bisa diminta lewat API (detik)
+BUCKET_SIZES = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "6h": 21600,
+    "1d": 86400,
+}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(ts, seconds):
+    """Awal bucket (UTC naive) yang memuat ``ts``"""
+    offset = int((ts - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=offset - offset % seconds)
+
+
+def empty_aggregate():
+    aggregate = {}
+    for metric in METRICS:
+        aggregate[f"{metric}_min"] = None
+        aggregate[f"{metric}_max"] = None
+        aggregate[f"{metric}_sum"] = 0.0
+        aggregate[f"{metric}_count"] = 0
+    return aggregate
+
+
+def merge_value(aggregate, metric, value_min, value_max, value_sum, value_count):
+    if not value_count:
+        return
+    current_min = aggregate[f"{metric}_min"]
+    current_max = aggregate[f"{metric}_max"]
+    aggregate[f"{metric}_min"] = value_min if current_min is None else min(current_min, value_min)
+    aggregate[f"{metric}_max"] = value_max if current_max is None else max(current_max, value_max)
+    aggregate[f"{metric}_sum"] += value_sum
+    aggregate[f"{metric}_count"] += value_count
+
+
+def aggregate_readings(rows, seconds):
+    """Kelompokkan reading (dict kolom TelemetryReading) per (node_id, bucket)"""
+    buckets = {}
+    for row in rows:
+        key = (row["node_id"], bucket_start(row["timestamp"], seconds))
+        aggregate = buckets.get(key)
+        if aggregate is None:
+            aggregate = buckets[key] = empty_aggregate()
+        for metric in METRICS:
+            value = row.get(metric)
+            if value is not None:
+                merge_value(aggregate, metric, value, value, value, 1)
+    return buckets
+
+
+def upsert_rollups(db, model, rows, seconds):
+    """Gabungkan satu batch reading ke tabel rollup ``model``"""
+    buckets = aggregate_readings(rows, seconds)
+    if not buckets:
+        return
+
+    # Urutan key yang tetap mencegah deadlock antar replika
+    values = [
+        dict(aggregate, node_id=node_id, bucket=bucket)
+        for (node_id, bucket), aggregate in sorted(buckets.items())
+    ]
+    table = model.__table__
+    stmt = dialect_insert(db, table).values(values)
+    least, greatest = (
+        (func.least, func.greatest)
+        if db.get_bind().dialect.name == "postgresql"
+        else (func.min, func.max)
+    )
+
+    set_ = {}
+    for metric in METRICS:
+        for suffix, combine in (("min", least), ("max", greatest)):
+            column = table.c[f"{metric}_{suffix}"]
+            incoming = stmt.excluded[f"{metric}_{suffix}"]
+            set_[column.name] = combine(func.coalesce(column, incoming), func.coalesce(incoming, column))
+        for suffix in ("sum", "count"):
+            column = table.c[f"{metric}_{suffix}"]
+            set_[column.name] = column + stmt.excluded[f"{metric}_{suffix}"]
+
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.node_id, table.c.bucket], set_=set_)
+    db.execute(stmt)
+
+
+def rebucket(rollup_rows, seconds):
+    """Gabungkan baris rollup (urut per bucket) ke bucket yang lebih besar"""
+    buckets = {}
+    for row in rollup_rows:
+        key = bucket_start(row.bucket, seconds)
+        aggregate = buckets.get(key)
+        if aggregate is None:
+            aggregate = buckets[key] = empty_aggregate()
+        for metric in METRICS:
+            merge_value(
+                aggregate,
+                metric,
+                getattr(row, f"{metric}_min"),
+                getattr(row, f"{metric}_max"),
+                getattr(row, f"{metric}_sum"),
+                getattr(row, f"{metric}_count"),
+            )
+    return buckets
+
+
+def format_bucket(bucket, aggregate):
+    """Format satu bucket untuk response API (avg = sum / count)"""
+    result = {"bucket": bucket.isoformat()}
+    for metric in METRICS:
+        count = aggregate[f"{metric}_count"]
+        if count:
+            result[metric] = {
+                "min": aggregate[f"{metric}_min"],
+                "max": aggregate[f"{metric}_max"],
+                "avg": aggregate[f"{metric}_sum"] / count,
+                "count": count,
+            }
+    return result
+
+
+def choose_bucket(start, end, max_points):
+    """Bucket terkecil yang menghasilkan paling banyak ``max_points`` titik"""
+    span = (end - start).total_seconds()
+    for name, seconds in sorted(BUCKET_SIZES.items(), key=lambda item: item[1]):
+        if span / seconds <= max_points:
+            return name
+    return "1d"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Status Engine - Status area per lokasi yang diperbarui secara inkremental
+Setiap pesan hanya memperbarui area (location) milik sensor pengirim dan
+mengevaluasi ulang aturan area tersebut: O(1) per pesan
+"""
+
+import threading
+
+STATUS_LEVELS = {"NORMAL": 0, "WARNING": 1, "DANGER": 2}
+
+METRICS = ("temperature", "humidity", "smoke")
+
+
+def evaluate_status(T, H, S, smoke_warning, smoke_danger):
+    """Rules (as provided):
+    if (S >= S_dang) then DANGER
+    else if (T >= 35 and H < 40) then DANGER
+    else if (S >= S_warn and S < S_dang) then WARNING
+    else if (T >= 30 and T < 35 and H >= 40 and H < 70) then WARNING
+    else NORMAL
+    """
+    if S is not None and S >= smoke_danger:
+        return 'DANGER'
+    if T is not None and H is not None and (T >= 35 and H < 40):
+        return 'DANGER'
+    if S is not None and S >= smoke_warning and S < smoke_danger:
+        return 'WARNING'
+    if T is not None and (T >= 30 and T < 35) and H is not None and (H >= 40 and H < 70):
+        return 'WARNING'
+    return 'NORMAL'
+
+
+class AreaState:
+    """Nilai T/H/S terbaru satu area beserta timestamp dan sensor sumbernya"""
+
+    __slots__ = ("location", "values", "timestamps", "sources", "timestamp", "status")
+
+    def __init__(self, location):
+        self.location = location
+        self.values = dict.fromkeys(METRICS)
+        self.timestamps = dict.fromkeys(METRICS)
+        self.sources = dict.fromkeys(METRICS)
+        self.timestamp = None
+        self.status = 'NORMAL'
+
+    def area_values(self):
+        values = dict(self.values)
+        values["timestamp"] = self.timestamp
+        return values
+
+    def to_dict(self):
+        return {
+            "location": self.location,
+            "area_status": self.status,
+            "area_values": self.area_values(),
+            "sources": {
+                metric: {"sensor_id": self.sources[metric], "timestamp": self.timestamps[metric]}
+                for metric in METRICS if self.sources[metric] is not None
+            },
+        }
+
+
+class StatusEngine:
+    """Status area per lokasi, diperbarui O(1) per reading"""
+
+    def __init__(self, smoke_warning, smoke_danger):
+        self.smoke_warning = smoke_warning
+        self.smoke_danger = smoke_danger
+        self.areas = {}
+        self._lock = threading.Lock()
+
+    def update(self, payload):
+        """Terapkan satu payload; return (location, status, area_values, berubah)"""
+        location = payload.get('location') or 'unknown'
+        data = payload.get('data') or {}
+        timestamp = payload.get('timestamp')
+        with self._lock:
+            area = self.areas.get(location)
+            if area is None:
+                area = self.areas[location] = AreaState(location)
+            for metric in METRICS:
+                value = data.get(metric)
+                if value is not None:
+                    area.values[metric] = float(value)
+                    area.timestamps[metric] = timestamp
+                    area.sources[metric] = payload.get('sensor_id')
+                    area.timestamp = timestamp
+
+            previous = area.status
+            area.status = evaluate_status(
+                area.values["temperature"], area.values["humidity"], area.values["smoke"],
+                self.smoke_warning, self.smoke_danger,
+            )
+            return location, area.status, area.area_values(), area.status != previous
+
+    def get(self, location):
+        """(status, area_values) untuk satu lokasi, atau None jika belum ada data"""
+        with self._lock:
+            area = self.areas.get(location)
+            if area is None:
+                return None
+            return area.status, area.area_values()
+
+    def overall(self):
+        """Status terburuk dari semua area (nilai dari area tersebut)"""
+        with self._lock:
+            worst = None
+            for area in self.areas.values():
+                if worst is None or STATUS_LEVELS[area.status] > STATUS_LEVELS[worst.status]:
+                    worst = area
+            if worst is None:
+                return 'NORMAL', {"temperature": None, "humidity": None, "smoke": None, "timestamp": None}
+            values = worst.area_values()
+            values["location"] = worst.location
+            return worst.status, values
+
+    def all(self):
+        with self._lock:
+            return [area.to_dict() for area in self.areas.values()]
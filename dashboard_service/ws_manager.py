@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket Connection Manager - Fan-out non-blocking ke client dashboard
+Pesan dari thread MQTT diserahkan ke event loop uvicorn secara thread-safe,
+lalu dikirim oleh satu sender task per koneksi dengan antrian terbatas.
+Client yang mengirim pesan "subscribe" hanya menerima sensor yang dipilih,
+digabung menjadi frame delta dengan laju maksimal tertentu.
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict
+
+from fastapi import WebSocket
+
+from metrics import WS_CLIENTS, WS_FANOUT_SECONDS, WS_FRAMES, WS_SEND_QUEUE_DEPTH
+
+
+def flatten_payload(payload):
+    """Field telemetri datar yang dibandingkan untuk frame delta"""
+    fields = {
+        "location": payload.get("location"),
+        "sensor_type": payload.get("sensor_type"),
+        "status": payload.get("status"),
+        "timestamp": payload.get("timestamp"),
+    }
+    fields.update(payload.get("data") or {})
+    return fields
+
+
+class Subscription:
+    """Filter sensor satu client dan state coalescing-nya.
+
+    Sensor cocok jika ID, lokasi, atau tipenya ada di filter (OR).
+    """
+
+    def __init__(self, sensor_ids=(), locations=(), sensor_types=(), interval=0.25):
+        self.sensor_ids = set(sensor_ids)
+        self.locations = set(locations)
+        self.sensor_types = set(sensor_types)
+        self.interval = interval
+        self.pending = {}
+        self.last_sent = {}
+        self.area_locations = set()
+        self.area_sent = {}
+        self.next_due = 0.0
+
+    def stage(self, sensor_id, fields):
+        # Update yang belum terkirim ditimpa (coalesce), hanya nilai terakhir dikirim
+        self.pending[sensor_id] = fields
+
+    def build_frame(self, areas):
+        """Frame berisi field yang berubah sejak frame terakhir, atau None.
+
+        ``areas`` memetakan lokasi ke (area_status, area_values); hanya area
+        yang relevan untuk client dan berubah yang ikut dikirim.
+        """
+        sensors = {}
+        for sensor_id, fields in self.pending.items():
+            previous = self.last_sent.get(sensor_id, {})
+            changed = {key: value for key, value in fields.items() if previous.get(key) != value}
+            if changed:
+                sensors[sensor_id] = changed
+                self.last_sent[sensor_id] = fields
+            if fields.get("location") is not None:
+                self.area_locations.add(fields["location"])
+        self.pending.clear()
+
+        changed_areas = {}
+        for location in self.locations | self.area_locations:
+            area = areas.get(location)
+            if area is not None and self.area_sent.get(location) != area:
+                changed_areas[location] = {"area_status": area[0], "area_values": area[1]}
+                self.area_sent[location] = area
+
+        frame = {"type": "delta"}
+        if sensors:
+            frame["sensors"] = sensors
+        if changed_areas:
+            frame["areas"] = changed_areas
+        return frame if len(frame) > 1 else None
+
+
+class ClientConnection:
+    """Satu client WebSocket dengan antrian kirim terbatas"""
+
+    def __init__(self, websocket: WebSocket, max_queue: int):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.task = None
+        self.subscription = None
+
+    def offer(self, text):
+        """Masukkan frame; jika antrian penuh, frame tertua dibuang (coalesce)"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            WS_FRAMES.labels("dropped").inc()
+        else:
+            WS_SEND_QUEUE_DEPTH.inc()
+        self.queue.put_nowait(text)
+
+
+class ConnectionManager:
+    """Fan-out dengan satu sender task per client.
+
+    Client lambat hanya memenuhi antriannya sendiri (frame tertua dibuang) dan
+    diputus jika melewati ``send_timeout``; client dicari lewat index
+    sensor/lokasi/tipe.
+    """
+
+    def __init__(self, max_queue=100, send_timeout=5.0, max_frame_rate=4.0, tick_interval=0.05):
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.max_frame_rate = max_frame_rate
+        self.tick_interval = tick_interval
+        self.loop = None
+        self.sent = 0
+        self.dropped = 0
+        self.disconnected_slow = 0
+        self._legacy = set()
+        self._subscribed = set()
+        self._by_sensor = {}
+        self._by_location = {}
+        self._by_type = {}
+        self._areas = {}
+        self._ticker = None
+
+    def bind_loop(self, loop):
+        """Simpan event loop server (dipanggil dari dalam loop saat startup)"""
+        self.loop = loop
+        if self._ticker is None:
+            self._ticker = loop.create_task(self._tick())
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = ClientConnection(websocket, self.max_queue)
+        self.active_connections[websocket] = client
+        self._legacy.add(client)
+        WS_CLIENTS.inc()
+        client.task = asyncio.create_task(self._sender(client))
+
+    def disconnect(self, websocket: WebSocket):
+        """Hapus client; return sender task yang dibatalkan (jika ada)"""
+        client = self.active_connections.pop(websocket, None)
+        if client is None:
+            return None
+        self._unindex(client)
+        self._legacy.discard(client)
+        self.dropped += client.dropped
+        WS_CLIENTS.dec()
+        WS_SEND_QUEUE_DEPTH.dec(client.queue.qsize())
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+            return client.task
+        return None
+
+    async def close(self, websocket: WebSocket):
+        """Hapus client dan tunggu sender task-nya selesai"""
+        task = self.disconnect(websocket)
+        if task is not None:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _index(self, client):
+        subscription = client.subscription
+        for key, index in ((subscription.sensor_ids, self._by_sensor),
+                           (subscription.locations, self._by_location),
+                           (subscription.sensor_types, self._by_type)):
+            for value in key:
+                index.setdefault(value, set()).add(client)
+        self._subscribed.add(client)
+
+    def _unindex(self, client):
+        subscription = client.subscription
+        if subscription is None:
+            return
+        for key, index in ((subscription.sensor_ids, self._by_sensor),
+                           (subscription.locations, self._by_location),
+                           (subscription.sensor_types, self._by_type)):
+            for value in key:
+                clients = index.get(value)
+                if clients is not None:
+                    clients.discard(client)
+                    if not clients:
+                        del index[value]
+        self._subscribed.discard(client)
+
+    def handle_client_message(self, websocket: WebSocket, text):
+        """Proses pesan dari client: subscribe / unsubscribe (lainnya diabaikan)"""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(message, dict):
+            return
+
+        kind = message.get("type")
+        if kind == "subscribe":
+            try:
+                rate = float(message.get("max_rate") or self.max_frame_rate)
+            except (TypeError, ValueError):
+                rate = self.max_frame_rate
+            rate = min(max(rate, 0.1), self.max_frame_rate)
+
+            def values(key):
+                value = message.get(key) or ()
+                return [value] if isinstance(value, str) else [str(item) for item in value]
+
+            self._unindex(client)
+            self._legacy.discard(client)
+            client.subscription = Subscription(
+                values("sensor_ids"),
+                values("locations"),
+                values("sensor_types"),
+                interval=1.0 / rate,
+            )
+            self._index(client)
+            client.offer(json.dumps({"type": "subscribed", "max_rate": rate}))
+        elif kind == "unsubscribe":
+            self._unindex(client)
+            client.subscription = None
+            self._legacy.add(client)
+
+    async def _sender(self, client: ClientConnection):
+        websocket = client.websocket
+        try:
+            while True:
+                text = await client.queue.get()
+                WS_SEND_QUEUE_DEPTH.dec()
+                await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+                self.sent += 1
+                WS_FRAMES.labels("sent").inc()
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.disconnected_slow += 1
+            print(f"[Dashboard Service] Client WebSocket terlalu lambat, koneksi ditutup")
+            self.disconnect(websocket)
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+        except Exception as e:
+            print(f"[Dashboard Service] Client WebSocket terputus: {e}")
+            self.disconnect(websocket)
+
+    async def _tick(self):
+        """Kirim frame delta ke client subscribe yang sudah jatuh tempo"""
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            now = time.monotonic()
+            for client in list(self._subscribed):
+                subscription = client.subscription
+                if subscription is None or now < subscription.next_due:
+                    continue
+                frame = subscription.build_frame(self._areas)
+                if frame is not None:
+                    client.offer(json.dumps(frame))
+                    subscription.next_due = now + subscription.interval
+
+    def _dispatch(self, message, text):
+        with WS_FANOUT_SECONDS.time():
+            self._fan_out(message, text)
+
+    def _fan_out(self, message, text):
+        if self._legacy:
+            # Client legacy bisa tersambung setelah pesan diserialisasi di thread lain
+            text = text or json.dumps(message)
+            for client in list(self._legacy):
+                client.offer(text)
+
+        if "area_status" in message and message.get("location") is not None:
+            self._areas[message["location"]] = (message["area_status"], message.get("area_values"))
+
+        # Deteksi anomali tidak di-coalesce: dikirim utuh ke client yang cocok
+        alert = message.get("alert")
+        payload = message.get("payload") or alert
+        if not self._subscribed or not payload:
+            return
+        sensor_id = payload.get("sensor_id")
+        targets = set()
+        for index, key in ((self._by_sensor, sensor_id),
+                           (self._by_location, payload.get("location")),
+                           (self._by_type, payload.get("sensor_type"))):
+            clients = index.get(key)
+            if clients:
+                targets |= clients
+        if targets and alert is not None:
+            text = text or json.dumps(message)
+            for client in targets:
+                client.offer(text)
+        elif targets:
+            fields = flatten_payload(payload)
+            for client in targets:
+                client.subscription.stage(sensor_id, fields)
+
+    async def broadcast(self, message: dict):
+        """Broadcast dari dalam event loop server"""
+        text = json.dumps(message) if self._legacy else None
+        self._dispatch(message, text)
+
+    def publish_threadsafe(self, message: dict):
+        """Broadcast dari thread lain (mis. callback MQTT) tanpa menunggu pengiriman"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        # Serialisasi sekali untuk semua client legacy, di luar event loop
+        text = json.dumps(message) if self._legacy else None
+        self.loop.call_soon_threadsafe(self._dispatch, message, text)
+
+    def metrics(self):
+        clients = list(self.active_connections.values())
+        return {
+            "clients": len(clients),
+            "subscribed": len(self._subscribed),
+            "sent": self.sent,
+            "dropped": self.dropped + sum(client.dropped for client in clients),
+            "disconnected_slow": self.disconnected_slow,
+            "max_queue_depth": max((client.queue.qsize() for client in clients), default=0),
+        }
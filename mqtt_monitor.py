@@ -1,17 +1,38 @@
 #!/usr/bin/env python3
 """
 MQTT Monitoring Script untuk Forest Monitoring System
-Menampilkan komunikasi MQTT secara real-time
+Menampilkan komunikasi MQTT secara real-time (payload JSON maupun biner)
+
+Mode default mencetak setiap pesan. Untuk armada besar, --summary menampilkan
+tabel yang di-refresh berkala (laju per sensor, nilai terakhir, jumlah status,
+dan jitter antar-kedatangan dalam sliding window). --record menyimpan stream
+mentah ke file rekaman (telemetry_recording.py) untuk replay.
+
+Contoh:
+    python mqtt_monitor.py
+    python mqtt_monitor.py --summary --window 60 --refresh 1 --record fire-season.ftrc
 """
 
 import paho.mqtt.client as mqtt
+import argparse
 import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
 from datetime import datetime
 from colorama import Fore, Back, Style, init
 
+from telemetry_codec import BINARY_TOPIC, TELEMETRY_TOPIC, CodecError, TelemetryDecoder
+from telemetry_recording import RecordingWriter
+
 # Initialize colorama untuk colored output
 init(autoreset=True)
 
+# Decoder JSON/biner beserta registry node (dari topic sensors/registry/+)
+decoder = TelemetryDecoder()
+
 # Statistics
 stats = {
     "total_messages": 0,
@@ -19,20 +40,186 @@ stats = {
     "by_status": {"normal": 0, "warning": 0, "danger": 0}
 }
 
-def on_connect(client, userdata, flags, rc):
+STATUSES = ("normal", "warning", "danger")
+SEVERITY = {"normal": 0, "warning": 1, "danger": 2}
+
+# Diisi dari argumen command line di main()
+options = None
+summary = None
+recorder = None
+
+def colorize_status(status):
+    status = status.upper()
+    if status == "DANGER":
+        return f"{Fore.RED}{Back.WHITE}{status}{Style.RESET_ALL}"
+    elif status == "WARNING":
+        return f"{Fore.YELLOW}{Style.BRIGHT}{status}{Style.RESET_ALL}"
+    return f"{Fore.GREEN}{status}{Style.RESET_ALL}"
+
+def format_values(data):
+    """Nilai ringkas, mis. T=32.5 H=41.0"""
+    return " ".join(f"{key[:1].upper()}={value}" for key, value in (data or {}).items()) or "-"
+
+
+class SensorWindow:
+    """Reading satu sensor dalam sliding window: (waktu tiba, status)"""
+
+    __slots__ = ("sensor_type", "location", "readings", "last_data", "last_status", "last_seen", "first_seen")
+
+    def __init__(self, now):
+        self.readings = deque()
+        self.first_seen = now
+        self.last_seen = now
+        self.last_data = None
+        self.last_status = "unknown"
+        self.sensor_type = None
+        self.location = None
+
+    def prune(self, horizon):
+        readings = self.readings
+        while readings and readings[0][0] < horizon:
+            readings.popleft()
+
+    def jitter_ms(self):
+        """Simpangan baku selang antar-pesan (reading satu batch dihitung satu pesan)"""
+        arrivals = []
+        for arrival, _ in self.readings:
+            if not arrivals or arrival != arrivals[-1]:
+                arrivals.append(arrival)
+        if len(arrivals) < 3:
+            return None
+        gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+        return statistics.pstdev(gaps) * 1000.0
+
+
+class SummaryStats:
+    """Statistik per sensor dalam window untuk tabel ringkasan.
+
+    Thread MQTT hanya menambah data; pemangkasan dan agregasi dilakukan saat
+    render. Sensor yang diam satu window penuh dihapus.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.sensors = {}
+        self.total_messages = 0
+        self.total_readings = 0
+        self.total_bytes = 0
+        self.errors = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, payloads, size, arrival):
+        with self._lock:
+            self.total_messages += 1
+            self.total_bytes += size
+            for payload in payloads:
+                sensor_id = payload.get('sensor_id', 'unknown')
+                sensor = self.sensors.get(sensor_id)
+                if sensor is None:
+                    sensor = self.sensors[sensor_id] = SensorWindow(arrival)
+                status = str(payload.get('status', 'unknown')).lower()
+                sensor.readings.append((arrival, status))
+                sensor.sensor_type = payload.get('sensor_type')
+                sensor.location = payload.get('location')
+                sensor.last_data = payload.get('data')
+                sensor.last_status = status
+                sensor.last_seen = arrival
+                self.total_readings += 1
+
+    def add_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self, now):
+        """Baris tabel per sensor aktif dan total status dalam window"""
+        horizon = now - self.window
+        rows = []
+        totals = dict.fromkeys(STATUSES, 0)
+        with self._lock:
+            for sensor_id in list(self.sensors):
+                sensor = self.sensors[sensor_id]
+                sensor.prune(horizon)
+                if not sensor.readings:
+                    del self.sensors[sensor_id]
+                    continue
+                counts = dict.fromkeys(STATUSES, 0)
+                for _, status in sensor.readings:
+                    if status in counts:
+                        counts[status] += 1
+                for status in STATUSES:
+                    totals[status] += counts[status]
+                span = min(self.window, max(now - sensor.first_seen, 1e-9))
+                rows.append({
+                    "sensor_id": sensor_id,
+                    "sensor_type": sensor.sensor_type,
+                    "location": sensor.location,
+                    "readings": len(sensor.readings),
+                    "rate": len(sensor.readings) / span,
+                    "last_data": sensor.last_data,
+                    "last_status": sensor.last_status,
+                    "counts": counts,
+                    "jitter_ms": sensor.jitter_ms(),
+                    "age": now - sensor.last_seen,
+                })
+            totals["messages"] = self.total_messages
+            totals["readings"] = self.total_readings
+            totals["bytes"] = self.total_bytes
+            totals["errors"] = self.errors
+        rows.sort(key=lambda row: (-row["counts"]["danger"], -row["counts"]["warning"], -row["rate"], row["sensor_id"]))
+        return rows, totals
+
+
+def render_summary(top):
+    """Gambar ulang tabel ringkasan (satu kali tulis ke terminal per refresh)"""
+    now = time.time()
+    rows, totals = summary.snapshot(now)
+    span = min(summary.window, max(now - summary.started, 1e-9))
+    readings_in_window = sum(row["readings"] for row in rows)
+
+    lines = [
+        "\033[2J\033[H",
+        f"{Fore.CYAN}🌳 FOREST MONITORING - RINGKASAN MQTT  {datetime.now().strftime('%H:%M:%S')}  "
+        f"(window {summary.window:.0f} s){Style.RESET_ALL}",
+        f"Sensor aktif: {len(rows)}  Reading/s: {readings_in_window / span:.1f}  "
+        f"Total: {totals['messages']} pesan, {totals['readings']} reading, {totals['bytes'] / 1024:.1f} KiB  "
+        f"Error: {totals['errors']}",
+        f"Status (window): Normal={totals['normal']}  "
+        f"{Fore.YELLOW}Warning={totals['warning']}{Style.RESET_ALL}  "
+        f"{Fore.RED}Danger={totals['danger']}{Style.RESET_ALL}",
+    ]
+    if recorder is not None:
+        lines.append(f"{Fore.LIGHTBLACK_EX}Merekam ke {recorder.path}: {recorder.records} pesan{Style.RESET_ALL}")
+    lines.append("")
+    lines.append(f"{'SENSOR':<16} {'TIPE':<12} {'LOKASI':<24} {'MSG/S':>7} {'N':>5} {'W':>5} {'D':>5} "
+                 f"{'JITTER':>9} {'UMUR':>6}  NILAI TERAKHIR")
+    for row in rows[:top]:
+        jitter = f"{row['jitter_ms']:.0f} ms" if row["jitter_ms"] is not None else "-"
+        counts = row["counts"]
+        lines.append(
+            f"{str(row['sensor_id'])[:16]:<16} {str(row['sensor_type'])[:12]:<12} {str(row['location'])[:24]:<24} "
+            f"{row['rate']:>7.2f} {counts['normal']:>5} {counts['warning']:>5} {counts['danger']:>5} "
+            f"{jitter:>9} {row['age']:>5.0f}s  {format_values(row['last_data'])} {colorize_status(row['last_status'])}"
+        )
+    if len(rows) > top:
+        lines.append(f"{Fore.LIGHTBLACK_EX}... {len(rows) - top} sensor lain (--top untuk menampilkan lebih banyak){Style.RESET_ALL}")
+    print("\n".join(lines), flush=True)
+
+def on_connect(client, userdata, flags, rc, properties=None):
     """Callback ketika subscriber berhasil connect"""
     timestamp = datetime.now().strftime('%H:%M:%S')
     if rc == 0:
-        print(f"{Fore.GREEN}[{timestamp}] ✓ TERHUBUNG ke MQTT Broker (localhost:1883)")
-        print(f"{Fore.GREEN}[{timestamp}] ✓ Subscribe ke topic: 'sensors/telemetry'")
-        client.subscribe("sensors/telemetry")
+        topics = decoder.topics()
+        print(f"{Fore.GREEN}[{timestamp}] ✓ TERHUBUNG ke MQTT Broker ({options.host}:{options.port})")
+        print(f"{Fore.GREEN}[{timestamp}] ✓ Subscribe ke topic: {', '.join(topics)}")
+        client.subscribe([(topic, 0) for topic in topics])
         print(f"{Fore.CYAN}{'='*70}")
         print(f"{Fore.CYAN}Menunggu pesan MQTT dari sensor... (Tekan Ctrl+C untuk berhenti)")
         print(f"{Fore.CYAN}{'='*70}\n")
     else:
         print(f"{Fore.RED}[{timestamp}] ✗ Koneksi gagal, kode error: {rc}")
 
-def on_disconnect(client, userdata, rc):
+def on_disconnect(client, userdata, flags, rc, properties=None):
     """Callback ketika disconnected"""
     timestamp = datetime.now().strftime('%H:%M:%S')
     if rc != 0:
@@ -40,109 +227,167 @@ def on_disconnect(client, userdata, rc):
 
 def on_message(client, userdata, msg):
     """Callback ketika menerima pesan MQTT"""
+    arrival = time.time()
+    if recorder is not None:
+        # Stream mentah (termasuk registry) agar rekaman bisa di-decode saat replay
+        recorder.write(msg.topic, msg.payload, arrival)
+
+    if summary is not None:
+        try:
+            payloads = decoder.decode(msg.topic, msg.payload)
+        except (ValueError, CodecError):
+            summary.add_error()
+            return
+        if payloads:
+            summary.add(payloads, len(msg.payload), arrival)
+        return
+
+    show_message(msg)
+
+def show_message(msg):
+    """Mode default: cetak setiap reading dalam pesan"""
     global stats
     timestamp = datetime.now().strftime('%H:%M:%S')
-    
+
     try:
-        # Parse JSON payload
-        payload = json.loads(msg.payload.decode())
-        
-        # Extract fields
-        sensor_id = payload.get('sensor_id', 'unknown')
-        sensor_type = payload.get('sensor_type', 'unknown')
-        location = payload.get('location', 'unknown')
-        data = payload.get('data', {})
-        status = payload.get('status', 'unknown').upper()
-        message_timestamp = payload.get('timestamp', 'unknown')
-        
-        # Update stats
-        stats["total_messages"] += 1
-        if sensor_id not in stats["by_sensor"]:
-            stats["by_sensor"][sensor_id] = 0
-        stats["by_sensor"][sensor_id] += 1
-        if status.lower() in stats["by_status"]:
-            stats["by_status"][status.lower()] += 1
-        
-        # Colorize status
-        if status == "DANGER":
-            status_colored = f"{Fore.RED}{Back.WHITE}{status}{Style.RESET_ALL}"
-        elif status == "WARNING":
-            status_colored = f"{Fore.YELLOW}{Style.BRIGHT}{status}{Style.RESET_ALL}"
-        else:
-            status_colored = f"{Fore.GREEN}{status}{Style.RESET_ALL}"
-        
-        # Display message
-        print(f"{Fore.CYAN}[{timestamp}]{Style.RESET_ALL} 📡 MQTT MESSAGE")
-        print(f"  {Fore.BLUE}Topic:{Style.RESET_ALL} {msg.topic}")
-        print(f"  {Fore.BLUE}Sensor ID:{Style.RESET_ALL} {sensor_id} ({sensor_type})")
-        print(f"  {Fore.BLUE}Lokasi:{Style.RESET_ALL} {location}")
-        print(f"  {Fore.BLUE}Data:{Style.RESET_ALL} {data}")
-        print(f"  {Fore.BLUE}Status:{Style.RESET_ALL} {status_colored}")
-        print(f"  {Fore.BLUE}Timestamp Sensor:{Style.RESET_ALL} {message_timestamp}")
-        
-        # Show statistics every 10 messages
-        if stats["total_messages"] % 10 == 0:
-            print(f"\n{Fore.MAGENTA}📊 STATISTIK (Total: {stats['total_messages']} pesan){Style.RESET_ALL}")
-            for sensor, count in stats["by_sensor"].items():
-                print(f"  - {sensor}: {count} pesan")
-            print(f"  Status: Normal={stats['by_status']['normal']}, "
-                  f"Warning={stats['by_status']['warning']}, "
-                  f"Danger={stats['by_status']['danger']}")
-            print()
-        else:
-            print(f"  {Fore.LIGHTBLACK_EX}(Total pesan diterima: {stats['total_messages']}){Style.RESET_ALL}\n")
-            
-    except json.JSONDecodeError as e:
-        print(f"{Fore.RED}[{timestamp}] ✗ JSON Parse Error: {str(e)}")
-        print(f"{Fore.RED}  Raw message: {msg.payload.decode()}\n")
+        # Decode payload JSON atau biner (registry hanya memperbarui decoder)
+        payloads = decoder.decode(msg.topic, msg.payload)
+        if not payloads:
+            if msg.topic == BINARY_TOPIC:
+                print(f"{Fore.YELLOW}[{timestamp}] ⚠ Pesan biner dari node yang belum terdaftar di registry (ditahan)\n")
+            else:
+                print(f"{Fore.LIGHTBLACK_EX}[{timestamp}] Registry: {msg.topic} {msg.payload.decode()}\n")
+            return
+        # Pesan registry bisa membawa reading biner yang sempat ditahan decoder
+        payload_format = "JSON" if msg.topic == TELEMETRY_TOPIC else "biner"
+        batch_note = f", batch {len(payloads)} reading" if len(payloads) > 1 else ""
+
+        for payload in payloads:
+            # Extract fields
+            sensor_id = payload.get('sensor_id', 'unknown')
+            sensor_type = payload.get('sensor_type', 'unknown')
+            location = payload.get('location', 'unknown')
+            data = payload.get('data', {})
+            status = payload.get('status', 'unknown').upper()
+            message_timestamp = payload.get('timestamp', 'unknown')
+
+            # Update stats
+            stats["total_messages"] += 1
+            if sensor_id not in stats["by_sensor"]:
+                stats["by_sensor"][sensor_id] = 0
+            stats["by_sensor"][sensor_id] += 1
+            if status.lower() in stats["by_status"]:
+                stats["by_status"][status.lower()] += 1
+
+            # Display message
+            print(f"{Fore.CYAN}[{timestamp}]{Style.RESET_ALL} 📡 MQTT MESSAGE")
+            print(f"  {Fore.BLUE}Topic:{Style.RESET_ALL} {msg.topic} ({payload_format}, {len(msg.payload)} byte{batch_note})")
+            print(f"  {Fore.BLUE}Sensor ID:{Style.RESET_ALL} {sensor_id} ({sensor_type})")
+            print(f"  {Fore.BLUE}Lokasi:{Style.RESET_ALL} {location}")
+            print(f"  {Fore.BLUE}Data:{Style.RESET_ALL} {data}")
+            print(f"  {Fore.BLUE}Status:{Style.RESET_ALL} {colorize_status(status)}")
+            print(f"  {Fore.BLUE}Timestamp Sensor:{Style.RESET_ALL} {message_timestamp}")
+
+            # Show statistics every 10 messages
+            if stats["total_messages"] % 10 == 0:
+                print(f"\n{Fore.MAGENTA}📊 STATISTIK (Total: {stats['total_messages']} pesan){Style.RESET_ALL}")
+                for sensor, count in stats["by_sensor"].items():
+                    print(f"  - {sensor}: {count} pesan")
+                print(f"  Status: Normal={stats['by_status']['normal']}, "
+                      f"Warning={stats['by_status']['warning']}, "
+                      f"Danger={stats['by_status']['danger']}")
+                print()
+            else:
+                print(f"  {Fore.LIGHTBLACK_EX}(Total pesan diterima: {stats['total_messages']}){Style.RESET_ALL}\n")
+
+    except (json.JSONDecodeError, CodecError) as e:
+        print(f"{Fore.RED}[{timestamp}] ✗ Parse Error: {str(e)}")
+        print(f"{Fore.RED}  Raw message: {msg.payload!r}\n")
     except Exception as e:
         print(f"{Fore.RED}[{timestamp}] ✗ Error: {str(e)}\n")
 
+def print_final_stats():
+    print(f"\n{Fore.MAGENTA}{'='*70}")
+    print(f"{Fore.MAGENTA}📊 STATISTIK FINAL")
+    print(f"{Fore.MAGENTA}{'='*70}")
+    if summary is not None:
+        _, totals = summary.snapshot(time.time())
+        print(f"  Total pesan diterima: {totals['messages']} ({totals['readings']} reading)")
+        print(f"  Error decode: {totals['errors']}")
+    else:
+        print(f"  Total pesan diterima: {stats['total_messages']}")
+        print(f"  Per sensor:")
+        for sensor, count in stats["by_sensor"].items():
+            print(f"    - {sensor}: {count} pesan")
+        print(f"  Per status:")
+        print(f"    - NORMAL: {stats['by_status']['normal']}")
+        print(f"    - WARNING: {stats['by_status']['warning']}")
+        print(f"    - DANGER: {stats['by_status']['danger']}")
+    if recorder is not None:
+        print(f"  Rekaman: {recorder.records} pesan di {recorder.path}")
+    print(f"{Fore.MAGENTA}{'='*70}\n")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv('MQTT_BROKER_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('MQTT_BROKER_PORT', '1883')))
+    parser.add_argument('--summary', action='store_true', help='tabel ringkasan yang di-refresh, bukan per pesan')
+    parser.add_argument('--window', type=float, default=60.0, help='panjang sliding window ringkasan (detik)')
+    parser.add_argument('--refresh', type=float, default=1.0, help='interval refresh tabel (detik)')
+    parser.add_argument('--top', type=int, default=30, help='jumlah baris sensor yang ditampilkan')
+    parser.add_argument('--record', metavar='FILE', help='simpan stream mentah ke file rekaman (.gz = terkompresi)')
+    return parser.parse_args()
+
 def main():
     """Main function"""
+    global options, summary, recorder
+    options = parse_args()
+    if options.summary:
+        summary = SummaryStats(options.window)
+    if options.record:
+        recorder = RecordingWriter(options.record)
+
     print(f"\n{Fore.CYAN}{'='*70}")
     print(f"{Fore.CYAN}🌳 FOREST MONITORING - MQTT SUBSCRIBER")
     print(f"{Fore.CYAN}{'='*70}\n")
-    
-    # Create client
-    client = mqtt.Client("mqtt_monitor_client")
-    
+
+    # Create client (ID unik agar beberapa monitor bisa berjalan bersamaan)
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"mqtt_monitor_{os.getpid()}")
+
     # Set callbacks
     client.on_connect = on_connect
     client.on_disconnect = on_disconnect
     client.on_message = on_message
-    
+
     # Connect to broker
     print(f"{Fore.YELLOW}🔌 Menghubungkan ke MQTT Broker...")
     try:
-        client.connect("localhost", 1883, keepalive=60)
+        client.connect(options.host, options.port, keepalive=60)
     except ConnectionRefusedError:
         print(f"{Fore.RED}✗ Koneksi ditolak!")
-        print(f"{Fore.RED}  Pastikan MQTT Broker running di localhost:1883")
+        print(f"{Fore.RED}  Pastikan MQTT Broker running di {options.host}:{options.port}")
         print(f"{Fore.RED}  Jalankan: docker-compose up -d mqtt-broker")
         return
     except Exception as e:
         print(f"{Fore.RED}✗ Error: {str(e)}")
         return
-    
-    # Loop forever
+
+    # Network thread terpisah; thread utama hanya me-refresh tampilan
+    client.loop_start()
     try:
-        client.loop_forever()
+        while True:
+            time.sleep(options.refresh)
+            if summary is not None:
+                render_summary(options.top)
+            if recorder is not None:
+                recorder.flush()
     except KeyboardInterrupt:
         print(f"\n\n{Fore.YELLOW}⚠ Menghentikan subscriber...")
-        print(f"\n{Fore.MAGENTA}{'='*70}")
-        print(f"{Fore.MAGENTA}📊 STATISTIK FINAL")
-        print(f"{Fore.MAGENTA}{'='*70}")
-        print(f"  Total pesan diterima: {stats['total_messages']}")
-        print(f"  Per sensor:")
-        for sensor, count in stats["by_sensor"].items():
-            print(f"    - {sensor}: {count} pesan")
-        print(f"  Per status:")
-        print(f"    - NORMAL: {stats['by_status']['normal']}")
-        print(f"    - WARNING: {stats['by_status']['warning']}")
-        print(f"    - DANGER: {stats['by_status']['danger']}")
-        print(f"{Fore.MAGENTA}{'='*70}\n")
         client.disconnect()
+        client.loop_stop()
+        if recorder is not None:
+            recorder.close()
+        print_final_stats()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generators - Simulasi pembacaan sensor suhu, kelembaban, dan asap
+Dipakai oleh sensor.py (satu sensor per proses) dan loadgen.py (ribuan sensor
+virtual dalam satu proses). Parameter ``level`` memaksa kondisi tertentu,
+misalnya "danger" untuk skenario kebakaran.
+"""
+
+import random
+from datetime import datetime
+
+LEVELS = ("normal", "warning", "danger")
+
+
+def pick_level(rng=random):
+    """Randomize kondisi (80% normal, 15% warning, 5% danger)"""
+    rand = rng.random()
+    if rand < 0.80:
+        return "normal"
+    elif rand < 0.95:
+        return "warning"
+    return "danger"
+
+
+def current_timestamp():
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_payload(sensor_id, sensor_type, location, data, status, timestamp=None):
+    return {
+        "sensor_id": sensor_id,
+        "sensor_type": sensor_type,
+        "location": location,
+        "timestamp": timestamp or current_timestamp(),
+        "data": data,
+        "status": status
+    }
+
+
+def temperature_value(level, rng=random):
+    if level == "normal":
+        return round(rng.uniform(20, 35), 1)
+    elif level == "warning":
+        return round(rng.uniform(35, 45), 1)
+    return round(rng.uniform(45, 60), 1)
+
+
+def humidity_value(level, rng=random):
+    # Kelembaban tinggi = baik, kelembaban rendah = bahaya
+    if level == "normal":
+        return round(rng.uniform(40, 70), 1)
+    elif level == "warning":
+        return round(rng.uniform(30, 40), 1)
+    return round(rng.uniform(10, 30), 1)
+
+
+def smoke_value(level, rng=random):
+    if level == "normal":
+        return rng.randint(0, 300)
+    elif level == "warning":
+        return rng.randint(300, 600)
+    return rng.randint(600, 1000)
+
+
+# Fungsi untuk generate data sensor Temperature
+def generate_temperature_data(sensor_id, location, sensor_type="temperature", level=None, rng=random, timestamp=None):
+    """Mensimulasikan pembacaan sensor suhu"""
+    level = level or pick_level(rng)
+    return make_payload(sensor_id, sensor_type, location,
+                        {"temperature": temperature_value(level, rng)}, level, timestamp)
+
+
+# Fungsi untuk generate data sensor Humidity
+def generate_humidity_data(sensor_id, location, sensor_type="humidity", level=None, rng=random, timestamp=None):
+    """Mensimulasikan pembacaan sensor kelembaban"""
+    level = level or pick_level(rng)
+    return make_payload(sensor_id, sensor_type, location,
+                        {"humidity": humidity_value(level, rng)}, level, timestamp)
+
+
+# Fungsi untuk generate data sensor Smoke
+def generate_smoke_data(sensor_id, location, sensor_type="smoke", level=None, rng=random, timestamp=None):
+    """Mensimulasikan pembacaan sensor asap"""
+    level = level or pick_level(rng)
+    return make_payload(sensor_id, sensor_type, location,
+                        {"smoke": smoke_value(level, rng)}, level, timestamp)
+
+
+# Fungsi untuk generate data semua metrik sekaligus (tipe sensor lain)
+def generate_combined_data(sensor_id, location, sensor_type="all", level=None, rng=random, timestamp=None):
+    """Mensimulasikan sensor gabungan suhu, kelembaban, dan asap"""
+    level = level or pick_level(rng)
+    data = {
+        "temperature": temperature_value(level, rng),
+        "humidity": humidity_value(level, rng),
+        "smoke": smoke_value(level, rng)
+    }
+    return make_payload(sensor_id, sensor_type, location, data, level, timestamp)
+
+
+GENERATORS = {
+    "temperature": generate_temperature_data,
+    "humidity": generate_humidity_data,
+    "smoke": generate_smoke_data,
+}
+
+
+# Fungsi untuk generate data sensor sesuai tipenya
+def generate_sensor_data(sensor_id, sensor_type, location, level=None, rng=random, timestamp=None):
+    """
+    Mensimulasikan data sensor berdasarkan tipe sensor
+    """
+    generator = GENERATORS.get(sensor_type, generate_combined_data)
+    return generator(sensor_id, location, sensor_type=sensor_type, level=level, rng=rng, timestamp=timestamp)
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load Generator - Ribuan sensor virtual dari satu proses (asyncio) atau
+beberapa proses sekaligus, memakai generator yang sama dengan sensor.py
+
+Sensor dibagi rata ke beberapa koneksi MQTT per proses. Setiap sensor
+virtual adalah satu task asyncio yang mempublish sesuai interval/rate,
+dengan profil ramp-up dan skenario kebakaran (semua sensor di satu lokasi
+membaca "danger" selama jangka waktu tertentu). Throughput publish dan
+latensi publish -> PUBACK dilaporkan secara berkala.
+
+Contoh:
+    python loadgen.py --sensors 10000 --rate 2000 --processes 4 \\
+        --profile ramp --ramp-seconds 60 --fire "3@30+120" --duration 300
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import random
+import statistics
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from generators import generate_sensor_data
+from telemetry_codec import (
+    BINARY_TOPIC, FORMATS, TELEMETRY_TOPIC,
+    encode_binary_batch, encode_json, encode_registry, node_number, registry_topic,
+)
+
+SENSOR_TYPES = ("temperature", "humidity", "smoke")
+PROFILES = ("constant", "ramp", "step")
+
+# Sampel latensi maksimal per laporan per proses (subsample acak jika lebih)
+MAX_LATENCY_SAMPLES = 5000
+
+
+class VirtualSensor:
+    __slots__ = ("sensor_id", "sensor_type", "location", "node_num", "offset", "connection")
+
+    def __init__(self, sensor_id, sensor_type, location, offset):
+        self.sensor_id = sensor_id
+        self.sensor_type = sensor_type
+        self.location = location
+        self.node_num = node_number(sensor_id)
+        self.offset = offset
+        self.connection = 0
+
+
+class FireScenario:
+    """Lokasi yang dipaksa "danger" pada rentang waktu ``[start, start + duration)``"""
+
+    def __init__(self, location, start, duration):
+        self.location = location
+        self.start = start
+        self.duration = duration
+
+    @classmethod
+    def parse(cls, spec, location_prefix):
+        """Format ``LOKASI@MULAI+DURASI`` (detik); LOKASI berupa nomor area atau nama lengkap"""
+        try:
+            location, window = spec.rsplit("@", 1)
+            start, duration = window.split("+", 1)
+            if location.isdigit():
+                location = f"{location_prefix} {location}"
+            return cls(location, float(start), float(duration))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"format --fire tidak valid: {spec!r} (contoh: 3@30+120)")
+
+    def active(self, location, elapsed):
+        return location == self.location and self.start <= elapsed < self.start + self.duration
+
+
+def build_fleet(args):
+    """Sensor i: tipe bergiliran, tiga sensor (T/H/S) per lokasi, offset sesuai profil"""
+    rng = random.Random(args.seed)
+    interval = args.sensors / args.rate if args.rate else args.interval
+    per_step = max(1, args.sensors // max(1, args.steps))
+    fleet = []
+    for i in range(args.sensors):
+        if args.profile == "ramp":
+            offset = i / args.sensors * args.ramp_seconds
+        elif args.profile == "step":
+            offset = (i // per_step) * args.step_seconds
+        else:
+            offset = 0.0
+        # Jitter agar publish tersebar merata dalam satu interval
+        offset += rng.uniform(0, interval)
+        location = f"{args.location_prefix} {(i // len(SENSOR_TYPES)) % args.locations + 1}"
+        fleet.append(VirtualSensor(f"{args.prefix}-{i:05d}", SENSOR_TYPES[i % len(SENSOR_TYPES)], location, offset))
+    return fleet, interval
+
+
+class Publisher:
+    """Beberapa client MQTT dengan pencatatan latensi publish -> PUBACK (QoS 1)"""
+
+    def __init__(self, args, worker_index):
+        self.qos = args.qos
+        self.topic = BINARY_TOPIC if args.format == "binary" else TELEMETRY_TOPIC
+        self.format = args.format
+        self.sent_at = args.sent_at
+        self.clients = []
+        self._pending = []
+        self._locks = []
+        self._stats_lock = threading.Lock()
+        self.connected = threading.Semaphore(0)
+        self.published = 0
+        self.readings = 0
+        self.acked = 0
+        self.failed = 0
+        self.latencies = []
+
+        for index in range(args.connections):
+            self._pending.append({})
+            self._locks.append(threading.Lock())
+            client = mqtt.Client(
+                mqtt.CallbackAPIVersion.VERSION2,
+                client_id=f"{args.prefix}-loadgen-{os.getpid()}-{worker_index}-{index}",
+            )
+            client.max_inflight_messages_set(args.max_inflight)
+            client.on_connect = self._on_connect
+            client.on_publish = self._make_on_publish(index)
+            client.connect_async(args.host, args.port, keepalive=60)
+            self.clients.append(client)
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            self.connected.release()
+        else:
+            print(f"[loadgen] Gagal terhubung ke broker, kode error: {rc}")
+
+    def _make_on_publish(self, index):
+        pending = self._pending[index]
+        lock = self._locks[index]
+
+        def on_publish(client, userdata, mid, rc, properties=None):
+            with lock:
+                started = pending.pop(mid, None)
+            if started is not None:
+                latency = (time.perf_counter() - started) * 1000.0
+                with self._stats_lock:
+                    self.acked += 1
+                    self.latencies.append(latency)
+        return on_publish
+
+    def start(self, timeout=30):
+        for client in self.clients:
+            client.loop_start()
+        deadline = time.monotonic() + timeout
+        for _ in self.clients:
+            if not self.connected.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise RuntimeError("koneksi ke broker MQTT timeout")
+
+    def announce(self, sensors):
+        """Registry retained untuk format biner (identitas sensor dikirim sekali)"""
+        if self.format != "binary":
+            return
+        for sensor in sensors:
+            identity = {"sensor_id": sensor.sensor_id, "sensor_type": sensor.sensor_type, "location": sensor.location}
+            self.clients[sensor.connection].publish(
+                registry_topic(sensor.node_num), encode_registry(identity), qos=1, retain=True,
+            )
+
+    def send(self, sensor, batch):
+        sent_at = time.time() if self.sent_at else None
+        if self.format == "binary":
+            message = encode_binary_batch(sensor.node_num, batch, sent_at)
+        else:
+            message = encode_json(batch, sent_at)
+
+        index = sensor.connection
+        # Lock dipegang selama publish agar PUBACK tidak mendahului pencatatan mid
+        with self._locks[index]:
+            started = time.perf_counter()
+            result = self.clients[index].publish(self.topic, message, qos=self.qos)
+            ok = result.rc == mqtt.MQTT_ERR_SUCCESS
+            if ok and self.qos > 0:
+                self._pending[index][result.mid] = started
+        with self._stats_lock:
+            if ok:
+                self.published += 1
+                self.readings += len(batch)
+            else:
+                self.failed += 1
+
+    def outstanding(self):
+        return sum(len(pending) for pending in self._pending)
+
+    def snapshot(self):
+        """Counter kumulatif dan sampel latensi sejak snapshot sebelumnya"""
+        with self._stats_lock:
+            latencies, self.latencies = self.latencies, []
+            stats = {
+                "published": self.published,
+                "readings": self.readings,
+                "acked": self.acked,
+                "failed": self.failed,
+            }
+        if len(latencies) > MAX_LATENCY_SAMPLES:
+            latencies = random.sample(latencies, MAX_LATENCY_SAMPLES)
+        stats["latencies"] = latencies
+        return stats
+
+    def stop(self):
+        for client in self.clients:
+            client.disconnect()
+            client.loop_stop()
+
+
+async def drive(sensor, publisher, args, interval, fires, started, deadline, rng):
+    """Satu sensor virtual: publish setiap ``interval`` detik sampai ``deadline``"""
+    loop = asyncio.get_running_loop()
+    await asyncio.sleep(sensor.offset)
+    batch = []
+    next_due = loop.time()
+    while next_due < deadline:
+        elapsed = loop.time() - started
+        level = "danger" if any(fire.active(sensor.location, elapsed) for fire in fires) else None
+        batch.append(generate_sensor_data(sensor.sensor_id, sensor.sensor_type, sensor.location, level=level, rng=rng))
+        if len(batch) >= args.batch_size:
+            publisher.send(sensor, batch)
+            batch = []
+        next_due += interval
+        if next_due < deadline:
+            await asyncio.sleep(max(0.0, next_due - loop.time()))
+    if batch:
+        publisher.send(sensor, batch)
+
+
+async def run_fleet(args, sensors, interval, worker_index, report):
+    publisher = Publisher(args, worker_index)
+    for position, sensor in enumerate(sensors):
+        sensor.connection = position % args.connections
+    await asyncio.to_thread(publisher.start)
+    publisher.announce(sensors)
+
+    fires = [FireScenario.parse(spec, args.location_prefix) for spec in args.fire]
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + args.duration
+    rng = random.Random((args.seed or 0) + worker_index)
+    tasks = [
+        asyncio.create_task(drive(sensor, publisher, args, interval, fires, started, deadline, rng))
+        for sensor in sensors
+    ]
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(args.report_interval)
+            elapsed = loop.time() - started
+            active = sum(1 for sensor in sensors if sensor.offset <= elapsed)
+            report(worker_index, dict(publisher.snapshot(), elapsed=elapsed, active=active))
+
+    reporter_task = asyncio.create_task(reporter())
+    await asyncio.gather(*tasks)
+    reporter_task.cancel()
+
+    # Tunggu PUBACK yang masih tertunda sebelum memutus koneksi
+    drain_deadline = loop.time() + args.drain_timeout
+    while publisher.outstanding() and loop.time() < drain_deadline:
+        await asyncio.sleep(0.1)
+    # Throughput akhir dihitung atas jendela publish, bukan termasuk waktu drain
+    report(worker_index, dict(publisher.snapshot(), elapsed=args.duration, active=len(sensors),
+                              outstanding=publisher.outstanding(), final=True))
+    publisher.stop()
+
+
+def worker_main(args, sensors, interval, worker_index, reports):
+    """Entry point proses worker: hasil dikirim ke proses induk lewat ``reports``"""
+    asyncio.run(run_fleet(args, sensors, interval, worker_index,
+                          lambda index, stats: reports.put((index, stats))))
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))]
+
+
+class Aggregator:
+    """Gabungkan laporan semua proses dan cetak throughput/latensi"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.latest = {}
+        self.finished = set()
+        self.previous = {"published": 0, "readings": 0, "elapsed": 0.0}
+        self.all_latencies = []
+
+    def add(self, index, stats):
+        latencies = stats.pop("latencies")
+        self.all_latencies.extend(latencies)
+        if len(self.all_latencies) > 20 * MAX_LATENCY_SAMPLES:
+            self.all_latencies = random.sample(self.all_latencies, 10 * MAX_LATENCY_SAMPLES)
+        self.latest[index] = stats
+        if stats.get("final"):
+            self.finished.add(index)
+        return latencies
+
+    def totals(self):
+        keys = ("published", "readings", "acked", "failed", "active", "outstanding")
+        totals = {key: sum(stats.get(key, 0) for stats in self.latest.values()) for key in keys}
+        totals["elapsed"] = max((stats["elapsed"] for stats in self.latest.values()), default=0.0)
+        return totals
+
+    def print_interval(self, latencies):
+        totals = self.totals()
+        span = max(1e-9, totals["elapsed"] - self.previous["elapsed"])
+        print(f"[loadgen] t={totals['elapsed']:6.1f}s  aktif {totals['active']} sensor  "
+              f"{(totals['published'] - self.previous['published']) / span:8.1f} pesan/s  "
+              f"{(totals['readings'] - self.previous['readings']) / span:8.1f} reading/s  "
+              f"ack p50={percentile(latencies, 0.5):.1f} ms p99={percentile(latencies, 0.99):.1f} ms  "
+              f"gagal {totals['failed']}")
+        self.previous = totals
+
+    def print_summary(self):
+        totals = self.totals()
+        elapsed = max(1e-9, totals["elapsed"])
+        samples = self.all_latencies
+        print("[loadgen] ===== Ringkasan =====")
+        print(f"[loadgen] Pesan dipublish : {totals['published']} ({totals['published'] / elapsed:.1f} pesan/s)")
+        print(f"[loadgen] Reading         : {totals['readings']} ({totals['readings'] / elapsed:.1f} reading/s)")
+        print(f"[loadgen] PUBACK diterima : {totals['acked']}  tertunda: {totals['outstanding']}  gagal: {totals['failed']}")
+        if samples:
+            print(f"[loadgen] Latensi publish->PUBACK: p50={percentile(samples, 0.5):.1f} ms  "
+                  f"p99={percentile(samples, 0.99):.1f} ms  mean={statistics.fmean(samples):.1f} ms  "
+                  f"max={max(samples):.1f} ms")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv('MQTT_BROKER_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('MQTT_BROKER_PORT', '1883')))
+    parser.add_argument('--sensors', type=int, default=1000, help='jumlah sensor virtual')
+    parser.add_argument('--interval', type=float, default=10.0, help='interval sampling per sensor (detik)')
+    parser.add_argument('--rate', type=float, help='total reading/detik (menimpa --interval)')
+    parser.add_argument('--duration', type=float, default=60.0, help='lama pengujian (detik)')
+    parser.add_argument('--processes', type=int, default=1, help='jumlah proses (sensor dibagi rata)')
+    parser.add_argument('--connections', type=int, default=4, help='koneksi MQTT per proses')
+    parser.add_argument('--max-inflight', type=int, default=100, help='pesan QoS 1 tanpa ACK per koneksi')
+    parser.add_argument('--qos', type=int, choices=(0, 1), default=1)
+    parser.add_argument('--format', choices=FORMATS, default='json')
+    parser.add_argument('--batch-size', type=int, default=1, help='reading per pesan')
+    parser.add_argument('--sent-at', action=argparse.BooleanOptionalAction, default=True,
+                        help='sertakan waktu publish di setiap pesan (metrik latensi end-to-end)')
+    parser.add_argument('--profile', choices=PROFILES, default='constant',
+                        help='constant: semua sensor mulai bersamaan; ramp: bertahap linear; step: bertingkat')
+    parser.add_argument('--ramp-seconds', type=float, default=60.0)
+    parser.add_argument('--steps', type=int, default=5)
+    parser.add_argument('--step-seconds', type=float, default=30.0)
+    parser.add_argument('--locations', type=int, default=100, help='jumlah lokasi (area)')
+    parser.add_argument('--location-prefix', default='Hutan Lindung Area')
+    parser.add_argument('--fire', action='append', default=[], metavar='LOKASI@MULAI+DURASI',
+                        help='skenario kebakaran, mis. 3@30+120 (boleh diulang)')
+    parser.add_argument('--prefix', default='vs', help='prefix sensor_id virtual')
+    parser.add_argument('--report-interval', type=float, default=5.0)
+    parser.add_argument('--drain-timeout', type=float, default=10.0, help='batas tunggu PUBACK di akhir')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+    for spec in args.fire:
+        FireScenario.parse(spec, args.location_prefix)
+    args.batch_size = max(1, args.batch_size)
+    args.processes = max(1, min(args.processes, args.sensors))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fleet, interval = build_fleet(args)
+    print(f"[loadgen] {args.sensors} sensor, interval {interval:.3f} s "
+          f"(~{args.sensors / interval:.0f} reading/s), {args.processes} proses x {args.connections} koneksi, "
+          f"profil {args.profile}, format {args.format}, batch {args.batch_size}")
+    for spec in args.fire:
+        fire = FireScenario.parse(spec, args.location_prefix)
+        print(f"[loadgen] Skenario kebakaran: {fire.location} pada t={fire.start:.0f}s selama {fire.duration:.0f}s")
+
+    aggregator = Aggregator(args.processes)
+    reports = multiprocessing.Queue() if args.processes > 1 else queue.Queue()
+    shards = [fleet[index::args.processes] for index in range(args.processes)]
+
+    if args.processes == 1:
+        runner = threading.Thread(target=worker_main, args=(args, shards[0], interval, 0, reports), daemon=True)
+        runner.start()
+        workers = [runner]
+    else:
+        workers = [
+            multiprocessing.Process(target=worker_main, args=(args, shard, interval, index, reports), daemon=True)
+            for index, shard in enumerate(shards)
+        ]
+        for worker in workers:
+            worker.start()
+
+    pending = {}
+    try:
+        while len(aggregator.finished) < args.processes:
+            try:
+                index, stats = reports.get(timeout=1.0)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    break
+                continue
+            # Satu baris laporan setelah semua proses melapor untuk interval ini
+            pending.setdefault(index, []).extend(aggregator.add(index, stats))
+            if len(pending) == args.processes and not stats.get("final"):
+                aggregator.print_interval([latency for samples in pending.values() for latency in samples])
+                pending = {}
+    except KeyboardInterrupt:
+        print("\n[loadgen] Dihentikan.")
+    aggregator.print_summary()
+
+
+if __name__ == "__main__":
+    main()
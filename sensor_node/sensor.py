@@ -9,10 +9,16 @@ Setiap sensor mengirim tipe data spesifik sesuai jenisnya
 import paho.mqtt.client as mqtt
 import json
 import time
-import random
 import os
 import sys
-from datetime import datetime
+import threading
+
+from generators import generate_sensor_data
+from spool import DiskSpool
+from telemetry_codec import (
+    BINARY_TOPIC, FORMATS, TELEMETRY_TOPIC,
+    encode_binary_batch, encode_json, encode_registry, node_number, registry_topic,
+)
 
 # Konfigurasi dari environment variables
 BROKER_HOST = os.getenv('MQTT_BROKER_HOST', 'broker')
@@ -20,9 +26,34 @@ BROKER_PORT = 1883
 SENSOR_ID = os.getenv('SENSOR_ID', 'temp-01')
 SENSOR_TYPE = os.getenv('SENSOR_TYPE', 'temperature')  # temperature, humidity, smoke
 LOCATION = os.getenv('LOCATION', 'Hutan Lindung Area 1')
-TOPIC = "sensors/telemetry"
 INTERVAL = int(os.getenv('SAMPLE_INTERVAL', '3'))  # Interval pengiriman dalam detik
 
+# Format payload: json (default) atau binary (ringkas, ke topic sensors/telemetry/bin)
+PAYLOAD_FORMAT = os.getenv('PAYLOAD_FORMAT', 'json')
+if PAYLOAD_FORMAT not in FORMATS:
+    print(f"[{SENSOR_ID}] PAYLOAD_FORMAT tidak dikenal: {PAYLOAD_FORMAT}")
+    sys.exit(1)
+# Nomor node untuk format biner (default: diturunkan dari SENSOR_ID)
+NODE_NUM = int(os.getenv('NODE_NUM', str(node_number(SENSOR_ID))))
+TOPIC = BINARY_TOPIC if PAYLOAD_FORMAT == 'binary' else TELEMETRY_TOPIC
+
+# Sertakan waktu publish (sent_at) di setiap pesan untuk metrik latensi end-to-end
+PUBLISH_TIMESTAMP = os.getenv('PUBLISH_TIMESTAMP', 'true').lower() in ('1', 'true', 'yes')
+
+# Batching: kirim satu pesan per BATCH_SIZE sampel atau per BATCH_INTERVAL detik
+BATCH_SIZE = max(1, int(os.getenv('BATCH_SIZE', '1')))  # 1 = satu pesan per sampel
+BATCH_INTERVAL = float(os.getenv('BATCH_INTERVAL', '0'))  # detik, 0 = hanya berdasarkan ukuran
+
+# Spool di disk untuk batch yang belum di-ACK broker (kosong = nonaktif)
+SPOOL_DIR = os.getenv('SPOOL_DIR', '')
+SPOOL_MAX_BATCHES = int(os.getenv('SPOOL_MAX_BATCHES', '10000'))
+spool = DiskSpool(os.path.join(SPOOL_DIR, SENSOR_ID), SPOOL_MAX_BATCHES) if SPOOL_DIR else None
+
+# mid MQTT -> nomor urut spool untuk batch yang menunggu PUBACK
+inflight = {}
+inflight_lock = threading.Lock()
+connected = threading.Event()
+
 # Callback saat koneksi berhasil
 def on_connect(client, userdata, flags, rc, properties=None):
     if rc == 0:
@@ -31,6 +62,13 @@ def on_connect(client, userdata, flags, rc, properties=None):
         command_topic = f"sensors/command/{SENSOR_ID}"
         client.subscribe(command_topic)
         print(f"[{SENSOR_ID}] Subscribe ke topic: {command_topic}")
+        if PAYLOAD_FORMAT == 'binary':
+            # Identitas sensor diumumkan sekali (retained), tidak diulang di setiap pesan
+            identity = {"sensor_id": SENSOR_ID, "sensor_type": SENSOR_TYPE, "location": LOCATION}
+            client.publish(registry_topic(NODE_NUM), encode_registry(identity), qos=1, retain=True)
+            print(f"[{SENSOR_ID}] Registry node {NODE_NUM} dipublish ke {registry_topic(NODE_NUM)}")
+        connected.set()
+        replay_spool(client)
     else:
         print(f"[{SENSOR_ID}] Gagal terhubung ke broker, kode error: {rc}")
         sys.exit(1)
@@ -48,174 +86,116 @@ def on_message(client, userdata, message):
     except Exception as e:
         print(f"[{SENSOR_ID}] Error memproses command: {e}")
 
-# Fungsi untuk generate data sensor Temperature
-def generate_temperature_data():
-    """Mensimulasikan pembacaan sensor suhu"""
-    # Randomize kondisi (80% normal, 15% warning, 5% danger)
-    rand = random.random()
-    
-    if rand < 0.80:  # Normal
-        temperature = round(random.uniform(20, 35), 1)
-        status = "normal"
-    elif rand < 0.95:  # Warning
-        temperature = round(random.uniform(35, 45), 1)
-        status = "warning"
-    else:  # Danger
-        temperature = round(random.uniform(45, 60), 1)
-        status = "danger"
-    
-    return {
-        "sensor_id": SENSOR_ID,
-        "sensor_type": SENSOR_TYPE,
-        "location": LOCATION,
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "data": {
-            "temperature": temperature
-        },
-        "status": status
-    }
-
-# Fungsi untuk generate data sensor Humidity
-def generate_humidity_data():
-    """Mensimulasikan pembacaan sensor kelembaban"""
-    # Randomize kondisi (80% normal, 15% warning, 5% danger)
-    rand = random.random()
-    
-    if rand < 0.80:  # Normal (kelembaban tinggi = baik)
-        humidity = round(random.uniform(40, 70), 1)
-        status = "normal"
-    elif rand < 0.95:  # Warning
-        humidity = round(random.uniform(30, 40), 1)
-        status = "warning"
-    else:  # Danger (kelembaban rendah = bahaya)
-        humidity = round(random.uniform(10, 30), 1)
-        status = "danger"
-    
-    return {
-        "sensor_id": SENSOR_ID,
-        "sensor_type": SENSOR_TYPE,
-        "location": LOCATION,
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "data": {
-            "humidity": humidity
-        },
-        "status": status
-    }
-
-# Fungsi untuk generate data sensor Smoke
-def generate_smoke_data():
-    """Mensimulasikan pembacaan sensor asap"""
-    # Randomize kondisi (80% normal, 15% warning, 5% danger)
-    rand = random.random()
-    
-    if rand < 0.80:  # Normal
-        smoke = random.randint(0, 300)
-        status = "normal"
-    elif rand < 0.95:  # Warning
-        smoke = random.randint(300, 600)
-        status = "warning"
-    else:  # Danger
-        smoke = random.randint(600, 1000)
-        status = "danger"
-    
-    return {
-        "sensor_id": SENSOR_ID,
-        "sensor_type": SENSOR_TYPE,
-        "location": LOCATION,
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "data": {
-            "smoke": smoke
-        },
-        "status": status
-    }
-
-# Fungsi untuk generate data sensor sesuai tipenya
-def generate_sensor_data():
-    """
-    Mensimulasikan data sensor berdasarkan tipe sensor
-    """
+# Callback saat koneksi terputus
+def on_disconnect(client, userdata, flags, rc, properties=None):
+    connected.clear()
+    if rc != 0:
+        print(f"[{SENSOR_ID}] Koneksi terputus. Mencoba reconnect...")
+
+# Callback saat broker meng-ACK pesan QoS 1: batch boleh dihapus dari spool
+def on_publish(client, userdata, mid, rc, properties=None):
+    with inflight_lock:
+        seq = inflight.pop(mid, None)
+    if seq is not None:
+        spool.remove(seq)
+
+def send(client, message, seq=None):
+    """Publish QoS 1; batch dari spool dicatat sampai PUBACK diterima"""
+    # Lock dipegang selama publish agar PUBACK tidak mendahului pencatatan mid
+    with inflight_lock:
+        result = client.publish(TOPIC, message, qos=1)
+        if seq is not None and result.rc == mqtt.MQTT_ERR_SUCCESS:
+            inflight[result.mid] = seq
+    return result
+
+def replay_spool(client):
+    """Kirim ulang batch yang belum di-ACK (dari sebelum reconnect atau restart)"""
+    if spool is None:
+        return
+    with inflight_lock:
+        # Pesan yang masih di-track paho dikirim ulang oleh paho sendiri
+        tracked = set(inflight.values())
+    pending = [seq for seq in spool.pending() if seq not in tracked]
+    if pending:
+        print(f"[{SENSOR_ID}] Replay {len(pending)} batch dari spool...")
+    for seq in pending:
+        message = spool.read(seq)
+        if message is not None:
+            send(client, message, seq)
+
+def encode_batch(batch):
+    # Waktu publish resolusi tinggi untuk mengukur latensi sensor -> dashboard
+    sent_at = time.time() if PUBLISH_TIMESTAMP else None
+    if PAYLOAD_FORMAT == 'binary':
+        return encode_binary_batch(NODE_NUM, batch, sent_at)
+    return encode_json(batch, sent_at)
+
+def describe(sensor_data):
     if SENSOR_TYPE == "temperature":
-        return generate_temperature_data()
+        return f"Temp={sensor_data['data']['temperature']}°C - Status: {sensor_data['status']}"
     elif SENSOR_TYPE == "humidity":
-        return generate_humidity_data()
+        return f"Hum={sensor_data['data']['humidity']}% - Status: {sensor_data['status']}"
     elif SENSOR_TYPE == "smoke":
-        return generate_smoke_data()
-    else:
-        # Default: return all data
-        rand = random.random()
-        if rand < 0.80:
-            temperature = round(random.uniform(20, 35), 1)
-            humidity = round(random.uniform(40, 70), 1)
-            smoke = random.randint(0, 300)
-            status = "normal"
-        elif rand < 0.95:
-            temperature = round(random.uniform(35, 45), 1)
-            humidity = round(random.uniform(30, 40), 1)
-            smoke = random.randint(300, 600)
-            status = "warning"
-        else:
-            temperature = round(random.uniform(45, 60), 1)
-            humidity = round(random.uniform(10, 30), 1)
-            smoke = random.randint(600, 1000)
-            status = "danger"
-        
-        return {
-            "sensor_id": SENSOR_ID,
-            "sensor_type": SENSOR_TYPE,
-            "location": LOCATION,
-            "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "data": {
-                "temperature": temperature,
-                "humidity": humidity,
-                "smoke": smoke
-            },
-            "status": status
-        }
+        return f"Smoke={sensor_data['data']['smoke']} - Status: {sensor_data['status']}"
+    return f"Status: {sensor_data['status']}"
 
-# Callback saat koneksi terputus
-def on_disconnect(client, userdata, rc):
-    if rc != 0:
-        print(f"[{SENSOR_ID}] Koneksi terputus. Mencoba reconnect...")
+def publish_batch(client, batch):
+    """Tulis batch ke spool lalu publish; saat offline batch menunggu replay"""
+    message = encode_batch(batch)
+    seq = spool.append(message) if spool is not None else None
+    label = describe(batch[-1]) if len(batch) == 1 else f"batch {len(batch)} reading, terakhir {describe(batch[-1])}"
+
+    if seq is not None and not connected.is_set():
+        print(f"[{SENSOR_ID}] Broker tidak terhubung, disimpan ke spool ({len(spool)} batch): {label}")
+        return
+
+    result = send(client, message, seq)
+    if result.rc == mqtt.MQTT_ERR_SUCCESS:
+        print(f"[{SENSOR_ID}] Published: {label}")
+    else:
+        print(f"[{SENSOR_ID}] Gagal publish data, error code: {result.rc}")
 
 # Inisialisasi klien MQTT
 client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=SENSOR_ID)
 client.on_connect = on_connect
 client.on_message = on_message
 client.on_disconnect = on_disconnect
+client.on_publish = on_publish
 
 # Menghubungkan ke broker
 try:
     print(f"[{SENSOR_ID}] Menghubungkan ke broker {BROKER_HOST}:{BROKER_PORT}...")
-    client.connect(BROKER_HOST, BROKER_PORT, keepalive=60)
+    if spool is not None:
+        # Broker belum siap saat start: sampel tetap dikumpulkan ke spool
+        client.connect_async(BROKER_HOST, BROKER_PORT, keepalive=60)
+    else:
+        client.connect(BROKER_HOST, BROKER_PORT, keepalive=60)
     client.loop_start()  # Start loop in background thread
 except Exception as e:
     print(f"[{SENSOR_ID}] Gagal menghubungkan ke broker: {e}")
     sys.exit(1)
 
 # Loop utama untuk mengirim data
+batch = []
 try:
-    print(f"[{SENSOR_ID}] Mulai mengirim data sensor {SENSOR_TYPE} setiap {INTERVAL} detik...")
+    print(f"[{SENSOR_ID}] Mulai mengirim data sensor {SENSOR_TYPE} ({PAYLOAD_FORMAT}) setiap {INTERVAL} detik...")
+    batch_started = time.monotonic()
     while True:
-        # Generate dan kirim data sensor
-        sensor_data = generate_sensor_data()
-        message = json.dumps(sensor_data)
-        
-        result = client.publish(TOPIC, message, qos=1)
-        
-        if result.rc == mqtt.MQTT_ERR_SUCCESS:
-            if SENSOR_TYPE == "temperature":
-                print(f"[{SENSOR_ID}] Published: Temp={sensor_data['data']['temperature']}°C - Status: {sensor_data['status']}")
-            elif SENSOR_TYPE == "humidity":
-                print(f"[{SENSOR_ID}] Published: Hum={sensor_data['data']['humidity']}% - Status: {sensor_data['status']}")
-            elif SENSOR_TYPE == "smoke":
-                print(f"[{SENSOR_ID}] Published: Smoke={sensor_data['data']['smoke']} - Status: {sensor_data['status']}")
-        else:
-            print(f"[{SENSOR_ID}] Gagal publish data, error code: {result.rc}")
-        
+        # Generate data sensor, kirim saat batch penuh atau sudah cukup lama
+        if not batch:
+            batch_started = time.monotonic()
+        batch.append(generate_sensor_data(SENSOR_ID, SENSOR_TYPE, LOCATION))
+        if len(batch) >= BATCH_SIZE or (BATCH_INTERVAL > 0 and time.monotonic() - batch_started >= BATCH_INTERVAL):
+            publish_batch(client, batch)
+            batch = []
+
         time.sleep(INTERVAL)
 
 except KeyboardInterrupt:
     print(f"\n[{SENSOR_ID}] Publisher dihentikan.")
+    if batch:
+        # Sisa batch disimpan ke spool (atau dipublish) sebelum berhenti
+        publish_batch(client, batch)
     client.loop_stop()
     client.disconnect()
 except Exception as e:
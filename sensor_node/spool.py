@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spool - Ring buffer di disk untuk pesan sensor yang belum di-ACK broker
+Setiap batch ditulis ke file sebelum dipublish dan dihapus setelah PUBACK,
+sehingga data tidak hilang saat broker tidak bisa dihubungi atau proses restart
+"""
+
+import os
+import threading
+from collections import deque
+
+
+class DiskSpool:
+    """Ring buffer write-ahead, satu file per pesan.
+
+    Nama file berupa nomor urut naik sehingga replay mengikuti urutan publish;
+    lebih dari ``max_messages`` pesan tertunda, file tertua dihapus.
+    """
+
+    SUFFIX = ".msg"
+
+    def __init__(self, directory, max_messages=10000):
+        self.directory = directory
+        self.max_messages = max_messages
+        self.dropped = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._pending = deque(sorted(
+            int(name[:-len(self.SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(self.SUFFIX) and name[:-len(self.SUFFIX)].isdigit()
+        ))
+        self._next = self._pending[-1] + 1 if self._pending else 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _path(self, seq):
+        return os.path.join(self.directory, f"{seq:012d}{self.SUFFIX}")
+
+    def append(self, data):
+        """Simpan pesan secara atomik; return nomor urutnya"""
+        with self._lock:
+            seq = self._next
+            self._next += 1
+            tmp = self._path(seq) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path(seq))
+            self._pending.append(seq)
+            while len(self._pending) > self.max_messages:
+                self._unlink(self._pending.popleft())
+                self.dropped += 1
+            return seq
+
+    def read(self, seq):
+        try:
+            with open(self._path(seq), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def remove(self, seq):
+        """Hapus pesan yang sudah di-ACK broker"""
+        with self._lock:
+            try:
+                self._pending.remove(seq)
+            except ValueError:
+                return
+            self._unlink(seq)
+
+    def pending(self):
+        """Nomor urut pesan yang belum di-ACK, dari yang tertua"""
+        with self._lock:
+            return list(self._pending)
+
+    def _unlink(self, seq):
+        try:
+            os.remove(self._path(seq))
+        except FileNotFoundError:
+            pass
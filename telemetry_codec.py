@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telemetry Codec - Format payload telemetri JSON dan biner ringkas
+Dipakai bersama oleh sensor_node, dashboard_service, dan mqtt_monitor.py
+
+Satu pesan bisa berisi satu reading atau satu batch. Batch JSON berbentuk
+``{"sensor_id", "sensor_type", "location", "readings": [{"timestamp", "data",
+"status"}, ...]}``; batch biner adalah beberapa record di bawah yang
+disambung berurutan.
+
+Format biner dikirim ke topic ``sensors/telemetry/bin`` (JSON tetap di
+``sensors/telemetry``). Identitas sensor tidak diulang di setiap pesan:
+node mengumumkan ``sensor_id``/``sensor_type``/``location`` sekali lewat pesan
+retained di ``sensors/registry/<node_num>``, lalu setiap reading hanya berisi
+nomor node, epoch, status, dan nilai float32 (presisi 3 desimal).
+
+    offset  ukuran  isi
+    0       1       magic (0xF7)
+    1       1       versi format (1)
+    2       4       node_num (uint32, little-endian)
+    6       4       timestamp epoch UTC (uint32, detik)
+    10      1       indeks sensor_type (SENSOR_TYPES, 255 = lainnya)
+    11      1       indeks status (STATUSES, 255 = lainnya)
+    12      1       bitmask metrik yang ada (bit i = METRICS[i])
+    13      4*n     nilai float32 untuk setiap bit yang aktif
+
+Waktu publish (``sent_at``, epoch detik resolusi mikrodetik) dipakai untuk
+mengukur latensi sensor -> service. Di JSON berupa field ``sent_at`` pada
+pesan; di biner berupa record 9 byte di awal pesan (magic 0xF8 lalu epoch
+mikrodetik uint64) yang berlaku untuk semua record sesudahnya.
+"""
+
+import calendar
+import json
+import struct
+import time
+import zlib
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+TELEMETRY_TOPIC = "sensors/telemetry"
+BINARY_TOPIC = TELEMETRY_TOPIC + "/bin"
+REGISTRY_TOPIC = "sensors/registry"
+
+FORMATS = ("json", "binary")
+
+MAGIC = 0xF7
+SENT_AT_MAGIC = 0xF8
+VERSION = 1
+METRICS = ("temperature", "humidity", "smoke")
+SENSOR_TYPES = ("temperature", "humidity", "smoke", "all")
+STATUSES = ("normal", "warning", "danger")
+UNKNOWN = 255
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+_HEADER = struct.Struct("<BBIIBBB")
+_VALUE = struct.Struct("<f")
+_SENT_AT = struct.Struct("<BQ")
+
+
+class CodecError(ValueError):
+    """Payload biner rusak atau versi tidak dikenal"""
+
+
+def node_number(sensor_id):
+    """Nomor node default (uint32) yang diturunkan dari sensor_id"""
+    return zlib.crc32(sensor_id.encode())
+
+
+def format_timestamp(epoch):
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(epoch))
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(text):
+    """Timestamp reading (TIMESTAMP_FORMAT, UTC) -> detik epoch.
+
+    Satu-satunya parser timestamp; banyak reading berbagi detik yang sama.
+    """
+    return calendar.timegm(time.strptime(text, TIMESTAMP_FORMAT))
+
+
+def _index(values, value):
+    try:
+        return values.index(value)
+    except ValueError:
+        return UNKNOWN
+
+
+def registry_topic(node_num):
+    return f"{REGISTRY_TOPIC}/{node_num}"
+
+
+def encode_registry(payload):
+    """Pesan registry (retained) berisi identitas sensor dari payload JSON"""
+    return json.dumps({
+        "sensor_id": payload["sensor_id"],
+        "sensor_type": payload.get("sensor_type"),
+        "location": payload.get("location"),
+    }).encode()
+
+
+def encode_json(payloads, sent_at=None):
+    """Pesan JSON: reading tunggal apa adanya, lebih dari satu sebagai batch"""
+    if len(payloads) > 1:
+        return encode_json_batch(payloads, sent_at)
+    message = dict(payloads[0])
+    if sent_at is not None:
+        message["sent_at"] = sent_at
+    return json.dumps(message).encode()
+
+
+def encode_json_batch(payloads, sent_at=None):
+    """Satu pesan JSON untuk beberapa reading dari sensor yang sama"""
+    first = payloads[0]
+    message = {
+        "sensor_id": first["sensor_id"],
+        "sensor_type": first.get("sensor_type"),
+        "location": first.get("location"),
+        "readings": [
+            {"timestamp": payload["timestamp"], "data": payload.get("data"), "status": payload.get("status")}
+            for payload in payloads
+        ],
+    }
+    if sent_at is not None:
+        # Field identitas (termasuk sent_at) disalin ke setiap reading oleh expand_json
+        message["sent_at"] = sent_at
+    return json.dumps(message).encode()
+
+
+def expand_json(message):
+    """Pesan JSON (reading tunggal, batch, atau list) menjadi list payload"""
+    if isinstance(message, list):
+        return message
+    readings = message.get("readings")
+    if readings is None:
+        return [message]
+    identity = {key: value for key, value in message.items() if key != "readings"}
+    return [dict(identity, **reading) for reading in readings]
+
+
+def encode_binary(node_num, payload):
+    """Encode payload berbentuk JSON (dict) ke format biner"""
+    data = payload.get("data") or {}
+    mask = 0
+    values = []
+    for bit, metric in enumerate(METRICS):
+        value = data.get(metric)
+        if value is not None:
+            mask |= 1 << bit
+            values.append(_VALUE.pack(float(value)))
+    return _HEADER.pack(
+        MAGIC,
+        VERSION,
+        node_num,
+        parse_timestamp(payload["timestamp"]),
+        _index(SENSOR_TYPES, payload.get("sensor_type")),
+        _index(STATUSES, payload.get("status")),
+        mask,
+    ) + b"".join(values)
+
+
+def encode_binary_batch(node_num, payloads, sent_at=None):
+    prefix = _SENT_AT.pack(SENT_AT_MAGIC, round(sent_at * 1_000_000)) if sent_at is not None else b""
+    return prefix + b"".join(encode_binary(node_num, payload) for payload in payloads)
+
+
+def decode_sent_at(raw, offset=0):
+    """Decode record waktu publish; return (sent_at epoch detik, offset berikutnya)"""
+    if len(raw) - offset < _SENT_AT.size:
+        raise CodecError("record sent_at terpotong")
+    _, micros = _SENT_AT.unpack_from(raw, offset)
+    return micros / 1_000_000, offset + _SENT_AT.size
+
+
+def decode_binary(raw, identity, offset=0):
+    """Decode satu record biner mulai ``offset``; return (payload, offset berikutnya).
+
+    ``identity`` adalah isi pesan registry node tersebut (sensor_id, location,
+    sensor_type).
+    """
+    if len(raw) - offset < _HEADER.size:
+        raise CodecError("payload biner terlalu pendek")
+    magic, version, _, epoch, type_index, status_index, mask = _HEADER.unpack_from(raw, offset)
+    if magic != MAGIC or version != VERSION:
+        raise CodecError(f"format biner tidak dikenal (magic {magic:#x}, versi {version})")
+
+    data = {}
+    offset += _HEADER.size
+    for bit, metric in enumerate(METRICS):
+        if mask & (1 << bit):
+            if offset + _VALUE.size > len(raw):
+                raise CodecError("payload biner terpotong")
+            data[metric] = round(_VALUE.unpack_from(raw, offset)[0], 3)
+            offset += _VALUE.size
+
+    sensor_type = SENSOR_TYPES[type_index] if type_index < len(SENSOR_TYPES) else identity.get("sensor_type")
+    return {
+        "sensor_id": identity["sensor_id"],
+        "sensor_type": sensor_type or "unknown",
+        "location": identity.get("location"),
+        "timestamp": format_timestamp(epoch),
+        "data": data,
+        "status": STATUSES[status_index] if status_index < len(STATUSES) else "unknown",
+    }, offset
+
+
+def peek_node_number(raw, offset=0):
+    if len(raw) - offset < _HEADER.size:
+        raise CodecError("payload biner terlalu pendek")
+    return _HEADER.unpack_from(raw, offset)[2]
+
+
+class TelemetryDecoder:
+    """Decode pesan dari topic telemetri dan registry menjadi list payload JSON.
+
+    Record biner dari node yang belum terdaftar ditahan (terbatas
+    ``pending_per_node`` x ``max_pending_nodes``) lalu dikembalikan saat
+    pesan registry node tersebut datang.
+    """
+
+    def __init__(self, pending_per_node=100, max_pending_nodes=64):
+        self.registry = {}
+        self.pending = OrderedDict()
+        self.pending_per_node = pending_per_node
+        self.max_pending_nodes = max_pending_nodes
+        self.unknown_nodes = 0
+        self.replayed = 0
+        self.dropped = 0
+        self._warned = set()
+
+    def topics(self, telemetry_prefix=""):
+        """Topic yang perlu di-subscribe; ``telemetry_prefix`` mis. ``$share/group/``.
+
+        Registry selalu di-subscribe biasa: setiap subscriber butuh registry lengkap.
+        """
+        return [
+            f"{telemetry_prefix}{TELEMETRY_TOPIC}",
+            f"{telemetry_prefix}{BINARY_TOPIC}",
+            f"{REGISTRY_TOPIC}/+",
+        ]
+
+    def pending_records(self):
+        return sum(len(records) for records in self.pending.values())
+
+    def _hold(self, node, record, sent_at):
+        """Tahan satu record node yang belum terdaftar (antrian terbatas per node)"""
+        self.unknown_nodes += 1
+        if node not in self._warned:
+            self._warned.add(node)
+            print(f"[Telemetry Codec] Node {node} belum terdaftar di registry, record biner ditahan")
+        records = self.pending.get(node)
+        if records is None:
+            if len(self.pending) >= self.max_pending_nodes:
+                _, evicted = self.pending.popitem(last=False)
+                self.dropped += len(evicted)
+            records = self.pending[node] = deque(maxlen=self.pending_per_node)
+        if len(records) == records.maxlen:
+            self.dropped += 1
+        records.append((record, sent_at))
+
+    def _replay(self, node, identity):
+        """Decode record yang ditahan untuk node yang baru terdaftar"""
+        payloads = []
+        for record, sent_at in self.pending.pop(node, ()):
+            payload, _ = decode_binary(record, identity)
+            if sent_at is not None:
+                payload["sent_at"] = sent_at
+            payloads.append(payload)
+        self.replayed += len(payloads)
+        self._warned.discard(node)
+        return payloads
+
+    def decode(self, topic, raw):
+        if topic.startswith(REGISTRY_TOPIC + "/"):
+            node = int(topic[len(REGISTRY_TOPIC) + 1:])
+            if not raw:
+                # Pesan retained kosong = node dihapus dari registry
+                self.registry.pop(node, None)
+                return []
+            identity = self.registry[node] = json.loads(raw)
+            return self._replay(node, identity)
+        if topic == BINARY_TOPIC:
+            payloads = []
+            offset = 0
+            sent_at = None
+            while offset < len(raw):
+                if raw[offset] == SENT_AT_MAGIC:
+                    sent_at, offset = decode_sent_at(raw, offset)
+                    continue
+                node = peek_node_number(raw, offset)
+                identity = self.registry.get(node)
+                if identity is None:
+                    # Record ditahan sampai pesan registry node tersebut datang
+                    start = offset
+                    _, offset = decode_binary(raw, {"sensor_id": None}, offset)
+                    self._hold(node, bytes(raw[start:offset]), sent_at)
+                    continue
+                payload, offset = decode_binary(raw, identity, offset)
+                if sent_at is not None:
+                    payload["sent_at"] = sent_at
+                payloads.append(payload)
+            return payloads
+        return expand_json(json.loads(raw))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telemetry Recording - File rekaman pesan MQTT mentah beserta waktu tibanya
+Dipakai bersama oleh mqtt_monitor.py (--record) dan tool record/replay.
+Payload disimpan apa adanya (JSON atau biner), sehingga replay mengirim byte
+yang sama persis dengan yang diterima dari broker.
+
+File bersifat append-only: header sekali di awal, lalu record berurutan.
+
+    header  8 byte   magic b"FTRC", versi (uint8), 3 byte cadangan
+    record  14 byte  waktu tiba epoch (float64), topic_id (uint16),
+                     panjang payload (uint32), lalu payload
+
+Nama topic tidak diulang di setiap record: record dengan topic_id 0xFFFF
+mendefinisikan topic (payload: topic_id uint16 + nama topic UTF-8) dan
+berlaku untuk record sesudahnya. File berakhiran ``.gz`` ditulis dengan gzip.
+Record terakhir yang terpotong (proses mati saat menulis) diabaikan.
+"""
+
+import gzip
+import os
+import struct
+import threading
+import time
+
+MAGIC = b"FTRC"
+VERSION = 1
+TOPIC_DEFINITION = 0xFFFF
+
+_HEADER = struct.Struct("<4sB3x")
+_RECORD = struct.Struct("<dHI")
+_TOPIC_ID = struct.Struct("<H")
+
+
+class RecordingError(ValueError):
+    """File bukan rekaman telemetri atau versinya tidak dikenal"""
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+class RecordingWriter:
+    """Tambahkan pesan MQTT mentah ke file rekaman.
+
+    Append ke file yang ada memulai tabel topic baru; tulis dan flush
+    diserialisasi sehingga aman dari beberapa thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._topics = {}
+        self._lock = threading.Lock()
+        # tell() pada gzip mode append selalu 0, jadi cek ukuran file
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = _open(path, "ab")
+        if is_new:
+            self._file.write(_HEADER.pack(MAGIC, VERSION))
+
+    def write(self, topic, payload, arrival=None):
+        payload = bytes(payload)
+        with self._lock:
+            topic_id = self._topics.get(topic)
+            if topic_id is None:
+                if len(self._topics) >= TOPIC_DEFINITION:
+                    raise RecordingError("terlalu banyak topic berbeda dalam satu sesi rekaman")
+                topic_id = self._topics[topic] = len(self._topics)
+                definition = _TOPIC_ID.pack(topic_id) + topic.encode()
+                self._file.write(_RECORD.pack(0.0, TOPIC_DEFINITION, len(definition)) + definition)
+            self._file.write(_RECORD.pack(time.time() if arrival is None else arrival, topic_id, len(payload)))
+            self._file.write(payload)
+            self.records += 1
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_recording(path):
+    """Generator (waktu tiba, topic, payload) sesuai urutan di file"""
+    with _open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        magic, version = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise RecordingError(f"{path} bukan file rekaman telemetri (magic {magic!r}, versi {version})")
+
+        topics = {}
+        while True:
+            head = f.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                return
+            arrival, topic_id, length = _RECORD.unpack(head)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            if topic_id == TOPIC_DEFINITION:
+                defined, = _TOPIC_ID.unpack_from(payload)
+                topics[defined] = payload[_TOPIC_ID.size:].decode()
+                continue
+            if topic_id not in topics:
+                raise RecordingError(f"topic_id {topic_id} dipakai sebelum didefinisikan")
+            yield arrival, topics[topic_id], payload
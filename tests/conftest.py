@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# Modul dashboard_service dan sensor_node saling meng-import dengan nama modul saja (seperti di container)
+sys.path[:0] = [os.path.join(ROOT, 'dashboard_service'), os.path.join(ROOT, 'sensor_node'), ROOT]
+
+# main.py membaca konfigurasi saat di-import: database SQLite sementara per sesi test
+os.environ['DATABASE_URL'] = os.getenv(
+    'TEST_DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'forest_test.db'),
+)
+os.environ.pop('ASYNC_DATABASE_URL', None)
+os.environ['SERVICE_ROLE'] = 'all'
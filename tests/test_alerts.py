@@ -0,0 +1,84 @@
+from alerts import AlertTracker
+from status_engine import evaluate_status
+
+AREA = "Area 1"
+
+
+def tracker(raise_after=5.0, clear_after=60.0):
+    return AlertTracker(
+        lambda T, H, S: evaluate_status(T, H, S, 300, 600),
+        margins={"temperature": 1.0, "humidity": -2.0, "smoke": 50.0},
+        raise_after=raise_after,
+        clear_after=clear_after,
+    )
+
+
+def feed(alerts, smoke, timestamp):
+    values = {"temperature": 25.0, "humidity": 60.0, "smoke": smoke}
+    status = evaluate_status(25.0, 60.0, smoke, 300, 600)
+    return alerts.update(AREA, status, values, timestamp)
+
+
+def test_escalation_waits_for_raise_after():
+    alerts = tracker()
+    assert feed(alerts, 700, 0) is None
+    assert feed(alerts, 700, 4.9) is None
+    assert feed(alerts, 700, 5) == ("NORMAL", "DANGER")
+    assert alerts.active() == {AREA: "DANGER"}
+    assert feed(alerts, 700, 10) is None
+
+
+def test_flapping_back_to_normal_restarts_debounce():
+    alerts = tracker()
+    feed(alerts, 700, 0)
+    assert feed(alerts, 100, 2) is None
+    assert feed(alerts, 700, 4) is None
+    assert feed(alerts, 700, 8) is None
+    assert feed(alerts, 700, 9) == ("NORMAL", "DANGER")
+
+
+def test_moving_between_levels_on_the_same_side_keeps_debounce():
+    alerts = tracker()
+    feed(alerts, 700, 0)
+    feed(alerts, 400, 2)
+    feed(alerts, 700, 4)
+    # Tetap di atas NORMAL sejak t=0; naik ke status mentah terakhir
+    assert feed(alerts, 400, 5) == ("NORMAL", "WARNING")
+
+
+def test_values_within_hysteresis_margin_do_not_clear():
+    alerts = tracker()
+    alerts.seed({AREA: "DANGER"})
+    # 580 ppm mentah WARNING, tetapi 580 + 50 masih DANGER
+    for t in range(0, 200, 10):
+        assert feed(alerts, 580, t) is None
+    assert alerts.active() == {AREA: "DANGER"}
+
+
+def test_clear_waits_for_clear_after_beyond_margin():
+    alerts = tracker()
+    alerts.seed({AREA: "DANGER"})
+    assert feed(alerts, 540, 0) is None
+    assert feed(alerts, 540, 59) is None
+    assert feed(alerts, 540, 60) == ("DANGER", "WARNING")
+
+
+def test_clear_is_cancelled_when_values_return_inside_margin():
+    alerts = tracker()
+    alerts.seed({AREA: "DANGER"})
+    feed(alerts, 540, 0)
+    assert feed(alerts, 590, 30) is None
+    assert feed(alerts, 540, 40) is None
+    assert feed(alerts, 540, 99) is None
+    assert feed(alerts, 540, 100) == ("DANGER", "WARNING")
+
+
+def test_clear_to_normal_uses_relaxed_status():
+    alerts = tracker()
+    alerts.seed({AREA: "WARNING"})
+    # 280 + 50 masih WARNING; 200 + 50 sudah NORMAL
+    assert feed(alerts, 280, 0) is None
+    assert feed(alerts, 280, 120) is None
+    assert feed(alerts, 200, 130) is None
+    assert feed(alerts, 200, 190) == ("WARNING", "NORMAL")
+    assert alerts.active() == {}
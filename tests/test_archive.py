@@ -0,0 +1,118 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+import main
+from archive import STAGING_DIR, TelemetryArchive
+
+
+def reading(sensor_id, timestamp, temperature, location="Area Arsip"):
+    return {
+        "sensor_id": sensor_id, "location": location, "sensor_type": "temperature",
+        "timestamp": timestamp, "status": "NORMAL", "data": {"temperature": temperature},
+    }
+
+
+def archive(tmp_path):
+    return TelemetryArchive(
+        main.engine, main.TelemetryReading, main.SensorNode, main.ArchiveRun, main.partition_manager,
+        str(tmp_path / "archive"), after_days=1, chunk_size=2,
+    )
+
+
+def count_between(start, end):
+    with main.engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(main.TelemetryReading).where(
+            main.TelemetryReading.timestamp >= start, main.TelemetryReading.timestamp < end,
+        )).scalar()
+
+
+def test_archive_period_moves_rows_to_parquet(tmp_path):
+    main.save_batch_to_database([
+        reading("archive-a", f"2024-06-01T0{hour}:00:00Z", 20.0 + hour) for hour in range(5)
+    ] + [reading("archive-b", "2024-06-01T03:30:00Z", 40.0, location="Area Lain"),
+         reading("archive-a", "2024-06-02T00:00:00Z", 99.0)])
+    store = archive(tmp_path)
+
+    assert store.archive_period(datetime(2024, 6, 1), datetime(2024, 6, 2)) == 6
+    assert count_between(datetime(2024, 6, 1), datetime(2024, 6, 2)) == 0
+    # Periode berikutnya tetap di database
+    assert count_between(datetime(2024, 6, 2), datetime(2024, 6, 3)) == 1
+
+    rows = store.history(sensor_id="archive-a", limit=3)
+    assert [row["data"]["temperature"] for row in rows] == [24.0, 23.0, 22.0]
+    assert rows[0]["timestamp"] == "2024-06-01T04:00:00"
+    # Top-k berjalan lintas batch (chunk_size=2) dan lintas file run
+    assert [row["data"]["temperature"] for row in store.history(sensor_id="archive-a", limit=1)] == [24.0]
+    assert len(store.history(sensor_id="archive-a", limit=100)) == 5
+    assert [row["sensor_id"] for row in store.history(location="Area Lain")] == ["archive-b"]
+    assert sum(len(rows) for rows in store.stream(sensor_id="archive-a", limit=4)) == 4
+
+
+def test_archive_aggregate_buckets_raw_readings(tmp_path):
+    main.save_batch_to_database([
+        reading("archive-c", f"2024-06-05T00:{minute:02d}:00Z", float(minute)) for minute in range(0, 60, 10)
+    ])
+    store = archive(tmp_path)
+    store.archive_period(datetime(2024, 6, 5), datetime(2024, 6, 6))
+
+    location, buckets = store.aggregate("archive-c", datetime(2024, 6, 5), datetime(2024, 6, 6), 1800)
+    assert location == "Area Arsip"
+    first, second = (buckets[key] for key in sorted(buckets))
+    assert (first["temperature_min"], first["temperature_max"], first["temperature_count"]) == (0.0, 20.0, 3)
+    assert second["temperature_sum"] == 30.0 + 40.0 + 50.0
+
+
+def test_recover_publishes_committed_runs_and_discards_the_rest(tmp_path):
+    main.save_batch_to_database([reading("archive-d", "2024-06-07T00:00:00Z", 1.0)])
+    store = archive(tmp_path)
+    publish = store._publish
+    # Proses mati setelah commit, sebelum file dipindahkan ke dataset
+    store._publish = lambda run: None
+    store.archive_period(datetime(2024, 6, 7), datetime(2024, 6, 8))
+    assert store.history(sensor_id="archive-d") == []
+
+    orphan = os.path.join(store.root, STAGING_DIR, "20240608-orphan", "date=2024-06-08", "location=x")
+    os.makedirs(orphan)
+    open(os.path.join(orphan, "part-0.parquet"), "wb").close()
+
+    store._publish = publish
+    store.recover()
+    assert [row["sensor_id"] for row in store.history(sensor_id="archive-d")] == ["archive-d"]
+    assert os.listdir(os.path.join(store.root, STAGING_DIR)) == []
+
+
+def test_reading_added_after_export_stays_for_the_next_run(tmp_path):
+    main.save_batch_to_database([reading("archive-e", f"2024-06-09T0{hour}:00:00Z", 1.0) for hour in range(3)])
+    store = archive(tmp_path)
+    batches = store._batches
+
+    def late_insert(conn, start, end, exported):
+        yield from batches(conn, start, end, exported)
+        # Replay spool sensor masuk saat file Parquet sedang ditulis
+        main.save_batch_to_database([reading("archive-e", "2024-06-09T05:00:00Z", 2.0)])
+    store._batches = late_insert
+
+    assert store.archive_period(datetime(2024, 6, 9), datetime(2024, 6, 10)) == 3
+    assert count_between(datetime(2024, 6, 9), datetime(2024, 6, 10)) == 1
+    store._batches = batches
+    assert store.archive_period(datetime(2024, 6, 9), datetime(2024, 6, 10)) == 1
+    assert len(store.history(sensor_id="archive-e")) == 4
+
+
+def test_run_is_rolled_back_when_delete_would_remove_unexported_rows(tmp_path):
+    main.save_batch_to_database([reading("archive-f", f"2024-06-11T0{hour}:00:00Z", 1.0) for hour in range(3)])
+    store = archive(tmp_path)
+    batches = store._batches
+
+    def missed_row(conn, start, end, exported):
+        yield from batches(conn, start, end, exported)
+        # Seolah satu baris ber-id kecil commit setelah ekspor dimulai
+        exported["rows"] -= 1
+    store._batches = missed_row
+
+    assert store.archive_period(datetime(2024, 6, 11), datetime(2024, 6, 12)) == 0
+    assert count_between(datetime(2024, 6, 11), datetime(2024, 6, 12)) == 3
+    assert store.history(sensor_id="archive-f") == []
+    assert os.listdir(os.path.join(store.root, STAGING_DIR)) == []
@@ -0,0 +1,21 @@
+from dbutil import async_database_url, pool_options
+
+
+def test_async_url_swaps_in_async_driver():
+    assert async_database_url("postgresql://admin:pw@db/forest_db") == "postgresql+asyncpg://admin:pw@db/forest_db"
+    assert async_database_url("postgresql+psycopg2://admin:pw@db:5432/forest_db") == "postgresql+asyncpg://admin:pw@db:5432/forest_db"
+    assert async_database_url("sqlite:////tmp/forest.db") == "sqlite+aiosqlite:////tmp/forest.db"
+    assert async_database_url("sqlite://") == "sqlite+aiosqlite://"
+    # Dialect lain dibiarkan apa adanya
+    assert async_database_url("mysql+aiomysql://db/forest") == "mysql+aiomysql://db/forest"
+
+
+def test_pool_options_only_for_server_databases():
+    assert pool_options("sqlite+aiosqlite:///forest.db", 10, 20, True, 1800, 30) == {}
+    assert pool_options("postgresql+asyncpg://db/forest_db", 10, 20, True, 1800, 30) == {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "pool_timeout": 30,
+    }
@@ -0,0 +1,92 @@
+import math
+import statistics
+
+import pytest
+
+from detection import DetectionEngine, MetricWindow
+
+
+def test_window_statistics_match_last_n_values_after_wrapping():
+    window = MetricWindow(size=8, alpha=0.5)
+    values = [20.0 + (i % 5) * 0.37 + i * 0.01 for i in range(27)]
+    for i, value in enumerate(values):
+        window.push(float(i), value)
+    recent = values[-8:]
+    assert window.count == 8
+    assert window.mean() == pytest.approx(statistics.fmean(recent))
+    assert window.std() == pytest.approx(statistics.pstdev(recent))
+    assert window.values[window.back(0)] == values[-1]
+    assert window.values[window.back(7)] == values[-8]
+
+
+def test_window_statistics_before_full():
+    window = MetricWindow(size=10, alpha=0.5)
+    assert window.mean() is None
+    window.push(0.0, 4.0)
+    assert window.std() is None
+    window.push(1.0, 6.0)
+    assert window.mean() == 5.0
+    assert window.std() == 1.0
+
+
+def test_large_offsets_do_not_drift():
+    window = MetricWindow(size=4, alpha=0.5)
+    for i in range(10000):
+        window.push(float(i), 1e6 + (i % 2))
+    assert window.std() == pytest.approx(0.5)
+
+
+def test_rate_is_per_minute_of_smoothed_values():
+    window = MetricWindow(size=10, alpha=1.0)
+    for i in range(5):
+        window.push(i * 30.0, 20.0 + i)
+    # alpha=1: EWMA sama dengan nilai; +1 per 30 detik = +2 per menit
+    assert window.rate(lookback=4) == pytest.approx(2.0)
+    assert window.rate(lookback=100) == pytest.approx(2.0)
+
+
+def test_rate_needs_two_samples_and_elapsed_time():
+    window = MetricWindow(size=4, alpha=0.5)
+    window.push(0.0, 1.0)
+    assert window.rate(3) is None
+    window.push(0.0, 2.0)
+    assert window.rate(3) is None
+
+
+def steady(engine, sensor_id, count, value=25.0, start=0.0, step=10.0):
+    for i in range(count):
+        engine.update(sensor_id, start + i * step, {"temperature": value + (i % 2) * 0.1})
+    return start + count * step
+
+
+def test_spike_detected_in_dangerous_direction_only():
+    engine = DetectionEngine(window=30, min_samples=10, zscore=4.0)
+    t = steady(engine, "temp-01", 20)
+    assert engine.update("temp-01", t, {"temperature": 20.0}) == []
+    found = engine.update("temp-01", t + 10, {"temperature": 40.0})
+    assert [(d["metric"], d["kind"], d["severity"]) for d in found] == [("temperature", "spike", "DANGER")]
+
+
+def test_no_detection_before_min_samples():
+    engine = DetectionEngine(window=30, min_samples=10, zscore=4.0)
+    t = steady(engine, "temp-01", 5)
+    assert engine.update("temp-01", t, {"temperature": 80.0}) == []
+
+
+def test_cooldown_suppresses_repeats_in_reading_time():
+    engine = DetectionEngine(window=30, min_samples=10, zscore=4.0, cooldown=60.0)
+    t = steady(engine, "temp-01", 20)
+    assert engine.update("temp-01", t, {"temperature": 60.0})
+    t = steady(engine, "temp-01", 3, start=t + 10)
+    assert engine.update("temp-01", t, {"temperature": 90.0}) == []
+    t = steady(engine, "temp-01", 30, start=t + 10, value=25.0)
+    assert engine.update("temp-01", t, {"temperature": 60.0})
+
+
+def test_late_reading_is_not_added_to_window():
+    engine = DetectionEngine(window=30, min_samples=10)
+    t = steady(engine, "temp-01", 12)
+    engine.update("temp-01", t - 100, {"temperature": 99.0})
+    window = engine.sensors["temp-01"]["temperature"]
+    assert window.count == 12
+    assert not math.isclose(window.values[window.back(0)], 99.0)
@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+import numpy as np
+
+import downsample
+import main
+
+
+def test_minmax_keeps_extremes_of_every_bucket():
+    t = np.arange(1000, dtype=np.int64)
+    y = np.sin(t / 20.0)
+    y[137], y[642] = 9.0, -9.0
+    times, values = downsample.minmax(t, y, y, 0, 1000, 50)
+    assert len(times) <= 100
+    assert list(times) == sorted(times)
+    assert 9.0 in values and -9.0 in values
+    # Setiap bucket menyimpan min dan max aslinya
+    for bucket in range(50):
+        chunk = y[bucket * 20:(bucket + 1) * 20]
+        kept = values[(times >= bucket * 20) & (times < (bucket + 1) * 20)]
+        assert kept.min() == chunk.min() and kept.max() == chunk.max()
+
+
+def test_minmax_on_rollup_columns_draws_min_before_max():
+    t = np.array([0, 60], dtype=np.int64)
+    low, high = np.array([1.0, 2.0]), np.array([5.0, 7.0])
+    times, values = downsample.minmax(t, low, high, 0, 120, 2)
+    assert list(times) == [0, 0, 60, 60]
+    assert list(values) == [1.0, 5.0, 2.0, 7.0]
+
+
+def test_lttb_returns_threshold_points_with_endpoints_and_spike():
+    t = np.arange(500, dtype=np.int64)
+    y = np.zeros(500)
+    y[250] = 100.0
+    times, values = downsample.lttb(t, y, 40)
+    assert len(times) == 40
+    assert times[0] == 0 and times[-1] == 499
+    assert 100.0 in values
+    # Deret yang sudah cukup pendek tidak diubah
+    assert len(downsample.lttb(t[:30], y[:30], 40)[0]) == 30
+
+
+def test_downsample_skips_missing_values():
+    t = np.arange(6, dtype=np.int64)
+    values = np.array([1.0, np.nan, 3.0, np.nan, 5.0, 6.0])
+    times, kept = downsample.downsample("minmax", t, values, 0, 6, 6)
+    assert list(times) == [0, 2, 4, 5]
+    assert not np.isnan(kept).any()
+    assert list(downsample.rollup_average(np.array([6.0, 0.0]), np.array([2, 0]))[:1]) == [3.0]
+
+
+def test_series_cache_is_bounded_and_expires():
+    cache = downsample.SeriesCache(max_size=2, ttl=60.0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and len(cache) == 2
+    cache.ttl = -1
+    cache.put("d", 4)
+    assert cache.get("d") is None
+
+
+def test_series_endpoint_reduces_raw_readings_to_chart_width():
+    main.save_batch_to_database([
+        {
+            "sensor_id": "series-a", "location": "Area Series", "sensor_type": "temperature",
+            "timestamp": f"2025-02-05T00:{minute:02d}:{second:02d}Z", "status": "NORMAL",
+            "data": {"temperature": 90.0 if (minute, second) == (7, 30) else 20.0 + second / 10},
+        }
+        for minute in range(10) for second in range(0, 60, 5)
+    ])
+
+    async def run(width):
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/readings/series", params={
+                    "sensor_id": "series-a", "from": "2025-02-05T00:00:00", "to": "2025-02-05T00:10:00", "width": width,
+                })
+        finally:
+            await main.async_engine.dispose()
+    body = asyncio.run(run(200)).json()
+    assert body["source"] == "telemetry_readings"
+    [series] = body["series"]
+    assert series["metric"] == "temperature"
+    assert 0 < len(series["t"]) <= 200
+    assert max(series["v"]) == 90.0
+
+    # Satu bucket piksel >= 1 menit: dibaca dari rollup, puncak tetap terlihat
+    body = asyncio.run(run(20)).json()
+    assert body["source"] == "telemetry_rollup_1m"
+    [series] = body["series"]
+    assert 0 < len(series["t"]) <= 20
+    assert max(series["v"]) == 90.0
@@ -0,0 +1,86 @@
+import asyncio
+import csv
+import io
+import json
+
+import httpx
+
+import main
+
+
+def reading(sensor_id, timestamp, temperature, sensor_type="temperature"):
+    return {
+        "sensor_id": sensor_id,
+        "location": "Area History",
+        "sensor_type": sensor_type,
+        "timestamp": timestamp,
+        "status": "NORMAL",
+        "data": {"temperature": temperature},
+    }
+
+
+def get(path, **params):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get(path, params=params)
+        finally:
+            # Koneksi async terikat ke event loop run ini
+            await main.async_engine.dispose()
+    return asyncio.run(run())
+
+
+def test_cursor_pages_are_stable_when_new_rows_arrive():
+    # Beberapa reading berbagi timestamp: urutan ditentukan (timestamp, id)
+    main.save_batch_to_database([
+        reading("history-a", f"2025-02-01T00:00:{second:02d}Z", float(i))
+        for i, second in enumerate((0, 0, 10, 10, 10, 20, 30))
+    ])
+    first = get("/api/readings/history", sensor_id="history-a", limit=3)
+    pages = [first.json()]
+    cursor = first.headers["X-Next-Cursor"]
+
+    # Reading baru setelah halaman pertama tidak menggeser halaman berikutnya
+    main.save_batch_to_database([reading("history-a", "2025-02-01T00:01:00Z", 99.0)])
+    while cursor:
+        response = get("/api/readings/history", sensor_id="history-a", limit=3, cursor=cursor)
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    values = [item["data"]["temperature"] for page in pages for item in page]
+    assert sorted(values) == [float(i) for i in range(7)]
+    timestamps = [item["timestamp"] for page in pages for item in page]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_history_filters_by_range_and_type():
+    main.save_batch_to_database([
+        reading("history-b", "2025-02-02T00:00:00Z", 1.0),
+        reading("history-b", "2025-02-02T01:00:00Z", 2.0, sensor_type="smoke"),
+        reading("history-b", "2025-02-02T02:00:00Z", 3.0),
+    ])
+    rows = get("/api/readings/history", sensor_id="history-b", **{"from": "2025-02-02T00:00:00", "to": "2025-02-02T02:00:00"}).json()
+    assert [row["data"]["temperature"] for row in rows] == [2.0, 1.0]
+    rows = get("/api/readings/history", sensor_id="history-b", sensor_type="temperature").json()
+    assert [row["data"]["temperature"] for row in rows] == [3.0, 1.0]
+
+
+def test_export_streams_all_rows_as_ndjson_and_csv():
+    main.save_batch_to_database([
+        reading("history-c", f"2025-02-03T00:00:{second:02d}Z", float(second)) for second in range(5)
+    ])
+    ndjson = get("/api/readings/history", sensor_id="history-c", format="ndjson")
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [line["data"]["temperature"] for line in lines] == [4.0, 3.0, 2.0, 1.0, 0.0]
+
+    rows = list(csv.DictReader(io.StringIO(get("/api/readings/history", sensor_id="history-c", format="csv", limit=2).text)))
+    assert [row["temperature"] for row in rows] == ["4.0", "3.0"]
+    assert rows[0]["sensor_id"] == "history-c"
+
+
+def test_invalid_cursor_and_format_are_rejected():
+    assert get("/api/readings/history", cursor="not-a-cursor").status_code == 400
+    assert get("/api/readings/history", format="xml").status_code == 400
@@ -0,0 +1,83 @@
+import time
+
+from hot_store import ROW_BYTES, HotStore
+
+
+def add(store, sensor_id, timestamp, temperature=25.0):
+    store.add(sensor_id, "Area 1", "temperature", timestamp, {"temperature": temperature}, "normal")
+
+
+def warm_store(window_seconds=600, max_rows=1000):
+    store = HotStore(window_seconds=window_seconds, max_bytes=max_rows * ROW_BYTES)
+    store.mark_complete_since(time.time() - window_seconds)
+    return store
+
+
+def test_memory_budget_evicts_oldest_rows_and_marks_range_incomplete():
+    store = warm_store(max_rows=10)
+    now = time.time()
+    add(store, "other", now - 100)
+    # Dua sensor: setiap sensor mendapat 5 baris
+    times = [now - 100 + i for i in range(8)]
+    for ts in times:
+        add(store, "temp-01", ts)
+
+    assert len(store.sensors["temp-01"]) == 5
+    assert store.metrics()["rows"] == 6
+    assert not store.covers(times[2], "temp-01")
+    assert store.covers(times[3], "temp-01")
+    assert not store.covers(times[2])
+    assert store.covers(times[3])
+
+
+def test_covers_respects_window_and_warm_boundary():
+    store = warm_store(window_seconds=600)
+    now = time.time()
+    add(store, "temp-01", now - 10)
+    assert store.covers(now - 590)
+    assert not store.covers(now - 610)
+
+    cold = HotStore(window_seconds=600)
+    assert not cold.covers(time.time() - 60)
+
+
+def test_history_range_is_half_open_and_newest_first():
+    store = warm_store()
+    base = float(int(time.time()) - 300)
+    for i in range(5):
+        add(store, "temp-01", base + i * 10, temperature=20.0 + i)
+
+    rows = store.history(base + 10, base + 40, sensor_id="temp-01")
+    assert [row["data"]["temperature"] for row in rows] == [23.0, 22.0, 21.0]
+    assert rows[0]["sensor_id"] == "temp-01"
+    assert rows[0]["status"] == "normal"
+
+
+def test_history_returns_none_when_more_than_limit_match():
+    store = warm_store()
+    base = time.time() - 100
+    for i in range(5):
+        add(store, "temp-01", base + i)
+    assert store.history(base, base + 10, limit=5) is not None
+    assert store.history(base, base + 10, limit=4) is None
+
+
+def test_late_reading_is_inserted_in_time_order():
+    store = warm_store()
+    base = time.time() - 100
+    for ts in (base, base + 20, base + 10):
+        add(store, "temp-01", ts)
+    window = store.sensors["temp-01"]
+    assert list(window.ts[window.start:]) == [base, base + 10, base + 20]
+
+
+def test_readings_older_than_window_are_evicted():
+    store = warm_store(window_seconds=60)
+    now = time.time()
+    add(store, "temp-01", now - 50)
+    add(store, "temp-01", now - 30)
+    # Reading baru mendorong keluar reading di luar jendela
+    store.window_seconds = 40
+    add(store, "temp-01", now)
+    assert len(store.sensors["temp-01"]) == 2
+    assert store.metrics()["rows"] == 2
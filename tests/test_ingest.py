@@ -0,0 +1,133 @@
+import threading
+import time
+
+from ingest import IngestPipeline
+
+
+class Transient(Exception):
+    pass
+
+
+def collecting():
+    batches = []
+    return batches, batches.append
+
+
+def test_drain_splits_by_batch_size():
+    batches, flush = collecting()
+    pipeline = IngestPipeline(flush, batch_size=3, flush_interval=0.05)
+    for i in range(7):
+        pipeline.submit(i)
+    assert pipeline._drain() == [0, 1, 2]
+    assert pipeline._drain() == [3, 4, 5]
+    assert pipeline._drain() == [6]
+    assert pipeline._drain() == []
+
+
+def test_drain_returns_partial_batch_after_flush_interval():
+    pipeline = IngestPipeline(lambda batch: None, batch_size=100, flush_interval=0.05)
+    pipeline.submit("a")
+    pipeline.submit("b")
+    started = time.monotonic()
+    assert pipeline._drain() == ["a", "b"]
+    assert time.monotonic() - started < 1.0
+
+
+def test_stop_flushes_remaining_queue():
+    batches, flush = collecting()
+    pipeline = IngestPipeline(flush, batch_size=4, flush_interval=0.01)
+    pipeline.start()
+    for i in range(10):
+        pipeline.submit(i)
+    pipeline.stop()
+    assert sorted(item for batch in batches for item in batch) == list(range(10))
+    assert all(len(batch) <= 4 for batch in batches)
+    assert pipeline.metrics()["written"] == 10
+
+
+def test_full_queue_blocks_then_drops():
+    pipeline = IngestPipeline(lambda batch: None, max_queue_size=1, put_timeout=0.05)
+    assert pipeline.submit(1)
+    started = time.monotonic()
+    assert not pipeline.submit(2)
+    assert time.monotonic() - started >= 0.05
+    stats = pipeline.metrics()
+    assert stats["blocked_puts"] == 1
+    assert stats["dropped"] == 1
+    assert stats["received"] == 2
+
+
+def test_full_queue_accepts_once_consumer_catches_up():
+    pipeline = IngestPipeline(lambda batch: None, max_queue_size=1, put_timeout=2.0)
+    pipeline.submit(1)
+    # Consumer mengosongkan antrian saat producer sedang tertahan (backpressure)
+    threading.Timer(0.05, pipeline._queue.get).start()
+    assert pipeline.submit(2)
+    stats = pipeline.metrics()
+    assert stats["blocked_puts"] == 1
+    assert stats["dropped"] == 0
+
+
+def test_transient_error_is_retried_with_backoff():
+    attempts = []
+
+    def flush(batch):
+        attempts.append(len(batch))
+        if len(attempts) < 3:
+            raise Transient("connection lost")
+
+    pipeline = IngestPipeline(flush, transient_errors=(Transient,), retry_backoff=0.001)
+    pipeline._flush([1, 2, 3])
+    stats = pipeline.metrics()
+    assert attempts == [3, 3, 3]
+    assert stats["written"] == 3
+    assert stats["failed"] == 0
+    assert stats["retries"] == 2
+
+
+def test_transient_error_gives_up_after_max_retries():
+    def flush(batch):
+        raise Transient("database down")
+
+    pipeline = IngestPipeline(flush, transient_errors=(Transient,), max_retries=2, retry_backoff=0.001)
+    pipeline._flush([1, 2])
+    stats = pipeline.metrics()
+    assert stats["failed"] == 2
+    assert stats["retries"] == 2
+
+
+def test_bad_payload_only_drops_itself():
+    written = []
+
+    def flush(batch):
+        if "bad" in batch:
+            raise ValueError("constraint violated")
+        written.extend(batch)
+
+    pipeline = IngestPipeline(flush, transient_errors=(Transient,))
+    batch = list(range(10)) + ["bad"] + list(range(10, 15))
+    pipeline._flush(batch)
+    stats = pipeline.metrics()
+    assert sorted(written) == list(range(15))
+    assert stats["written"] == 15
+    assert stats["failed"] == 1
+    assert stats["batches"] == 1
+
+
+def test_worker_keeps_running_after_bad_payload():
+    batches = []
+
+    def flush(batch):
+        if 0 in batch:
+            raise ValueError("constraint violated")
+        batches.append(batch)
+
+    pipeline = IngestPipeline(flush, batch_size=2, flush_interval=0.01)
+    for i in range(4):
+        pipeline.submit(i)
+    pipeline.start()
+    pipeline.stop()
+    stats = pipeline.metrics()
+    assert stats["failed"] == 1
+    assert stats["written"] == 3
+    assert batches == [[1], [2, 3]]
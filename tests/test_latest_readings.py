@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+from sqlalchemy import select
+
+import main
+
+
+def reading(sensor_id, timestamp, temperature):
+    return {
+        "sensor_id": sensor_id,
+        "location": "Area Test",
+        "sensor_type": "temperature",
+        "timestamp": timestamp,
+        "status": "NORMAL",
+        "data": {"temperature": temperature},
+    }
+
+
+def get(path):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return (await client.get(path)).json()
+        finally:
+            # Koneksi async terikat ke event loop run ini
+            await main.async_engine.dispose()
+    return asyncio.run(run())
+
+
+def test_query_latest_readings_returns_newest_row_per_node():
+    main.save_batch_to_database([
+        reading("latest-a", "2025-01-01T00:00:10Z", 21.0),
+        reading("latest-a", "2025-01-01T00:00:30Z", 23.0),
+        reading("latest-b", "2025-01-01T00:00:20Z", 25.0),
+        # Terlambat: lebih tua dari reading yang sudah ada
+        reading("latest-a", "2025-01-01T00:00:20Z", 22.0),
+    ])
+    with main.SessionLocal() as db:
+        rows = main.query_latest_readings(db)
+    latest = {sensor.sensor_id_string: row.temperature for sensor, row in rows}
+    assert latest["latest-a"] == 23.0
+    assert latest["latest-b"] == 25.0
+    assert len(rows) == len({sensor.id for sensor, _ in rows})
+
+
+def test_latest_endpoints_ignore_late_readings():
+    main.response_cache.clear()
+    main.save_batch_to_database([reading("latest-c", "2025-01-01T00:01:00Z", 30.0)])
+    main.save_batch_to_database([reading("latest-c", "2025-01-01T00:00:00Z", 10.0)])
+    by_sensor = {item["sensor_id"]: item for item in get("/api/readings/latest")}
+    assert by_sensor["latest-c"]["data"] == {"temperature": 30.0}
+    assert by_sensor["latest-c"]["timestamp"] == "2025-01-01T00:01:00"
+    assert get("/api/sensors/latest-c/latest")["data"] == {"temperature": 30.0}
+    assert get("/api/sensors/unknown/latest") == {"error": "Sensor not found"}
+
+
+def sensor_latest(sensor_id):
+    with main.SessionLocal() as db:
+        return db.execute(
+            select(main.SensorLatest)
+            .join(main.SensorNode, main.SensorNode.id == main.SensorLatest.node_id)
+            .where(main.SensorNode.sensor_id_string == sensor_id)
+        ).scalar_one()
+
+
+def test_sensor_latest_keeps_newest_within_and_across_batches():
+    main.save_batch_to_database([
+        reading("upsert-a", "2025-01-01T00:00:30Z", 23.0),
+        reading("upsert-a", "2025-01-01T00:00:10Z", 21.0),
+    ])
+    assert sensor_latest("upsert-a").temperature == 23.0
+
+    main.save_batch_to_database([reading("upsert-a", "2025-01-01T00:00:20Z", 22.0)])
+    assert sensor_latest("upsert-a").temperature == 23.0
+
+    main.save_batch_to_database([reading("upsert-a", "2025-01-01T00:00:40Z", 24.0)])
+    latest = sensor_latest("upsert-a")
+    assert latest.temperature == 24.0
+    assert latest.timestamp.isoformat() == "2025-01-01T00:00:40"
+
+
+def test_load_sensor_latest_does_not_overwrite_live_data():
+    main.save_batch_to_database([
+        reading("warm-a", "2025-01-01T00:00:00Z", 20.0),
+        reading("warm-b", "2025-01-01T00:00:00Z", 20.0),
+    ])
+    live = reading("warm-a", "2025-01-01T00:05:00Z", 30.0)
+    main.latest_data.pop("warm-b", None)
+    main.latest_data["warm-a"] = live
+    main.load_sensor_latest()
+    assert main.latest_data["warm-a"] is live
+    assert main.latest_data["warm-b"]["data"] == {"temperature": 20.0}
+
+
+def test_epoch_datetime_matches_stored_timestamp():
+    epoch = main.parse_timestamp("2025-01-01T00:00:40Z")
+    assert main.epoch_datetime(epoch).isoformat() == "2025-01-01T00:00:40"
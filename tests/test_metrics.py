@@ -0,0 +1,81 @@
+import json
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+import metrics
+import telemetry_codec as codec
+from ingest import IngestPipeline
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def reading(timestamp="2025-03-01T10:00:00Z", sensor_type="temperature"):
+    return {
+        "sensor_id": "temp-01", "sensor_type": sensor_type, "location": "Area 1",
+        "timestamp": timestamp, "data": {"temperature": 25.0}, "status": "normal",
+    }
+
+
+def test_sent_at_survives_json_and_binary_encoding():
+    sent_at = 1740823200.123456
+    (single,) = codec.expand_json(json.loads(codec.encode_json([reading()], sent_at)))
+    assert single["sent_at"] == sent_at
+    batch = codec.expand_json(json.loads(codec.encode_json([reading(), reading()], sent_at)))
+    assert [item["sent_at"] for item in batch] == [sent_at, sent_at]
+
+    decoder = codec.TelemetryDecoder()
+    node = codec.node_number("temp-01")
+    decoder.decode(codec.registry_topic(node), codec.encode_registry(reading()))
+    decoded = decoder.decode(codec.BINARY_TOPIC, codec.encode_binary_batch(node, [reading(), reading()], sent_at))
+    assert [item["sent_at"] for item in decoded] == [pytest.approx(sent_at, abs=1e-6)] * 2
+
+
+def test_consumer_metrics_observe_lag_age_and_sensor_type():
+    stats = metrics.ConsumerMetrics("test-observe")
+    now = time.time()
+    sent = dict(reading(codec.format_timestamp(now - 30)), sent_at=now - 0.2)
+    stats.observe([sent, reading(sensor_type="wind")], now)
+
+    assert sample("forest_publish_lag_seconds_count", consumer="test-observe") == 1
+    assert sample("forest_publish_lag_seconds_sum", consumer="test-observe") == pytest.approx(0.2)
+    assert sample("forest_reading_age_seconds_count", consumer="test-observe") == 2
+    assert sample("forest_readings_received_total", consumer="test-observe", sensor_type="temperature") == 1
+    assert sample("forest_readings_received_total", consumer="test-observe", sensor_type="other") == 1
+
+
+def test_consumer_metrics_count_unknown_node_records():
+    stats = metrics.ConsumerMetrics("test-unknown")
+    decoder = codec.TelemetryDecoder(pending_per_node=1)
+    node = codec.node_number("temp-01")
+    decoder.decode(codec.BINARY_TOPIC, codec.encode_binary_batch(node, [reading(), reading()]))
+    stats.observe_decoder(decoder)
+    decoder.decode(codec.registry_topic(node), codec.encode_registry(reading()))
+    stats.observe_decoder(decoder)
+    stats.observe_decoder(decoder)
+
+    assert sample("forest_unknown_node_records_total", consumer="test-unknown", result="held") == 2
+    assert sample("forest_unknown_node_records_total", consumer="test-unknown", result="dropped") == 1
+    assert sample("forest_unknown_node_records_total", consumer="test-unknown", result="replayed") == 1
+
+
+def test_pipeline_flush_counts_rows_by_result():
+    written = sample("forest_ingest_rows_total", result="written")
+    failed = sample("forest_ingest_rows_total", result="failed")
+    IngestPipeline(lambda batch: None)._flush([1, 2, 3])
+
+    def fail(batch):
+        raise ValueError("constraint violated")
+    IngestPipeline(fail)._flush([4])
+
+    assert sample("forest_ingest_rows_total", result="written") == written + 3
+    assert sample("forest_ingest_rows_total", result="failed") == failed + 1
+
+
+def test_render_exposes_pipeline_metrics():
+    text = metrics.render().decode()
+    for name in ("forest_publish_lag_seconds", "forest_ingest_flush_seconds", "forest_ws_clients"):
+        assert name in text
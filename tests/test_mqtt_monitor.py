@@ -0,0 +1,47 @@
+import pytest
+
+from mqtt_monitor import SummaryStats
+
+
+def reading(sensor_id, status, value=1.0):
+    return {"sensor_id": sensor_id, "sensor_type": "smoke", "location": "Area 1", "status": status, "data": {"smoke": value}}
+
+
+def test_snapshot_keeps_only_the_window_and_drops_silent_sensors():
+    stats = SummaryStats(window=10)
+    stats.add([reading("old", "normal")], 100, arrival=0.0)
+    for t in range(10, 20, 2):
+        stats.add([reading("smoke-01", "normal", t)], 100, arrival=float(t))
+    rows, totals = stats.snapshot(now=20.0)
+
+    assert [row["sensor_id"] for row in rows] == ["smoke-01"]
+    assert "old" not in stats.sensors
+    assert rows[0]["readings"] == 5
+    assert rows[0]["rate"] == pytest.approx(0.5)
+    assert rows[0]["last_data"] == {"smoke": 18}
+    # Totals berjalan sejak start, status hanya dalam window
+    assert (totals["messages"], totals["readings"], totals["bytes"]) == (6, 6, 600)
+    assert totals["normal"] == 5
+
+
+def test_rows_sorted_by_severity_and_batch_counts_as_one_arrival():
+    stats = SummaryStats(window=60)
+    stats.add([reading("calm", "normal")] * 3, 50, arrival=1.0)
+    stats.add([reading("hot", "danger"), reading("hot", "warning")], 50, arrival=1.0)
+    stats.add([reading("warm", "warning")], 50, arrival=1.0)
+    rows, totals = stats.snapshot(now=2.0)
+    assert [row["sensor_id"] for row in rows] == ["hot", "warm", "calm"]
+    assert rows[0]["counts"] == {"normal": 0, "warning": 1, "danger": 1}
+    assert totals["messages"] == 3
+    assert rows[2]["jitter_ms"] is None
+
+
+def test_jitter_is_spread_of_message_gaps():
+    stats = SummaryStats(window=60)
+    for arrival in (0.0, 1.0, 2.0, 3.0):
+        stats.add([reading("steady", "normal")], 10, arrival=arrival)
+    for arrival in (0.0, 0.5, 2.0, 2.5):
+        stats.add([reading("bursty", "normal")], 10, arrival=arrival)
+    rows = {row["sensor_id"]: row for row in stats.snapshot(now=4.0)[0]}
+    assert rows["steady"]["jitter_ms"] == pytest.approx(0.0)
+    assert rows["bursty"]["jitter_ms"] == pytest.approx(471.4, abs=0.1)
@@ -0,0 +1,70 @@
+from sqlalchemy import Column, Integer, String, create_engine, insert
+from sqlalchemy.orm import Session, declarative_base
+
+from node_cache import NodeIdCache
+
+Base = declarative_base()
+
+
+class SensorNode(Base):
+    __tablename__ = "sensor_nodes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sensor_id_string = Column(String, unique=True, nullable=False)
+    location = Column(String)
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return Session(engine)
+
+
+def test_resolve_creates_missing_nodes_and_caches_them():
+    db = make_session()
+    cache = NodeIdCache(SensorNode)
+    first = cache.resolve(db, {"temp-01": "Area 1", "hum-01": "Area 1"})
+    assert set(first) == {"temp-01", "hum-01"}
+    assert db.query(SensorNode).count() == 2
+
+    again = cache.resolve(db, {"temp-01": "Area 1"})
+    assert again == {"temp-01": first["temp-01"]}
+    assert cache.metrics()["hits"] == 1
+    assert cache.metrics()["misses"] == 2
+
+
+def test_resolve_reads_back_nodes_inserted_by_another_replica():
+    db = make_session()
+    # Replika lain membuat node setelah cache ini di-warm
+    raced_id = db.execute(
+        insert(SensorNode).values(sensor_id_string="smoke-01", location="Area 2").returning(SensorNode.id)
+    ).scalar()
+    db.commit()
+
+    cache = NodeIdCache(SensorNode)
+    resolved = cache.resolve(db, {"smoke-01": "Area 2", "temp-02": "Area 2"})
+    assert resolved["smoke-01"] == raced_id
+    assert db.query(SensorNode).count() == 2
+    assert cache.get("smoke-01") == raced_id
+
+
+def test_lru_evicts_least_recently_used():
+    db = make_session()
+    cache = NodeIdCache(SensorNode, max_size=2)
+    ids = cache.resolve(db, {"a": None, "b": None})
+    # "a" dipakai lagi sehingga "b" menjadi yang paling lama tidak dipakai
+    assert cache.get("a") == ids["a"]
+    cache.resolve(db, {"c": None})
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == ids["a"]
+
+
+def test_warm_loads_newest_nodes_up_to_capacity():
+    db = make_session()
+    db.execute(insert(SensorNode), [{"sensor_id_string": f"s-{i}"} for i in range(5)])
+    db.commit()
+    cache = NodeIdCache(SensorNode, max_size=3)
+    assert cache.warm(db) == 3
+    assert cache.get("s-0") is None
+    assert cache.get("s-4") is not None
@@ -0,0 +1,151 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+
+from partitions import PartitionManager, is_missing_partition
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def scalar(self):
+        return self.rows
+
+
+class FakeConn:
+    """Menjawab query pg_inherits milik existing_partitions dan count(*) partisi"""
+
+    def __init__(self, rows, count=0):
+        self.rows = rows
+        self.count = count
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        if str(statement).startswith("SELECT count(*)"):
+            return FakeResult(self.count)
+        return FakeResult(self.rows)
+
+
+def manager(interval="daily"):
+    return PartitionManager(create_engine("sqlite://"), "telemetry_readings", interval=interval)
+
+
+def test_daily_period_bounds():
+    pm = manager()
+    start = pm.period_start(datetime(2025, 12, 4, 23, 59, 59))
+    assert start == datetime(2025, 12, 4)
+    assert pm.period_end(start) == datetime(2025, 12, 5)
+    assert pm.partition_name(start) == "telemetry_readings_p20251204"
+
+
+def test_weekly_period_starts_on_monday():
+    pm = manager("weekly")
+    # 2025-12-07 adalah hari Minggu
+    start = pm.period_start(datetime(2025, 12, 7, 12, 0))
+    assert start == datetime(2025, 12, 1)
+    assert pm.period_end(start) == datetime(2025, 12, 8)
+    assert pm.period_start(datetime(2025, 12, 8)) == datetime(2025, 12, 8)
+
+
+def test_period_boundary_belongs_to_the_next_period():
+    pm = manager()
+    midnight = datetime(2025, 12, 5)
+    assert pm.period_start(midnight) == midnight
+    assert pm.period_end(pm.period_start(datetime(2025, 12, 4, 12))) == midnight
+
+
+def test_unknown_interval_is_rejected():
+    with pytest.raises(ValueError):
+        manager("monthly")
+
+
+def test_existing_partitions_parses_bounds():
+    conn = FakeConn([
+        ("telemetry_readings_p20251204",
+         "FOR VALUES FROM ('2025-12-04 00:00:00') TO ('2025-12-05 00:00:00')"),
+        ("telemetry_readings_default", "DEFAULT"),
+    ])
+    assert manager().existing_partitions(conn) == [
+        ("telemetry_readings_p20251204", datetime(2025, 12, 4), datetime(2025, 12, 5)),
+    ]
+
+
+def test_manager_is_a_no_op_outside_postgresql():
+    pm = manager()
+    assert not pm.check()
+    assert pm.ensure_partitions([datetime(2025, 12, 4)], now=datetime(2025, 12, 4)) == []
+    assert pm.drop_expired() == []
+    assert not pm.drop_period(datetime(2025, 12, 4), datetime(2025, 12, 5), conn=None)
+
+
+def test_is_missing_partition():
+    error = IntegrityError(
+        "INSERT INTO telemetry_readings ...", {},
+        Exception('no partition of relation "telemetry_readings" found for row'),
+    )
+    assert is_missing_partition(error)
+    assert not is_missing_partition(IntegrityError("INSERT", {}, Exception("duplicate key value")))
+
+
+def test_drop_period_keeps_partition_with_rows_added_after_export():
+    pm = manager()
+    pm.enabled = True
+    bound = "FOR VALUES FROM ('2025-12-04 00:00:00') TO ('2025-12-05 00:00:00')"
+    conn = FakeConn([("telemetry_readings_p20251204", bound)], count=11)
+    assert not pm.drop_period(datetime(2025, 12, 4), datetime(2025, 12, 5), conn, expected_rows=10)
+    assert not any(statement.startswith("DROP") for statement in conn.statements)
+
+    conn = FakeConn([("telemetry_readings_p20251204", bound)], count=10)
+    assert pm.drop_period(datetime(2025, 12, 4), datetime(2025, 12, 5), conn, expected_rows=10)
+    # Parent dikunci sebelum partisi dihitung
+    assert conn.statements[1].startswith('LOCK TABLE "telemetry_readings"')
+    assert conn.statements[-1] == 'DROP TABLE IF EXISTS "telemetry_readings_p20251204"'
+
+
+class MigrationConn:
+    """Mencatat SQL migrasi dan menjawab query katalog dengan data tetap"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_indexes" in sql:
+            return FakeResult([("telemetry_readings_pkey",), ("ix_telemetry_readings_node_ts",)])
+        if sql.startswith("SELECT pg_get_serial_sequence"):
+            return FakeResult("public.telemetry_readings_id_seq")
+        if "date_trunc" in sql:
+            return FakeResult([(datetime(2025, 12, 4),), (datetime(2025, 12, 5),), (datetime(2025, 12, 9),)])
+        result = FakeResult([])
+        result.rowcount = 42
+        return result
+
+
+def test_migrate_legacy_copies_rows_into_new_partitions():
+    pm = manager("weekly")
+    conn = MigrationConn()
+    created = []
+    copied = pm.migrate_legacy(conn, ["id", "timestamp"], lambda c: created.append(c))
+
+    assert copied == 42
+    assert created == [conn]
+    statements = conn.statements
+    assert statements[0] == 'ALTER TABLE "telemetry_readings" RENAME TO "telemetry_readings_legacy"'
+    assert 'ALTER INDEX "telemetry_readings_pkey" RENAME TO "telemetry_readings_pkey_legacy"' in statements
+    assert ('ALTER SEQUENCE public.telemetry_readings_id_seq RENAME TO "telemetry_readings_legacy_id_seq"'
+            in statements)
+    # Satu partisi per periode (minggu) yang berisi data
+    partitions = [sql for sql in statements if "PARTITION OF" in sql]
+    assert [sql.split('"')[1] for sql in partitions] == ["telemetry_readings_p20251201", "telemetry_readings_p20251208"]
+    copy = next(sql for sql in statements if sql.startswith("INSERT"))
+    assert copy == ('INSERT INTO "telemetry_readings" ("id", "timestamp") SELECT "id", "timestamp" '
+                    'FROM "telemetry_readings_legacy" WHERE timestamp IS NOT NULL')
+    assert "setval" in statements[-1]
@@ -0,0 +1,47 @@
+import struct
+
+import pytest
+
+from telemetry_recording import RecordingError, RecordingWriter, read_recording
+
+
+@pytest.mark.parametrize("name", ["stream.ftrc", "stream.ftrc.gz"])
+def test_recording_round_trip_keeps_bytes_topics_and_arrival(tmp_path, name):
+    path = str(tmp_path / name)
+    with RecordingWriter(path) as writer:
+        writer.write("sensors/telemetry", b'{"sensor_id": "temp-01"}', arrival=100.5)
+        writer.write("sensors/telemetry/bin", b"\xf7\x01\x00", arrival=101.0)
+        writer.write("sensors/telemetry", bytearray(b"{}"), arrival=102.25)
+    assert list(read_recording(path)) == [
+        (100.5, "sensors/telemetry", b'{"sensor_id": "temp-01"}'),
+        (101.0, "sensors/telemetry/bin", b"\xf7\x01\x00"),
+        (102.25, "sensors/telemetry", b"{}"),
+    ]
+
+
+def test_appended_session_redefines_topics(tmp_path):
+    path = str(tmp_path / "stream.ftrc")
+    with RecordingWriter(path) as writer:
+        writer.write("a", b"1", arrival=1.0)
+    with RecordingWriter(path) as writer:
+        # Sesi baru memakai topic_id 0 untuk topic lain
+        writer.write("b", b"2", arrival=2.0)
+        writer.write("a", b"3", arrival=3.0)
+    assert [(topic, payload) for _, topic, payload in read_recording(path)] == [("a", b"1"), ("b", b"2"), ("a", b"3")]
+
+
+def test_truncated_last_record_is_ignored(tmp_path):
+    path = str(tmp_path / "stream.ftrc")
+    with RecordingWriter(path) as writer:
+        writer.write("a", b"complete", arrival=1.0)
+        writer.write("a", b"cut short", arrival=2.0)
+    with open(path, "r+b") as f:
+        f.truncate(len(f.read()) - 3)
+    assert [payload for _, _, payload in read_recording(path)] == [b"complete"]
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(struct.pack("<4sB3x", b"NOPE", 1))
+    with pytest.raises(RecordingError):
+        list(read_recording(str(path)))
@@ -0,0 +1,63 @@
+import json
+import threading
+
+import telemetry_codec as codec
+from benchmarks import replay
+from telemetry_recording import RecordingWriter, read_recording
+
+
+def reading(second):
+    return {
+        "sensor_id": "smoke-01", "sensor_type": "smoke", "location": "Area 2",
+        "timestamp": f"2025-03-01T10:00:{second:02d}Z", "status": "normal", "data": {"smoke": 80.0},
+    }
+
+
+def record(path):
+    node = codec.node_number("smoke-01")
+    with RecordingWriter(path) as writer:
+        writer.write(codec.registry_topic(node), codec.encode_registry(reading(0)), arrival=1000.0)
+        writer.write(codec.TELEMETRY_TOPIC, codec.encode_json([reading(0), reading(1)]), arrival=1000.5)
+        writer.write(codec.BINARY_TOPIC, codec.encode_binary_batch(node, [reading(2)]), arrival=1001.0)
+        # Sesi rekaman berikutnya satu jam kemudian
+        writer.write(codec.TELEMETRY_TOPIC, json.dumps(reading(3)).encode(), arrival=4601.0)
+
+
+def test_load_counts_readings_and_shortens_long_gaps(tmp_path):
+    path = str(tmp_path / "stream.ftrc")
+    record(path)
+    messages, readings = replay.load(path, max_gap=5.0)
+    assert [offset for offset, _, _ in messages] == [0.0, 0.5, 1.0, 6.0]
+    assert readings == 4
+    assert replay.load(path, max_gap=5.0, limit_seconds=2.0)[1] == 3
+
+
+def test_paced_keeps_file_order():
+    messages = [(0.0, "a", b"1"), (0.01, "b", b"2"), (0.02, "a", b"3")]
+    lags = []
+    assert list(replay.paced(messages, speed=0, lags=lags)) == [("a", b"1"), ("b", b"2"), ("a", b"3")]
+    assert list(replay.paced(messages, speed=10.0, lags=lags)) == [("a", b"1"), ("b", b"2"), ("a", b"3")]
+
+
+def test_backlog_from_pipeline_or_metrics_counters():
+    assert replay.backlog(None) is None
+    assert replay.backlog({"received": 10, "written": 6, "failed": 1, "dropped": 1}) == 2
+    assert replay.backlog({"queue_depth": 7}) == 7
+
+
+def test_writer_can_be_flushed_from_another_thread(tmp_path):
+    path = str(tmp_path / "stream.ftrc")
+    writer = RecordingWriter(path)
+    stop = threading.Event()
+
+    def flusher():
+        while not stop.is_set():
+            writer.flush()
+    thread = threading.Thread(target=flusher)
+    thread.start()
+    for i in range(2000):
+        writer.write(f"topic/{i % 3}", str(i).encode(), arrival=float(i))
+    stop.set()
+    thread.join()
+    writer.close()
+    assert [int(payload) for _, _, payload in read_recording(path)] == list(range(2000))
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+
+import main
+import response_cache
+from response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def cache_with_clock(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "monotonic", clock)
+    return ResponseCache(**kwargs), clock
+
+
+def test_invalidate_removes_only_tagged_entries():
+    cache = ResponseCache()
+    cache.put("a", b"[1]", {"sensor:a", "readings"})
+    cache.put("b", b"[2]", {"sensor:b"})
+    cache.invalidate({"sensor:a"})
+    assert cache.get("a") is None
+    assert cache.get("b").body == b"[2]"
+    assert cache.metrics()["invalidations"] == 1
+
+
+def test_entries_expire_after_ttl_and_lru_is_bounded(monkeypatch):
+    cache, clock = cache_with_clock(monkeypatch, max_size=2, ttl=30.0)
+    cache.put("a", b"1", set())
+    cache.put("b", b"2", set())
+    assert cache.get("a") is not None
+    cache.put("c", b"3", set())
+    assert cache.get("b") is None and len(cache) == 2
+    clock.now += 31
+    assert cache.get("a") is None
+
+
+def test_entry_built_during_settle_window_expires_with_it(monkeypatch):
+    cache, clock = cache_with_clock(monkeypatch, ttl=30.0, settle=2.0)
+    started = clock.now
+    cache.invalidate({"sensor:a"})
+    # Query dimulai sebelum batch ingest sempat ditulis: hidup sampai settle berakhir
+    entry = cache.put("a", b"old", {"sensor:a"}, started=started + 1)
+    assert entry.expires == clock.now + 2.0
+    clock.now += 2.5
+    assert cache.get("a") is None
+    assert cache.put("a", b"new", {"sensor:a"}).expires == clock.now + 30.0
+
+
+def test_same_body_has_same_etag():
+    cache = ResponseCache()
+    assert cache.put("a", b"[1]", set()).etag == cache.put("b", b"[1]", set()).etag
+    assert cache.put("c", b"[2]", set()).etag != cache.get("a").etag
+
+
+def request(path, headers=None):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get(path, headers=headers)
+        finally:
+            await main.async_engine.dispose()
+    return asyncio.run(run())
+
+
+def test_endpoint_serves_cached_body_until_sensor_tag_is_invalidated():
+    main.response_cache.clear()
+    reading = {
+        "sensor_id": "cache-a", "location": "Area Cache", "sensor_type": "temperature",
+        "timestamp": "2025-03-01T00:00:00Z", "status": "NORMAL", "data": {"temperature": 20.0},
+    }
+    main.save_batch_to_database([reading])
+    first = request("/api/sensors/cache-a/latest")
+    etag = first.headers["ETag"]
+    assert first.json()["data"] == {"temperature": 20.0}
+    assert request("/api/sensors/cache-a/latest", {"If-None-Match": etag}).status_code == 304
+
+    main.save_batch_to_database([dict(reading, timestamp="2025-03-01T00:01:00Z", data={"temperature": 25.0})])
+    main.response_cache.invalidate({"sensor:cache-a"})
+    response = request("/api/sensors/cache-a/latest", {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["data"] == {"temperature": 25.0}
+
+
+def test_untagged_entry_uses_its_own_ttl(monkeypatch):
+    cache, clock = cache_with_clock(monkeypatch, ttl=30.0)
+    cache.put("all", b"[]", (), ttl=5.0)
+    cache.invalidate({"sensor:a"})
+    assert cache.get("all") is not None
+    clock.now += 6
+    assert cache.get("all") is None
+
+
+def test_old_invalidation_times_are_pruned(monkeypatch):
+    cache, clock = cache_with_clock(monkeypatch, settle=2.0)
+    for i in range(100):
+        cache.invalidate({f"sensor:{i}"})
+    clock.now += 3
+    cache.invalidate({"sensor:new"})
+    assert set(cache._invalidated_at) == {"sensor:new"}
@@ -0,0 +1,228 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+
+import main
+import telemetry_codec as codec
+from mqtt_consumer import MqttConsumer, shared_prefix
+
+
+class FakeConsumer:
+    def __init__(self, host, port, handler, name, telemetry_prefix="", event_handlers=None, **kwargs):
+        self.telemetry_prefix = telemetry_prefix
+        self.handler = handler
+        self.name = name
+        self.event_handlers = event_handlers or {}
+        self.started = self.stopped = False
+        self.published = []
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+    def publish(self, topic, event):
+        self.published.append((topic, event))
+
+
+@pytest.fixture
+def consumers(monkeypatch):
+    monkeypatch.setattr(main, "MqttConsumer", FakeConsumer)
+    monkeypatch.setattr(main.ingest_pipeline, "start", lambda: None)
+    monkeypatch.setattr(main.partition_manager, "start", lambda every_seconds: None)
+    monkeypatch.setattr(main.telemetry_archive, "start", lambda every_seconds: None)
+
+    def start(role):
+        monkeypatch.setattr(main, "INGEST_ENABLED", role in ("all", "ingest"))
+        monkeypatch.setattr(main, "API_ENABLED", role in ("all", "api"))
+        main.start_mqtt_consumers()
+        started = {consumer.name: consumer for consumer in main.mqtt_consumers}
+        main.stop_consumers()
+        return started
+    return start
+
+
+def test_shared_prefix():
+    assert shared_prefix("dashboard_ingest") == "$share/dashboard_ingest/"
+    assert shared_prefix("") == ""
+
+
+def test_ingest_role_consumes_the_shared_subscription_and_alerts(consumers):
+    started = consumers("ingest")
+    assert list(started) == ["ingest", "alerts"]
+    # Status area butuh semua reading: consumer alert tidak memakai shared subscription
+    assert started["alerts"].telemetry_prefix == ""
+    assert started["ingest"].telemetry_prefix == shared_prefix(main.MQTT_SHARED_GROUP)
+    assert started["ingest"].handler is main.handle_ingest
+    assert started["ingest"].stopped
+
+
+def test_api_role_receives_every_message_for_websocket_clients(consumers):
+    started = consumers("api")
+    assert list(started) == ["api"]
+    assert started["api"].telemetry_prefix == ""
+    assert started["api"].handler is main.handle_broadcast
+    assert started["api"].event_handlers == {
+        main.MQTT_ALERT_TOPIC: main.handle_area_alert,
+        main.MQTT_DETECTION_TOPIC: main.handle_detection,
+    }
+
+
+def test_all_role_runs_every_consumer(consumers):
+    assert sorted(consumers("all")) == ["alerts", "api", "ingest"]
+
+
+def test_area_alert_is_published_only_by_the_replica_that_stored_it():
+    event = {
+        "type": "area_alert", "location": "Area Replika", "previous_status": "NORMAL",
+        "area_status": "DANGER", "area_values": {"smoke": 400.0}, "timestamp": "2025-03-02T00:00:00Z",
+    }
+    first, second = FakeConsumer("", 0, None, "alerts"), FakeConsumer("", 0, None, "alerts")
+    main.record_area_alert(event, first)
+    main.record_area_alert(dict(event), second)
+    assert first.published == [(main.MQTT_ALERT_TOPIC, event)]
+    assert second.published == []
+
+
+def test_detection_runs_in_the_ingest_alert_consumer_and_is_published_once(monkeypatch):
+    published = []
+    monkeypatch.setattr(main.manager, "publish_threadsafe", published.append)
+    readings = [
+        {
+            "sensor_id": "detect-roles", "location": "Area Deteksi", "sensor_type": "temperature",
+            "timestamp": f"2025-03-03T00:{i // 6:02d}:{i % 6 * 10:02d}Z", "status": "NORMAL",
+            "data": {"temperature": 25.0 + (i % 2) * 0.1},
+        }
+        for i in range(20)
+    ]
+    spike = dict(readings[-1], timestamp="2025-03-03T00:03:30Z", data={"temperature": 45.0})
+
+    # Worker API hanya meneruskan telemetri; tidak menjalankan detektor
+    main.handle_broadcast(readings + [spike])
+    assert [frame["type"] for frame in published] == ["telemetry"] * 21
+
+    first, second = FakeConsumer("", 0, None, "alerts"), FakeConsumer("", 0, None, "alerts")
+    main.handle_alerts(readings + [spike], first)
+    main.alert_executor.submit(lambda: None).result()
+    detections = [event for topic, event in first.published if topic == main.MQTT_DETECTION_TOPIC]
+    assert [(d["sensor_id"], d["metric"], d["kind"]) for d in detections] == [
+        ("detect-roles", "temperature", "spike"), ("detect-roles", "temperature", "rate"),
+    ]
+    detection = detections[0]
+    assert detection["location"] == "Area Deteksi"
+
+    # Replika ingest lain menghitung deteksi yang sama: tidak disimpan atau di-publish lagi
+    main.record_detection(dict(detection), second)
+    assert second.published == []
+    assert len(main.detection_engine.snapshot("detect-roles")["detect-roles"]) == 1
+
+    main.handle_detection(detection)
+    assert published[-1] == {"type": "alert", "alert": detection}
+
+
+def test_alert_consumer_compares_warmed_and_mqtt_timestamps_as_epoch():
+    def reading(timestamp, smoke):
+        return {
+            "sensor_id": "alert-warm", "location": "Area Warm", "sensor_type": "smoke",
+            "timestamp": timestamp, "status": "NORMAL", "data": {"smoke": smoke},
+        }
+    main.save_batch_to_database([reading("2025-03-05T00:00:30Z", 100.0)])
+    main.alert_latest.pop("alert-warm", None)
+    main.load_sensor_latest()
+    # Dari database (isoformat tanpa Z) dan dari MQTT (akhiran Z) satu bentuk
+    assert main.alert_latest["alert-warm"] == codec.parse_timestamp("2025-03-05T00:00:30Z")
+
+    publisher = FakeConsumer("", 0, None, "alerts")
+    main.handle_alerts([reading("2025-03-05T00:00:10Z", 900.0)], publisher)
+    assert main.alert_latest["alert-warm"] == codec.parse_timestamp("2025-03-05T00:00:30Z")
+    main.handle_alerts([reading("2025-03-05T00:00:40Z", 100.0)], publisher)
+    assert main.alert_latest["alert-warm"] == codec.parse_timestamp("2025-03-05T00:00:40Z")
+
+
+def test_consumer_routes_event_topics_to_their_handler():
+    events, received = [], []
+    consumer = MqttConsumer("localhost", 1883, received.extend, name="test", event_handlers={"alerts/area": events.append})
+    assert "alerts/area" in consumer.topics
+    consumer._on_message(None, None, message("alerts/area", b'{"location": "Area 1"}'))
+    assert events == [{"location": "Area 1"}]
+    assert received == []
+
+
+def message(topic, payload):
+    return SimpleNamespace(topic=topic, payload=payload)
+
+
+def test_consumer_counts_decode_errors_and_keeps_going():
+    received = []
+    consumer = MqttConsumer("localhost", 1883, received.extend, name="test")
+    consumer._on_message(None, None, message(codec.TELEMETRY_TOPIC, b"not json"))
+    consumer._on_message(None, None, message(codec.TELEMETRY_TOPIC, json.dumps({"sensor_id": "temp-01"}).encode()))
+    assert received == [{"sensor_id": "temp-01"}]
+    metrics = consumer.metrics()
+    assert (metrics["received"], metrics["errors"]) == (1, 1)
+    assert metrics["client_id"].startswith("dashboard_test_")
+
+
+def test_consumer_decodes_binary_after_registry_message():
+    received = []
+    consumer = MqttConsumer("localhost", 1883, received.append, name="test", telemetry_prefix="$share/g/")
+    assert consumer.topics[0] == "$share/g/sensors/telemetry"
+    reading = {
+        "sensor_id": "smoke-01", "sensor_type": "smoke", "location": "Area 2",
+        "timestamp": "2025-03-01T10:00:00Z", "status": "normal", "data": {"smoke": 80.0},
+    }
+    node = codec.node_number("smoke-01")
+    consumer._on_message(None, None, message(codec.registry_topic(node), codec.encode_registry(reading)))
+    consumer._on_message(None, None, message(codec.BINARY_TOPIC, codec.encode_binary(node, reading)))
+    consumer._on_message(None, None, message(codec.BINARY_TOPIC, codec.encode_binary_batch(node, [reading, reading])))
+    # Satu pesan = satu panggilan handler berisi semua reading-nya
+    assert received == [[reading], [reading, reading]]
+    assert consumer.metrics()["registered_nodes"] == 1
+
+
+def test_detection_endpoint_lists_stored_detections():
+    main.save_detection({
+        "sensor_id": "detect-api", "location": "Area Deteksi", "metric": "smoke", "kind": "rate",
+        "severity": "WARNING", "value": 250.0, "score": 120.0, "timestamp": "2025-03-04T00:00:00Z",
+    })
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/detection", params={"sensor_id": "detect-api"})
+        finally:
+            await main.async_engine.dispose()
+    [recent] = asyncio.run(run()).json()["recent"]
+    assert (recent["metric"], recent["kind"], recent["timestamp"]) == ("smoke", "rate", "2025-03-04T00:00:00")
+
+
+def test_schema_setup_is_idempotent_and_api_workers_wait_for_it(monkeypatch):
+    # Sudah dijalankan saat import (SERVICE_ROLE=all); proses ingest lain cukup memeriksa ulang
+    main.init_database()
+    main.wait_for_schema(timeout=0)
+
+    # Worker API tanpa tabel (proses ingest belum start): gagal setelah timeout
+    monkeypatch.setattr(main, "engine", create_engine("sqlite://"))
+    with pytest.raises(RuntimeError, match="sensor_nodes"):
+        main.wait_for_schema(timeout=0)
+
+
+def test_legacy_unpartitioned_table_needs_explicit_migration(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.partition_manager, "migrate_legacy", lambda *args: calls.append(args))
+    monkeypatch.setattr(main, "TELEMETRY_PARTITION_MIGRATE", False)
+    with pytest.raises(RuntimeError, match="TELEMETRY_PARTITION_MIGRATE=true"):
+        main.migrate_legacy_readings("conn")
+    assert calls == []
+
+    monkeypatch.setattr(main, "TELEMETRY_PARTITION_MIGRATE", True)
+    main.migrate_legacy_readings("conn")
+    [(conn, columns, _)] = calls
+    assert conn == "conn"
+    assert columns[:3] == ["id", "node_id", "sensor_type"]
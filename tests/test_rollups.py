@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+import main
+import rollups
+
+
+def row(node_id, timestamp, **values):
+    return dict({"temperature": None, "humidity": None, "smoke": None}, node_id=node_id, timestamp=timestamp, **values)
+
+
+def stored(model, node_id):
+    with main.SessionLocal() as db:
+        return db.execute(select(model).where(model.node_id == node_id).order_by(model.bucket)).scalars().all()
+
+
+def test_bucket_start_aligns_to_epoch():
+    assert rollups.bucket_start(datetime(2025, 1, 1, 10, 7, 59), 60) == datetime(2025, 1, 1, 10, 7)
+    assert rollups.bucket_start(datetime(2025, 1, 1, 10, 7, 59), 900) == datetime(2025, 1, 1, 10, 0)
+    assert rollups.bucket_start(datetime(2025, 1, 1, 23, 59), 86400) == datetime(2025, 1, 1)
+
+
+def test_aggregate_readings_skips_missing_metrics():
+    buckets = rollups.aggregate_readings([
+        row(1, datetime(2025, 1, 1, 0, 0, 5), temperature=20.0),
+        row(1, datetime(2025, 1, 1, 0, 0, 50), temperature=24.0, smoke=100.0),
+        row(1, datetime(2025, 1, 1, 0, 1, 0), temperature=30.0),
+    ], 60)
+    first = buckets[(1, datetime(2025, 1, 1, 0, 0))]
+    assert (first["temperature_min"], first["temperature_max"], first["temperature_sum"]) == (20.0, 24.0, 44.0)
+    assert first["temperature_count"] == 2
+    assert first["smoke_count"] == 1
+    assert first["humidity_count"] == 0 and first["humidity_min"] is None
+    assert buckets[(1, datetime(2025, 1, 1, 0, 1))]["temperature_count"] == 1
+
+
+def test_upsert_merges_batches_into_existing_buckets():
+    node_id = 9001
+    readings = [
+        row(node_id, datetime(2025, 1, 1, 0, 0, second), temperature=20.0 + second, smoke=None if second % 20 else 50.0)
+        for second in range(0, 60, 10)
+    ]
+    with main.SessionLocal() as db:
+        # Batch dipecah sembarang; hasil akhirnya harus sama dengan satu batch penuh
+        for batch in (readings[:1], readings[1:4], readings[4:]):
+            rollups.upsert_rollups(db, main.TelemetryRollup1m, batch, 60)
+        db.commit()
+
+    (bucket,) = stored(main.TelemetryRollup1m, node_id)
+    expected = rollups.aggregate_readings(readings, 60)[(node_id, datetime(2025, 1, 1))]
+    for column, value in expected.items():
+        assert getattr(bucket, column) == pytest.approx(value)
+    assert (bucket.temperature_min, bucket.temperature_max, bucket.temperature_count) == (20.0, 70.0, 6)
+    assert (bucket.smoke_min, bucket.smoke_count) == (50.0, 3)
+
+
+def test_rebucket_combines_minute_rows_into_larger_buckets():
+    node_id = 9002
+    readings = [row(node_id, datetime(2025, 1, 1, 0, minute), temperature=float(minute)) for minute in range(12)]
+    with main.SessionLocal() as db:
+        rollups.upsert_rollups(db, main.TelemetryRollup1m, readings, 60)
+        db.commit()
+
+    buckets = rollups.rebucket(stored(main.TelemetryRollup1m, node_id), 300)
+    assert sorted(buckets) == [datetime(2025, 1, 1, 0, 0), datetime(2025, 1, 1, 0, 5), datetime(2025, 1, 1, 0, 10)]
+    formatted = rollups.format_bucket(datetime(2025, 1, 1, 0, 5), buckets[datetime(2025, 1, 1, 0, 5)])
+    assert formatted["temperature"] == {"min": 5.0, "max": 9.0, "avg": 7.0, "count": 5}
+    assert "smoke" not in formatted
+
+
+def test_choose_bucket_keeps_point_count_under_limit():
+    start = datetime(2025, 1, 1)
+    assert rollups.choose_bucket(start, datetime(2025, 1, 1, 12), 1000) == "1m"
+    assert rollups.choose_bucket(start, datetime(2025, 1, 31), 1000) == "1h"
+    assert rollups.choose_bucket(start, datetime(2030, 1, 1), 1000) == "1d"
@@ -0,0 +1,35 @@
+import os
+
+from spool import DiskSpool
+
+
+def test_pending_messages_survive_a_restart_in_order(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    seqs = [spool.append(f"batch-{i}".encode()) for i in range(3)]
+    spool.remove(seqs[1])
+
+    reopened = DiskSpool(str(tmp_path))
+    assert reopened.pending() == [seqs[0], seqs[2]]
+    assert [reopened.read(seq) for seq in reopened.pending()] == [b"batch-0", b"batch-2"]
+    # Nomor urut dilanjutkan sehingga urutan replay tetap urutan publish
+    assert reopened.append(b"batch-3") == seqs[2] + 1
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+
+def test_ring_buffer_drops_oldest_beyond_capacity(tmp_path):
+    spool = DiskSpool(str(tmp_path), max_messages=2)
+    for i in range(4):
+        spool.append(bytes([i]))
+    assert len(spool) == 2
+    assert spool.dropped == 2
+    assert [spool.read(seq) for seq in spool.pending()] == [b"\x02", b"\x03"]
+    assert spool.read(0) is None
+
+
+def test_remove_is_idempotent(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    seq = spool.append(b"x")
+    spool.remove(seq)
+    spool.remove(seq)
+    assert spool.pending() == []
+    assert os.listdir(tmp_path) == []
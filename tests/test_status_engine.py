@@ -0,0 +1,54 @@
+from status_engine import StatusEngine, evaluate_status
+
+
+def payload(sensor_id, location, timestamp, **data):
+    return {"sensor_id": sensor_id, "location": location, "timestamp": timestamp, "data": data}
+
+
+def engine():
+    return StatusEngine(smoke_warning=300, smoke_danger=600)
+
+
+def test_evaluate_status_rules():
+    assert evaluate_status(None, None, 600, 300, 600) == "DANGER"
+    assert evaluate_status(35, 39, None, 300, 600) == "DANGER"
+    assert evaluate_status(35, None, None, 300, 600) == "NORMAL"
+    assert evaluate_status(None, None, 300, 300, 600) == "WARNING"
+    assert evaluate_status(30, 40, 0, 300, 600) == "WARNING"
+    assert evaluate_status(30, 70, 0, 300, 600) == "NORMAL"
+
+
+def test_area_combines_latest_values_of_its_sensors():
+    status = engine()
+    assert status.update(payload("temp-01", "Area 1", "t1", temperature=36.0)) == (
+        "Area 1", "NORMAL", {"temperature": 36.0, "humidity": None, "smoke": None, "timestamp": "t1"}, False,
+    )
+    location, area_status, values, changed = status.update(payload("hum-01", "Area 1", "t2", humidity=30.0))
+    assert (location, area_status, changed) == ("Area 1", "DANGER", True)
+    assert values["timestamp"] == "t2"
+    sources = status.all()[0]["sources"]
+    assert sources["temperature"] == {"sensor_id": "temp-01", "timestamp": "t1"}
+    assert sources["humidity"] == {"sensor_id": "hum-01", "timestamp": "t2"}
+
+
+def test_locations_are_evaluated_independently():
+    status = engine()
+    status.update(payload("smoke-01", "Area 1", "t1", smoke=650.0))
+    status.update(payload("temp-02", "Area 2", "t1", temperature=25.0))
+    status.update(payload("smoke-02", "Area 2", "t2", smoke=100.0))
+    assert status.get("Area 1")[0] == "DANGER"
+    assert status.get("Area 2")[0] == "NORMAL"
+    assert status.get("Area 3") is None
+
+    worst, values = status.overall()
+    assert (worst, values["location"], values["smoke"]) == ("DANGER", "Area 1", 650.0)
+
+    # Area 1 pulih tanpa terpengaruh reading Area 2
+    assert status.update(payload("smoke-01", "Area 1", "t3", smoke=50.0))[1:] == (
+        "NORMAL", {"temperature": None, "humidity": None, "smoke": 50.0, "timestamp": "t3"}, True,
+    )
+    assert status.overall()[0] == "NORMAL"
+
+
+def test_overall_without_data_is_normal():
+    assert engine().overall() == ("NORMAL", {"temperature": None, "humidity": None, "smoke": None, "timestamp": None})
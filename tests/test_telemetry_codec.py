@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+import telemetry_codec as codec
+
+
+def payload(**overrides):
+    base = {
+        "sensor_id": "temp-01",
+        "sensor_type": "temperature",
+        "location": "Area 1",
+        "timestamp": "2025-03-01T10:00:00Z",
+        "data": {"temperature": 27.123456, "smoke": 120.5},
+        "status": "warning",
+    }
+    base.update(overrides)
+    return base
+
+
+def identity(sensor_type="temperature"):
+    return {"sensor_id": "temp-01", "sensor_type": sensor_type, "location": "Area 1"}
+
+
+def test_binary_round_trip_keeps_present_metrics_at_three_decimals():
+    raw = codec.encode_binary(7, payload())
+    assert len(raw) == 13 + 2 * 4
+    assert codec.peek_node_number(raw) == 7
+    assert codec.decode_binary(raw, identity()) == ({
+        "sensor_id": "temp-01",
+        "sensor_type": "temperature",
+        "location": "Area 1",
+        "timestamp": "2025-03-01T10:00:00Z",
+        "data": {"temperature": 27.123, "smoke": 120.5},
+        "status": "warning",
+    }, len(raw))
+
+
+def test_unknown_type_and_status_fall_back_to_registry_and_unknown():
+    raw = codec.encode_binary(7, payload(sensor_type="wind", status="offline"))
+    decoded, _ = codec.decode_binary(raw, identity(sensor_type="wind"))
+    assert decoded["sensor_type"] == "wind"
+    assert decoded["status"] == "unknown"
+
+
+def test_corrupt_payloads_raise_codec_error():
+    raw = codec.encode_binary(7, payload())
+    with pytest.raises(codec.CodecError):
+        codec.decode_binary(raw[:5], identity())
+    with pytest.raises(codec.CodecError):
+        codec.decode_binary(raw[:-2], identity())
+    with pytest.raises(codec.CodecError):
+        codec.decode_binary(b"\x00" + raw[1:], identity())
+
+
+def test_timestamp_helpers_are_inverse():
+    assert codec.format_timestamp(codec.parse_timestamp("2025-03-01T10:00:00Z")) == "2025-03-01T10:00:00Z"
+
+
+def test_decoder_needs_registry_before_binary_readings():
+    decoder = codec.TelemetryDecoder()
+    node = codec.node_number("temp-01")
+    raw = codec.encode_binary(node, payload())
+    assert decoder.decode(codec.BINARY_TOPIC, raw) == []
+    assert decoder.unknown_nodes == 1
+    assert decoder.pending_records() == 1
+
+    # Record yang ditahan dikembalikan saat registry node datang
+    (replayed,) = decoder.decode(codec.registry_topic(node), codec.encode_registry(payload()))
+    assert replayed["sensor_id"] == "temp-01"
+    assert decoder.registry[node] == identity()
+    assert decoder.pending_records() == 0 and decoder.replayed == 1
+    (decoded,) = decoder.decode(codec.BINARY_TOPIC, raw)
+    assert decoded == replayed
+
+    # Pesan retained kosong menghapus node dari registry
+    assert decoder.decode(codec.registry_topic(node), b"") == []
+    assert decoder.decode(codec.BINARY_TOPIC, raw) == []
+
+
+def test_decoder_passes_json_through_and_lists_topics():
+    decoder = codec.TelemetryDecoder()
+    assert decoder.decode(codec.TELEMETRY_TOPIC, json.dumps(payload()).encode()) == [payload()]
+    assert decoder.topics("$share/ingest/") == [
+        "$share/ingest/sensors/telemetry",
+        "$share/ingest/sensors/telemetry/bin",
+        "sensors/registry/+",
+    ]
+
+
+def test_json_batch_expands_to_one_payload_per_reading():
+    readings = [payload(timestamp=f"2025-03-01T10:00:0{i}Z", data={"temperature": 20.0 + i}) for i in range(3)]
+    message = json.loads(codec.encode_json_batch(readings))
+    assert set(message) == {"sensor_id", "sensor_type", "location", "readings"}
+    assert codec.expand_json(message) == readings
+    assert codec.expand_json(payload()) == [payload()]
+    assert codec.expand_json([payload(), payload()]) == [payload(), payload()]
+
+
+def test_binary_batch_skips_records_of_unknown_nodes():
+    decoder = codec.TelemetryDecoder()
+    known, unknown = codec.node_number("temp-01"), codec.node_number("temp-99")
+    decoder.decode(codec.registry_topic(known), codec.encode_registry(payload()))
+    readings = [payload(timestamp=f"2025-03-01T10:00:0{i}Z", data={"temperature": 20.0 + i}) for i in range(3)]
+    raw = (codec.encode_binary_batch(known, readings[:2]) + codec.encode_binary(unknown, readings[2])
+           + codec.encode_binary(known, readings[2]))
+
+    decoded = decoder.decode(codec.BINARY_TOPIC, raw)
+    assert [item["data"]["temperature"] for item in decoded] == [20.0, 21.0, 22.0]
+    assert decoder.unknown_nodes == 1
+
+
+def test_pending_records_keep_sent_at_and_stay_bounded():
+    decoder = codec.TelemetryDecoder(pending_per_node=2, max_pending_nodes=1)
+    first, second = codec.node_number("temp-01"), codec.node_number("temp-02")
+    readings = [payload(timestamp=f"2025-03-01T10:00:0{i}Z", data={"temperature": 20.0 + i}) for i in range(3)]
+    assert decoder.decode(codec.BINARY_TOPIC, codec.encode_binary_batch(first, readings)) == []
+    # Antrian per node hanya menyimpan record terbaru
+    assert decoder.pending_records() == 2 and decoder.dropped == 1
+
+    # Node baru melebihi max_pending_nodes: antrian node terlama dibuang
+    decoder.decode(codec.BINARY_TOPIC, codec.encode_binary_batch(second, readings[:1], sent_at=1740823210.5))
+    assert list(decoder.pending) == [second]
+    assert decoder.dropped == 3
+    assert decoder.decode(codec.registry_topic(first), codec.encode_registry(payload())) == []
+
+    (replayed,) = decoder.decode(codec.registry_topic(second), codec.encode_registry(payload(sensor_id="temp-02")))
+    assert replayed["sensor_id"] == "temp-02"
+    assert replayed["sent_at"] == 1740823210.5
+    assert replayed["data"]["temperature"] == 20.0
+    assert decoder.unknown_nodes == 4 and decoder.replayed == 1
+
+
+def test_parse_timestamp_is_cached():
+    codec.parse_timestamp.cache_clear()
+    codec.parse_timestamp("2025-03-01T10:00:05Z")
+    codec.parse_timestamp("2025-03-01T10:00:05Z")
+    assert codec.parse_timestamp.cache_info().hits == 1
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import threading
+
+from ws_manager import ClientConnection, ConnectionManager, Subscription, flatten_payload
+
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self):
+        self.closed = True
+
+
+def test_full_client_queue_drops_oldest_frame():
+    async def run():
+        client = ClientConnection(FakeWebSocket(), max_queue=2)
+        for i in range(4):
+            client.offer(str(i))
+        return [client.queue.get_nowait() for _ in range(client.queue.qsize())], client.dropped
+    assert asyncio.run(run()) == (["2", "3"], 2)
+
+
+def test_slow_client_is_disconnected_without_delaying_others():
+    async def run():
+        manager = ConnectionManager(max_queue=10, send_timeout=0.05)
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=1.0)
+        await manager.connect(fast)
+        await manager.connect(slow)
+        for i in range(3):
+            await manager.broadcast({"seq": i})
+        await asyncio.sleep(0.2)
+        metrics = manager.metrics()
+        await manager.close(fast)
+        return fast, slow, metrics, manager
+
+    fast, slow, metrics, manager = asyncio.run(run())
+    assert [frame["seq"] for frame in fast.sent] == [0, 1, 2]
+    assert slow.sent == [] and slow.closed
+    assert metrics["clients"] == 1
+    assert metrics["disconnected_slow"] == 1
+    assert manager.active_connections == {}
+
+
+def test_publish_threadsafe_hands_frames_to_the_server_loop():
+    async def run():
+        manager = ConnectionManager()
+        manager.bind_loop(asyncio.get_running_loop())
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        thread = threading.Thread(target=manager.publish_threadsafe, args=({"from": "mqtt"},))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0.05)
+        await manager.close(websocket)
+        return websocket.sent
+    assert asyncio.run(run()) == [{"from": "mqtt"}]
+
+
+def telemetry(sensor_id, location, sensor_type, timestamp, **data):
+    return {
+        "payload": {
+            "sensor_id": sensor_id,
+            "location": location,
+            "sensor_type": sensor_type,
+            "timestamp": timestamp,
+            "status": "NORMAL",
+            "data": data,
+        },
+        "location": location,
+        "area_status": "NORMAL",
+        "area_values": {"temperature": 25.0},
+    }
+
+
+def test_frame_contains_only_latest_changed_fields():
+    subscription = Subscription(sensor_ids=["temp-01"])
+    subscription.stage("temp-01", flatten_payload(telemetry("temp-01", "Area 1", "temperature", "t1", temperature=25.0)["payload"]))
+    areas = {"Area 1": ("NORMAL", {}), "Area 2": ("DANGER", {})}
+    first = subscription.build_frame(areas)
+    assert first["sensors"]["temp-01"]["temperature"] == 25.0
+    # Hanya area milik sensor yang dipilih client
+    assert first["areas"] == {"Area 1": {"area_status": "NORMAL", "area_values": {}}}
+
+    # Dua update sebelum frame berikutnya digabung; hanya field yang berubah dikirim
+    for timestamp, value in (("t2", 26.0), ("t3", 25.0)):
+        subscription.stage("temp-01", flatten_payload(telemetry("temp-01", "Area 1", "temperature", timestamp, temperature=value)["payload"]))
+    assert subscription.build_frame(areas) == {"type": "delta", "sensors": {"temp-01": {"timestamp": "t3"}}}
+    assert subscription.build_frame(areas) is None
+
+
+def test_subscribed_client_only_receives_matching_sensors():
+    async def run():
+        manager = ConnectionManager(max_frame_rate=100.0, tick_interval=0.01)
+        manager.bind_loop(asyncio.get_running_loop())
+        legacy, subscribed = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(legacy)
+        await manager.connect(subscribed)
+        manager.handle_client_message(subscribed, json.dumps({"type": "subscribe", "locations": ["Area 2"]}))
+        await manager.broadcast(telemetry("temp-01", "Area 1", "temperature", "t1", temperature=25.0))
+        await manager.broadcast(telemetry("smoke-02", "Area 2", "smoke", "t1", smoke=120.0))
+        await asyncio.sleep(0.1)
+
+        manager.handle_client_message(subscribed, json.dumps({"type": "unsubscribe"}))
+        await manager.broadcast(telemetry("temp-01", "Area 1", "temperature", "t2", temperature=26.0))
+        await asyncio.sleep(0.05)
+        await manager.close(legacy)
+        await manager.close(subscribed)
+        return legacy.sent, subscribed.sent
+
+    legacy, subscribed = asyncio.run(run())
+    assert len(legacy) == 3
+    assert subscribed[0] == {"type": "subscribed", "max_rate": 100.0}
+    deltas = [frame for frame in subscribed if frame.get("type") == "delta"]
+    assert [set(frame["sensors"]) for frame in deltas] == [{"smoke-02"}]
+    # Setelah unsubscribe client kembali menerima format lama
+    assert subscribed[-1]["payload"]["timestamp"] == "t2"
@@ -9,6 +9,14 @@ const chartData = {
 
 const MAX_DATA_POINTS = 20;
 
+// Rentang grafik historis (jam) dan metrik yang digambar per sensor
+const HISTORY_RANGE_HOURS = 24;
+const SENSOR_METRICS = {
+    'temp-01': 'temperature',
+    'hum-01': 'humidity',
+    'smoke-01': 'smoke'
+};
+
 // Charts
 let temperatureChart, humidityChart, smokeChart;
 
@@ -68,13 +76,16 @@ async function fetchInitialData() {
             }
         });
 
-        // Fetch combined area status
+        // Status area awal dari state yang sudah di-debounce server (sama dengan event area_alert),
+        // bukan status mentah reading terakhir
         try {
-            const stResp = await fetch(`${API_BASE_URL}/api/status`);
-            const stData = await stResp.json();
-            if (stData && stData.area_status) {
-                updateAreaStatus(stData.area_status, stData.area_values || {});
-            }
+            const alResp = await fetch(`${API_BASE_URL}/api/alerts?limit=50`);
+            const alData = await alResp.json();
+            const events = alData.alerts || [];
+            Object.entries(alData.active || {}).forEach(([location, status]) => {
+                const last = events.find(e => e.location === location && e.area_status === status);
+                setAreaStatus(location, status, last ? last.area_values : {});
+            });
         } catch (e) {
             console.warn('Could not fetch area status', e);
         }
@@ -90,29 +101,32 @@ async function fetchInitialData() {
     }
 }
 
-// Fetch data historis untuk chart
+// Fetch data historis untuk chart (deret ter-downsample di server)
 async function fetchHistoricalData() {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/readings/history?limit=20`);
+        const to = new Date();
+        const from = new Date(to.getTime() - HISTORY_RANGE_HOURS * 3600 * 1000);
+        const width = document.getElementById('temperatureChart').clientWidth || 600;
+        const params = new URLSearchParams({
+            sensor_id: Object.keys(SENSOR_METRICS).join(','),
+            from: from.toISOString().slice(0, 19),
+            to: to.toISOString().slice(0, 19),
+            width: width
+        });
+        const response = await fetch(`${API_BASE_URL}/api/readings/series?${params}`);
         const data = await response.json();
         
         // Group by sensor
         const groupedData = {};
-        data.reverse().forEach(reading => {
-            if (!groupedData[reading.sensor_id]) {
-                groupedData[reading.sensor_id] = {
-                    labels: [],
-                    temperature: [],
-                    humidity: [],
-                    smoke: []
-                };
-            }
-            
-            const time = new Date(reading.timestamp).toLocaleTimeString('id-ID');
-            groupedData[reading.sensor_id].labels.push(time);
-            groupedData[reading.sensor_id].temperature.push(reading.data?.temperature || null);
-            groupedData[reading.sensor_id].humidity.push(reading.data?.humidity || null);
-            groupedData[reading.sensor_id].smoke.push(reading.data?.smoke || null);
+        (data.series || []).forEach(series => {
+            if (series.metric !== SENSOR_METRICS[series.sensor_id]) return;
+            groupedData[series.sensor_id] = {
+                labels: series.t.map(t => new Date(t * 1000).toLocaleString('id-ID')),
+                temperature: [],
+                humidity: [],
+                smoke: []
+            };
+            groupedData[series.sensor_id][series.metric] = series.v;
         });
 
         // Update charts
@@ -416,14 +430,39 @@ function updateChartData(data) {
         `Terakhir diperbarui: ${new Date().toLocaleString('id-ID')}`;
 }
 
+    // Status per lokasi; header hanya menampilkan area dengan status terburuk
+    const STATUS_LEVELS = { NORMAL: 0, WARNING: 1, DANGER: 2 };
+    const areaStatuses = {};
+    let shownArea = null;
+
+    function setAreaStatus(location, areaStatus, areaValues) {
+        if (!areaStatus) return;
+        areaStatuses[location || 'unknown'] = { status: areaStatus, values: areaValues || {} };
+
+        let worstLocation = null;
+        for (const [loc, area] of Object.entries(areaStatuses)) {
+            if (worstLocation === null ||
+                STATUS_LEVELS[area.status] > STATUS_LEVELS[areaStatuses[worstLocation].status]) {
+                worstLocation = loc;
+            }
+        }
+        const worst = areaStatuses[worstLocation];
+        // Banner/notifikasi hanya saat area terburuk atau statusnya berubah
+        const key = `${worstLocation}|${worst.status}`;
+        if (key === shownArea) return;
+        shownArea = key;
+        updateAreaStatus(worst.status, worst.values, worstLocation);
+    }
+
     // Update area status in header
-    function updateAreaStatus(areaStatus, areaValues) {
+    function updateAreaStatus(areaStatus, areaValues, location) {
         const el = document.getElementById('area-status');
         if (!el) return;
         // Update label and dot inside area-status
         const dot = el.querySelector('.status-dot');
         const text = el.querySelector('span');
-        if (text) text.textContent = `Area Status: ${areaStatus}`;
+        const where = location && location !== 'unknown' ? ` (${location})` : '';
+        if (text) text.textContent = `Area Status: ${areaStatus}${where}`;
 
         if (dot) {
             dot.className = 'status-dot';
@@ -437,10 +476,10 @@ function updateChartData(data) {
 
         // Show notification/banner for WARNING and DANGER
         if (areaStatus === 'DANGER') {
-            showAlert('DANGER: Risiko kebakaran tinggi! Ambil tindakan segera.', 'danger', true);
+            showAlert(`DANGER${where}: Risiko kebakaran tinggi! Ambil tindakan segera.`, 'danger', true);
         } else if (areaStatus === 'WARNING') {
             // show a less intrusive alert that auto-dismisses after 8s
-            showAlert('WARNING: Kondisi memperingatkan — monitor area lebih sering.', 'warning', false, 8000);
+            showAlert(`WARNING${where}: Kondisi memperingatkan — monitor area lebih sering.`, 'warning', false, 8000);
         } else {
             // Clear any existing alerts when back to normal
             clearAlert();
@@ -485,6 +524,18 @@ function updateChartData(data) {
         }
     }
 
+    // Deteksi dini dari server (tren naik/turun cepat atau lonjakan)
+    function showDetectionAlert(alert) {
+        if (!alert) return;
+        const what = alert.kind === 'rate'
+            ? `${alert.metric} berubah cepat (${alert.score}/menit)`
+            : `lonjakan ${alert.metric} (${alert.value})`;
+        const message = `${alert.severity}: ${what} pada ${alert.sensor_id}` +
+            (alert.location ? ` di ${alert.location}` : '');
+        const level = alert.severity === 'DANGER' ? 'danger' : 'warning';
+        showAlert(message, level, false, 8000);
+    }
+
     function clearAlert() {
         const alertEl = document.getElementById('area-alert');
         if (!alertEl) return;
@@ -512,7 +563,12 @@ function setupWebSocket() {
             const area_status = msg.area_status;
             const area_values = msg.area_values;
             if (payload) updateSensorCard(payload);
-            if (area_status) updateAreaStatus(area_status, area_values || {});
+            if (area_status) setAreaStatus(msg.location, area_status, area_values);
+        } else if (msg.type === 'area_alert') {
+            // Status area hanya dikirim saat berpindah (setelah debounce di server)
+            setAreaStatus(msg.location, msg.area_status, msg.area_values);
+        } else if (msg.type === 'alert') {
+            showDetectionAlert(msg.alert);
         } else {
             // Backwards compat: single payload
             updateSensorCard(msg);